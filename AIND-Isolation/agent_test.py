@@ -3,14 +3,28 @@ tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
 
+import random
+import timeit
 import unittest
 
 import isolation
 import game_agent
+from transposition import TranspositionTable
 
 from importlib import reload
 
 
+class FixedDepthAlphaBetaPlayer(game_agent.AlphaBetaPlayer):
+    """Alpha-beta agent searching to `search_depth` only, so that its moves do
+    not depend on the clock (defined here so that worker processes can
+    unpickle it)
+    """
+
+    def get_move(self, game, time_left):
+        self._start_clock(time_left)
+        return self.alphabeta(game, self.search_depth)
+
+
 class IsolationTest(unittest.TestCase):
     """Unit tests for isolation agents"""
 
@@ -21,5 +35,831 @@ class IsolationTest(unittest.TestCase):
         self.game = isolation.Board(self.player1, self.player2)
 
 
+class BitBoardTest(unittest.TestCase):
+    """BitBoard must agree with Board on every public query"""
+
+    def assertSameState(self, board, bitboard):
+        self.assertEqual(sorted(board.get_legal_moves()),
+                         sorted(bitboard.get_legal_moves()))
+        self.assertEqual(sorted(board.get_blank_spaces()),
+                         sorted(bitboard.get_blank_spaces()))
+        self.assertEqual(board.to_string(), bitboard.to_string())
+        for player in ("Player1", "Player2"):
+            self.assertEqual(board.get_player_location(player),
+                             bitboard.get_player_location(player))
+            self.assertEqual(board.utility(player), bitboard.utility(player))
+            self.assertEqual(board.is_winner(player), bitboard.is_winner(player))
+            self.assertEqual(board.is_loser(player), bitboard.is_loser(player))
+
+    def test_random_games(self):
+        for width, height in [(7, 7), (5, 8)]:
+            board = isolation.Board("Player1", "Player2", width, height)
+            bitboard = isolation.BitBoard("Player1", "Player2", width, height)
+            while True:
+                self.assertSameState(board, bitboard)
+                moves = board.get_legal_moves()
+                if not moves:
+                    break
+                move = random.choice(moves)
+                self.assertEqual(board.forecast_move(move)._board_state,
+                                 bitboard.forecast_move(move)._board_state)
+                board.apply_move(move)
+                bitboard.apply_move(move)
+            self.assertEqual(isolation.BitBoard.from_board(board)._board_state,
+                             bitboard._board_state)
+
+
+class ReplayTest(unittest.TestCase):
+    """Unshuffled or seeded boards must replay identical game trees"""
+
+    def search(self, board_cls, rng):
+        player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score)
+        player.time_left = lambda: float("inf")
+        game = board_cls(player, "Opponent", rng=rng)
+        game.apply_move((3, 3))
+        game.apply_move((2, 1))
+        trace = []
+        for depth in range(1, 5):
+            player.nodes = 0
+            trace.append((player.alphabeta(game, depth), player.nodes))
+        return trace
+
+    def test_replay(self):
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            self.assertEqual(self.search(board_cls, None), self.search(board_cls, None))
+            self.assertEqual(self.search(board_cls, random.Random(7)),
+                             self.search(board_cls, random.Random(7)))
+        self.assertEqual(self.search(isolation.Board, None),
+                         self.search(isolation.BitBoard, None))
+
+    def test_fixed_order(self):
+        game = isolation.Board("Player1", "Player2", rng=None)
+        game.apply_move((3, 3))
+        game.apply_move((2, 1))
+        moves = game.get_legal_moves()
+        self.assertEqual(moves, [move for _, move in game.geometry.neighbors[3 + 3 * 7]
+                                 if move != (2, 1)])
+        self.assertEqual(game.copy().get_legal_moves(), moves)
+
+
+class SearchWindowTest(unittest.TestCase):
+    """Aspiration windows and PVS must not change the search results"""
+
+    def test_same_values(self):
+        import benchmark
+        rows = benchmark.search_savings(max_depth=4, count=4, seed=2)
+        self.assertEqual(len(rows), len(benchmark.SCORES) * len(benchmark.SEARCHES))
+        for row in rows:
+            self.assertTrue(row[4], row)
+
+    def test_same_moves(self):
+        moves = []
+        for options in ({}, {"pvs": True}):
+            player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score, **options)
+            player.time_left = lambda: float("inf")
+            game = isolation.Board(player, "Player2", rng=None)
+            for move in [(3, 3), (2, 1), (1, 2), (4, 2)]:
+                game.apply_move(move)
+            moves.append([player.alphabeta(game, depth) for depth in range(1, 5)])
+        self.assertEqual(moves[0], moves[1])
+
+
+class GameRecordTest(unittest.TestCase):
+    """Logged games must rebuild every position of the original game"""
+
+    def test_replay(self):
+        import io
+        import game_records
+        game = isolation.Board("Player1", "Player2", rng=None)
+        moves = []
+        while game.get_legal_moves():
+            moves.append(game.get_legal_moves()[0])
+            game.apply_move(moves[-1])
+        record = game_records.GameRecord(
+            7, 7, game_records.encode_moves(moves, 7), [1.5] * len(moves), {"winner": 1})
+        f = io.BytesIO()
+        f.write(game_records.MAGIC)
+        game_records.write_record(f, record)
+        game_records.write_record(f, record._replace(moves=record.moves[:3], times=[0.] * 3))
+        f.seek(0)
+        log = game_records.GameLog(game_records.read_records(f))
+        self.assertEqual(len(log), 2)
+        self.assertEqual(log.game_moves(0), moves)
+        self.assertEqual(list(log.record(0).times), [1.5] * len(moves))
+        self.assertEqual(log.meta[0], {"winner": 1})
+
+        replay = isolation.Board("Player1", "Player2", rng=None)
+        for ply, move in enumerate(moves):
+            position = log.position(0, ply)
+            self.assertEqual(position._board_state, replay._board_state)
+            self.assertEqual(position.hash(), replay.hash())
+            self.assertEqual(position.active_player, replay.active_player)
+            replay.apply_move(move)
+        self.assertEqual(log.position(1, 3)._board_state, log.position(0, 3)._board_state)
+
+
+class BenchmarkTest(unittest.TestCase):
+    """Benchmark runs must be reproducible and regressions detected"""
+
+    def test_baseline(self):
+        import benchmark
+        self.assertEqual(benchmark.corpus(3, seed=1), benchmark.corpus(3, seed=1))
+        results = benchmark.run(max_depth=2, count=3, seed=1, repeat=1)
+        again = benchmark.run(max_depth=2, count=3, seed=1, repeat=1)
+        self.assertEqual({name: r["nodes"] for name, r in results.items()},
+                         {name: r["nodes"] for name, r in again.items()})
+        self.assertEqual(len(results), len(benchmark.AGENTS) * len(benchmark.SCORES))
+
+        slower = {name: dict(r, nodes_per_sec=r["nodes_per_sec"] / 2,
+                             time_to_depth_ms=[2 * t for t in r["time_to_depth_ms"]])
+                  for name, r in results.items()}
+        self.assertEqual(benchmark.compare(results, results), [])
+        self.assertEqual(len(benchmark.compare(slower, results)), 2 * len(results))
+
+
+class TuningTest(unittest.TestCase):
+    """Weighted scores must match the custom scores and tuning must resume"""
+
+    def test_weighted_score(self):
+        import pickle
+        scores = [(game_agent.custom_score, game_agent.WeightedScore(10, 1, 0)),
+                  (game_agent.custom_score_2, game_agent.WeightedScore(20, 20, 1))]
+        game = isolation.Board("Player1", "Player2")
+        for move in [(3, 3), (2, 1), (1, 2), (4, 2), (2, 4)]:
+            game.apply_move(move)
+            if game.move_count < 2:
+                continue
+            for score_fn, weighted in scores:
+                weighted = pickle.loads(pickle.dumps(weighted))
+                for player in ("Player1", "Player2"):
+                    self.assertEqual(score_fn(game, player), weighted(game, player))
+        self.assertEqual(game_agent.WeightedScore(20, 20, 1), pickle.loads(pickle.dumps(weighted)))
+        self.assertEqual(len({game_agent.WeightedScore(10, 1, 0), game_agent.WeightedScore(10, 1, 0),
+                              game_agent.WeightedScore(20, 20, 1)}), 2)
+
+    def test_resume(self):
+        import tune
+        tuner = tune.SPSATuner([1., .05], games=2, depth=1, seed=3)
+        tuner.step()
+        resumed = tune.SPSATuner.from_state(tuner.state())
+        tuner.step()
+        resumed.step()
+        self.assertEqual(tuner.state(), resumed.state())
+        self.assertEqual(tuner.iteration, 2)
+
+    def test_lost_positions(self):
+        import tune
+        lost = []
+
+        class CheckedBoard(isolation.Board):
+            def apply_move(board, move):
+                self.assertIn(move, board.get_legal_moves())
+                super().apply_move(move)
+
+        class LosingPlayer(game_agent.AlphaBetaPlayer):
+            def alphabeta(player, game, depth):
+                move = super().alphabeta(game, depth)
+                lost.append(move == (-1, -1))
+                return move
+
+        board_cls, player_cls = tune.Board, tune.AlphaBetaPlayer
+        tune.Board, tune.AlphaBetaPlayer = CheckedBoard, LosingPlayer
+        try:
+            for task in tune.match_tasks((1., 1., 0.), (1., .5, 0.), 4, 3, random.Random(0)):
+                tune.play_game(task)
+        finally:
+            tune.Board, tune.AlphaBetaPlayer = board_cls, player_cls
+        # the games must reach positions where every move loses
+        self.assertTrue(any(lost))
+
+
+class GeometryTest(unittest.TestCase):
+    """The shared tables must match the knight rules on any board size"""
+
+    def test_tables(self):
+        for width, height in [(7, 7), (5, 8), (9, 3)]:
+            geometry = isolation.geometry(width, height)
+            self.assertIs(isolation.Board("Player1", "Player2", width, height).geometry, geometry)
+            for idx, (r, c) in enumerate(geometry.cells):
+                self.assertEqual(idx, r + c * height)
+                expected = {(r + dr, c + dc) for dr, dc in isolation.isolation.DIRECTIONS
+                            if 0 <= r + dr < height and 0 <= c + dc < width}
+                self.assertEqual({move for _, move in geometry.neighbors[idx]}, expected)
+                self.assertEqual(geometry.center_distance[idx],
+                                 (height / 2. - r)**2 + (width / 2. - c)**2)
+                for other, (r2, c2) in enumerate(geometry.cells):
+                    self.assertEqual(geometry.distance[idx][other], abs(r - r2) + abs(c - c2))
+
+    def test_rectangular_game(self):
+        player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score_2)
+        opponent = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score_3)
+        game = isolation.Board(player, opponent, 5, 8)
+        winner, history, _ = game.play(time_limit=50)
+        self.assertIn(winner, (player, opponent))
+        self.assertGreater(len(history), 2)
+
+
+class PushPopTest(unittest.TestCase):
+    """push_move()/pop_move() must restore the exact previous state"""
+
+    def test_round_trip(self):
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            game = board_cls("Player1", "Player2")
+            states = []
+            while game.get_legal_moves():
+                states.append((game.to_string(), game.hash(), game.move_count,
+                               game.active_player))
+                game.push_move(random.choice(game.get_legal_moves()))
+            while states:
+                game.pop_move()
+                self.assertEqual(states.pop(), (game.to_string(), game.hash(),
+                                                game.move_count, game.active_player))
+
+    def test_in_place_search(self):
+        for player_cls in (game_agent.MinimaxPlayer, game_agent.AlphaBetaPlayer):
+            moves = []
+            for in_place in (False, True):
+                player = player_cls(in_place=in_place)
+                player.time_left = lambda: 1000.
+                game = isolation.Board(player, "Player2")
+                game.apply_move((2, 3))
+                game.apply_move((4, 4))
+                before = game.to_string()
+                random.seed(0)
+                if player_cls is game_agent.MinimaxPlayer:
+                    moves.append(player.minimax(game, 3))
+                else:
+                    moves.append(player.alphabeta(game, 4))
+                self.assertEqual(before, game.to_string())
+            self.assertEqual(moves[0], moves[1])
+
+
+class LegalMoveCacheTest(unittest.TestCase):
+    """Cached legal moves must follow every change of the board"""
+
+    def assertFresh(self, game):
+        for player in ("Player1", "Player2"):
+            moves = game.get_legal_moves(player)
+            self.assertEqual(moves, game._moves_from(game._location_index(player)))
+            moves.append(None)
+            self.assertNotIn(None, game.get_legal_moves(player))
+
+    def test_moves_and_undo(self):
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            game = board_cls("Player1", "Player2", rng=None)
+            for _ in range(2):
+                while game.get_legal_moves():
+                    self.assertFresh(game)
+                    child = game.copy()
+                    child.apply_move(child.get_legal_moves()[0])
+                    self.assertFresh(child)
+                    self.assertFresh(game)
+                    game.push_move(random.choice(game.get_legal_moves()))
+                while game.move_count:
+                    game.pop_move()
+                    self.assertFresh(game)
+            self.assertRaises(RuntimeError, game.get_legal_moves, "Player3")
+
+
+class TranspositionTest(unittest.TestCase):
+    """Zobrist hashing and the alpha-beta transposition table"""
+
+    def test_incremental_hash(self):
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            game = board_cls("Player1", "Player2")
+            while game.get_legal_moves():
+                self.assertEqual(game.hash(), game._compute_hash())
+                game.apply_move(random.choice(game.get_legal_moves()))
+                self.assertEqual(game.hash(), game.copy().hash())
+
+    def test_search_value(self):
+        from sample_players import improved_score
+        inf = float("inf")
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+        player.time_left = lambda: 1000.
+        game = isolation.Board(player, "Player2")
+        game.apply_move((3, 3))
+        game.apply_move((2, 5))
+        values = {m: player.min_value(game.forecast_move(m), 3, -inf, inf)
+                  for m in game.get_legal_moves()}
+        player.tt = TranspositionTable(1024)
+        move = player.alphabeta(game, 4)
+        self.assertEqual(values[move], max(values.values()))
+        self.assertGreater(player.tt.stores, 0)
+        self.assertEqual(player.tt.lookup(game.hash())[4], move)
+
+
+class MoveOrderingTest(unittest.TestCase):
+    """Move ordering must not change the minimax decision"""
+
+    def test_ordered_search(self):
+        from sample_players import improved_score
+        inf = float("inf")
+        player = game_agent.AlphaBetaPlayer(score_fn=improved_score)
+        player.time_left = lambda: 1000.
+        game = isolation.Board(player, "Player2")
+        game.apply_move((3, 3))
+        game.apply_move((2, 5))
+        values = {m: player.min_value(game.forecast_move(m), 4, -inf, inf)
+                  for m in game.get_legal_moves()}
+        player.move_ordering = True
+        for depth in range(1, 6):
+            move = player.alphabeta(game, depth)
+        self.assertEqual(values[move], max(values.values()))
+        self.assertEqual(player._extract_pv(game, 5)[0], move)
+        self.assertTrue(player._history[True] or player._history[False])
+
+    def test_depth_nodes(self):
+        player = game_agent.AlphaBetaPlayer(move_ordering=True)
+        game = isolation.Board(player, "Player2")
+        game.apply_move((3, 3))
+        game.apply_move((2, 5))
+        deadline = timeit.default_timer() + 0.1
+        player.get_move(game, lambda: 1000 * (deadline - timeit.default_timer()))
+        depths = [depth for depth, _ in player.depth_nodes]
+        self.assertEqual(depths, list(range(1, len(depths) + 1)))
+        self.assertGreaterEqual(player.nodes, sum(n for _, n in player.depth_nodes))
+        self.assertEqual(len(player.principal_variation), depths[-1])
+
+
+class BatchEvalTest(unittest.TestCase):
+    """Batched child scores must equal the scalar heuristics"""
+
+    def test_score_children(self):
+        from batch_eval import BATCH_SCORES, score_children
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            game = board_cls("Player1", "Player2")
+            game.apply_move((3, 3))
+            game.apply_move((2, 5))
+            while game.get_legal_moves():
+                moves = game.get_legal_moves()
+                for score_fn in BATCH_SCORES:
+                    for player in ("Player1", "Player2"):
+                        expected = [score_fn(game.forecast_move(m), player) for m in moves]
+                        actual = score_children(game, player, moves, score_fn)
+                        for a, b in zip(actual, expected):
+                            self.assertAlmostEqual(a, b)
+                game.apply_move(random.choice(moves))
+
+    def test_unplaced_player(self):
+        from batch_eval import BATCH_SCORES, ChildFeatures, score_children
+        game = isolation.Board("Player1", "Player2")
+        moves = game.get_legal_moves()
+        self.assertRaises(ValueError, ChildFeatures, game, "Player1", moves)
+        # without a location for the waiting player the scalar heuristics are
+        # used, whether they have a value or raise
+        for score_fn in BATCH_SCORES:
+            for player in ("Player1", "Player2"):
+                try:
+                    expected = [score_fn(game.forecast_move(m), player) for m in moves]
+                except TypeError:
+                    self.assertRaises(TypeError, score_children, game, player, moves, score_fn)
+                else:
+                    self.assertEqual(score_children(game, player, moves, score_fn), expected)
+
+
+class OpeningBookTest(unittest.TestCase):
+    """Book moves must be found for every symmetric variant of a position"""
+
+    def test_book(self):
+        import os
+        import tempfile
+        from opening_book import OpeningBook, build_book
+        from isolation.symmetry import symmetries
+        book = build_book(max_ply=3, depth=2, width=5, height=5)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "book.bin")
+            book.save(path)
+            self.assertEqual(os.path.getsize(path), 10 + 9 * len(book))
+            book = OpeningBook.load(path)
+
+        for perm in symmetries(5, 5):
+            game = isolation.Board("Player1", "Player2", 5, 5)
+            for r, c in [(0, 1), (2, 3)]:
+                idx = perm[r + c * 5]
+                game.apply_move((idx % 5, idx // 5))
+            self.assertIn(book.lookup(game), game.get_legal_moves())
+
+        player = game_agent.AlphaBetaPlayer(opening_book=book)
+        game = isolation.Board(player, "Player2", 5, 5)
+        game.apply_move((1, 1))
+        game.apply_move((3, 2))
+        self.assertEqual(player.get_move(game, lambda: 0.), book.lookup(game))
+
+
+class SymmetryTest(unittest.TestCase):
+    """Symmetric positions must share canonical keys and table entries"""
+
+    def test_canonical_key(self):
+        from isolation.symmetry import (symmetries, canonical_key, canonical_hash,
+                                        transform_mask, transform_move)
+        rng = random.Random(3)
+        moves = []
+        game = isolation.Board("Player1", "Player2")
+        for _ in range(9):
+            moves.append(rng.choice(game.get_legal_moves()))
+            game.apply_move(moves[-1])
+        keys = set()
+        for sym in range(8):
+            for board_cls in (isolation.Board, isolation.BitBoard):
+                variant = board_cls("Player1", "Player2")
+                for move in moves:
+                    variant.apply_move(transform_move(move, sym, 7, 7))
+                key, variant_sym = canonical_key(variant)
+                keys.add((key, canonical_hash(variant)[0]))
+                self.assertEqual(transform_mask(variant._blocked_mask(), variant_sym, 7, 7),
+                                 key & (1 << 49) - 1)
+                move = moves[0]
+                self.assertEqual(transform_move(transform_move(move, sym, 7, 7), sym, 7, 7,
+                                                reverse=True), move)
+        self.assertEqual(len(keys), 1)
+
+    def test_symmetric_table(self):
+        values = []
+        for tt_symmetry in (False, True):
+            player = game_agent.AlphaBetaPlayer(tt_size=4096, tt_symmetry=tt_symmetry)
+            player.time_left = lambda: float("inf")
+            game = isolation.Board(player, "Player2", 5, 5)
+            values.append([player._iterate(game, depth)[1] for depth in range(1, 4)])
+            values.append(player.nodes)
+        self.assertEqual(values[0], values[2])
+        self.assertLess(values[3], values[1])
+
+    def test_asymmetric_score(self):
+        # custom_score_2 measures the center distance from (3.5, 3.5), which
+        # symmetric positions do not share
+        with self.assertRaises(ValueError):
+            game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score_2, tt_symmetry=True)
+        with self.assertRaises(ValueError):
+            game_agent.AlphaBetaPlayer(score_fn=game_agent.WeightedScore(20, 20, 1),
+                                       tt_symmetry=True)
+        for score_fn in (game_agent.custom_score_3, game_agent.WeightedScore(10, 1, 0)):
+            game_agent.AlphaBetaPlayer(score_fn=score_fn, tt_symmetry=True)
+
+    def test_large_boards(self):
+        from isolation.symmetry import position_key, canonical_hash
+        # square 127 needs 8 bits once shifted by one
+        self.assertNotEqual(position_key(0, 127, None, False, 144),
+                            position_key(0, None, 0, False, 144))
+        rng = random.Random(5)
+        hashes, keys = set(), set()
+        for _ in range(50):
+            game = isolation.Board("Player1", "Player2", 12, 12)
+            for _ in range(4):
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            keys.add(tuple(sorted((game._blocked_mask(), game._location_index(player))
+                                  for player in (game._player_1, game._player_2))))
+            hashes.add(canonical_hash(game)[0])
+        self.assertEqual(len(hashes), len(keys))
+
+
+class EndgameTest(unittest.TestCase):
+    """Partition detection and the exact longest-path solver"""
+
+    def longest_path(self, masks, loc, free):
+        best = 0
+        for idx in range(len(masks)):
+            if masks[loc] & free & (1 << idx):
+                best = max(best, 1 + self.longest_path(masks, idx, free & ~(1 << idx)))
+        return best
+
+    def test_solver(self):
+        from endgame import EndgameSolver
+        masks = isolation.knight_tables(7, 7)[0]
+        solver = EndgameSolver()
+        rng = random.Random(0)
+        solved = 0
+        while solved < 20:
+            game = isolation.Board("Player1", "Player2")
+            while game.get_legal_moves() and not game.is_partitioned():
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            region = game.get_region(game.active_player)
+            if not game.is_partitioned() or bin(region).count("1") > 14:
+                continue
+            self.assertEqual(isolation.BitBoard.from_board(game).get_region(game.active_player), region)
+            loc = game.get_player_location(game.active_player)
+            move, length = solver.solve(game, game.active_player)
+            self.assertEqual(length, self.longest_path(masks, loc[0] + loc[1] * 7, region))
+            if length:
+                self.assertIn(move, game.get_legal_moves())
+            solved += 1
+
+    def test_agent_switches(self):
+        player = game_agent.AlphaBetaPlayer(endgame=True)
+        game = isolation.Board(player, "Player2")
+        rng = random.Random(1)
+        while not game.is_partitioned():
+            game.apply_move(rng.choice(game.get_legal_moves()))
+        if game.active_player != player:
+            game.apply_move(rng.choice(game.get_legal_moves()))
+        move = player.get_move(game, lambda: 1000.)
+        self.assertEqual(move, player.endgame.solve(game, player)[0])
+
+
+class TimeManagerTest(unittest.TestCase):
+    """The time manager must amortize clock reads without missing deadlines"""
+
+    def test_amortized_reads(self):
+        from time_manager import TimeManager
+        reads = []
+
+        def time_left():
+            reads.append(None)
+            return 100. - 0.001 * len(reads)
+
+        manager = TimeManager(target_interval=1.)
+        manager.start(time_left)
+        for _ in range(10000):
+            manager.time_left()
+        self.assertLess(manager.clock_reads, 200)
+        self.assertEqual(manager.clock_reads, len(reads))
+
+    def test_search_within_budget(self):
+        player = game_agent.AlphaBetaPlayer(time_manager=True)
+        game = isolation.Board(player, "Player2")
+        game.apply_move((3, 3))
+        game.apply_move((2, 5))
+        for _ in range(3):
+            deadline = timeit.default_timer() + 0.15
+            time_left = lambda: 1000 * (deadline - timeit.default_timer())
+            move = player.get_move(game, time_left)
+            self.assertGreater(time_left(), 0)
+            self.assertIn(move, game.get_legal_moves())
+            self.assertLess(player.time_manager.clock_reads, player.nodes)
+
+
+class ParallelSearchTest(unittest.TestCase):
+    """Root splitting must return the serial result at the same depth"""
+
+    def test_root_groups(self):
+        import parallel_search
+        player = game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score)
+        player.time_left = lambda: float("inf")
+        game = isolation.Board(player, "Opponent", 5, 5)
+        for move in [(2, 2), (4, 2), (1, 4), (2, 1), (3, 3), (0, 2), (1, 2), (2, 3)]:
+            game.apply_move(move)
+        state = parallel_search.encode_state(game, player)
+        self.assertEqual(parallel_search.decode_state(state, player).hash(), game.hash())
+
+        moves = game.get_legal_moves()
+        deadline = float("inf")
+        results = [parallel_search.search_root_moves(
+            (state, moves[i::3], {"score_fn": game_agent.custom_score}, deadline, 0))
+            for i in range(3)]
+        # the deadline is never reached, so each group runs to the end of the game
+        self.assertTrue(all(exhausted for _, exhausted, _, _ in results))
+        depth, move = parallel_search.merge_results(
+            [(iterations[:3], False, 0, 0) for iterations, _, _, _ in results])
+        self.assertEqual(depth, 3)
+        best = max(player.min_value(game.forecast_move(m), 2, float("-inf"), float("inf"))
+                   for m in moves)
+        self.assertEqual(player.min_value(game.forecast_move(move), 2,
+                                          float("-inf"), float("inf")), best)
+
+    def test_late_groups(self):
+        import parallel_search
+        results = [([(1, (0, 0), 1.), (2, (0, 0), -1.)], False, 10, 1), ([], False, 3, 0),
+                   ([(1, (1, 2), 2.)], False, 5, 0)]
+        self.assertEqual(parallel_search.merge_results(results), (1, (1, 2)))
+        self.assertEqual(parallel_search.merge_results([([], False, 0, 0)]), (0, None))
+
+    def test_worker_tables_reset(self):
+        import parallel_search
+        import time
+        player = game_agent.AlphaBetaPlayer()
+        game = isolation.Board(player, "Opponent", 5, 5)
+        for move in [(2, 2), (4, 2), (1, 4), (2, 1)]:
+            game.apply_move(move)
+        first = parallel_search.game_id(player, game)
+        game.apply_move((3, 3))
+        game.apply_move((0, 2))
+        self.assertEqual(parallel_search.game_id(player, game), first)
+        game = isolation.Board(player, "Opponent", 5, 5)
+        game.apply_move((2, 2))
+        game.apply_move((4, 2))
+        second = parallel_search.game_id(player, game)
+        self.assertNotEqual(second, first)
+
+        state = parallel_search.encode_state(game, player)
+        config = {"tt_size": 1024}
+        task = (state, game.get_legal_moves(), config, time.monotonic() + 0.05, first)
+        parallel_search.search_root_moves(task)
+        key = (state[4],) + tuple(sorted(config.items()))
+        tt = parallel_search._WORKER_PLAYERS[key].tt
+        self.assertGreater(len(tt), 0)
+        parallel_search.search_root_moves(task[:4] + (first,))
+        self.assertGreater(len(tt), 0)
+        parallel_search.search_root_moves(task[:3] + (0, second))
+        self.assertEqual(len(tt), 0)
+
+    def test_worker_players_bounded(self):
+        import parallel_search
+        game = isolation.Board("Player1", "Player2", 5, 5)
+        game.apply_move((2, 2))
+        game.apply_move((4, 2))
+        state = parallel_search.encode_state(game, game.active_player)
+        limit = parallel_search._MAX_WORKER_PLAYERS
+        for own in list(range(2 * limit)) + [2 * limit - 1] * 3:
+            config = {"score_fn": game_agent.WeightedScore(own, 1, 0)}
+            parallel_search.search_root_moves((state, game.get_legal_moves(), config, 0, 1))
+        self.assertEqual(len(parallel_search._WORKER_PLAYERS), limit)
+        self.assertEqual(list(parallel_search._WORKER_PLAYERS)[-1],
+                         (state[4], ("score_fn", game_agent.WeightedScore(2 * limit - 1, 1, 0))))
+
+    def test_parallel_get_move(self):
+        player = game_agent.AlphaBetaPlayer(workers=2)
+        game = isolation.Board(player, "Opponent")
+        game.apply_move((3, 3))
+        game.apply_move((2, 1))
+        start = timeit.default_timer()
+        move = player.get_move(game, lambda: 150 - 1000 * (timeit.default_timer() - start))
+        self.assertIn(move, game.get_legal_moves())
+        self.assertGreater(player.nodes, 0)
+
+
+class MCTSTest(unittest.TestCase):
+    """MCTS must play legal moves, see forced wins and reuse its tree"""
+
+    def _get_move(self, player, game, time_limit=50):
+        start = timeit.default_timer()
+        return player.get_move(game, lambda: time_limit - 1000 * (timeit.default_timer() - start))
+
+    def test_forced_win(self):
+        from mcts import MCTSPlayer
+        player = MCTSPlayer()
+        game = isolation.Board(player, "Opponent", 5, 5)
+        for move in [(0, 2), (4, 0), (1, 4), (2, 1), (3, 3), (0, 0), (4, 1), (1, 2),
+                     (2, 0), (2, 4), (3, 2), (0, 3), (1, 1), (2, 2), (2, 3), (4, 3)]:
+            game.apply_move(move)
+        # (3, 1) is the only move leaving the opponent without legal moves
+        self.assertEqual(self._get_move(player, game), (3, 1))
+        self.assertGreater(player.playouts, 0)
+
+    def test_tree_reuse(self):
+        from mcts import MCTSPlayer
+        player = MCTSPlayer()
+        game = isolation.Board(player, "Opponent")
+        game.apply_move((3, 3))
+        game.apply_move((2, 1))
+        move = self._get_move(player, game)
+        self.assertIn(move, game.get_legal_moves())
+        game.apply_move(move)
+        game.apply_move(game.get_legal_moves()[0])
+        root = player._find_root((7, 7), (game._blocked_mask(), game._location_index(player),
+                                          game._location_index("Opponent")))
+        self.assertIsNotNone(root)
+        self.assertGreater(root.visits, 0)
+
+
+class ProfilerTest(unittest.TestCase):
+    """Profiled games must report every move of both agents"""
+
+    def test_profiled_game(self):
+        import io
+        import json
+        from sample_players import GreedyPlayer
+        import tournament
+        cpu_agent = tournament.Agent(GreedyPlayer(), "Greedy")
+        test_agents = [tournament.Agent(
+            game_agent.AlphaBetaPlayer(score_fn=game_agent.custom_score, tt_size=2**10), "AB")]
+        telemetry = io.StringIO()
+        wins = {cpu_agent.player: 0, test_agents[0].player: 0}
+        tournament.play_round(cpu_agent, test_agents, wins, 1,
+                              seed="test", telemetry=telemetry)
+        self.assertEqual(sum(wins.values()), 2)
+
+        records = [json.loads(line) for line in telemetry.getvalue().splitlines()]
+        self.assertEqual({r["agent"] for r in records}, {"Greedy", "AB"})
+        for record in records:
+            self.assertEqual(record["opponent"], "AB" if record["agent"] == "Greedy" else "Greedy")
+            self.assertGreaterEqual(record["time_ms"], record["movegen_ms"] + record["scoring_ms"])
+            if record["agent"] == "AB":
+                self.assertGreater(record["nodes"], 0)
+                self.assertGreaterEqual(record["depth"], 1)
+                # a search that reaches the end of the game only meets
+                # terminal leaves and never calls the heuristic
+                if record["depth"] < 49 - record["move_count"]:
+                    self.assertGreater(record["scoring_ms"], 0)
+        self.assertGreater(sum(r["tt_hits"] + r["tt_misses"] for r in records
+                               if r["agent"] == "AB"), 0)
+
+
+class TournamentTest(unittest.TestCase):
+    """Seeded tournament rounds must not depend on the number of workers"""
+
+    def test_parallel_round(self):
+        from concurrent.futures import ProcessPoolExecutor
+        from sample_players import RandomPlayer, GreedyPlayer
+        import tournament
+        cpu_agent = tournament.Agent(GreedyPlayer(), "Greedy")
+        test_agents = [tournament.Agent(RandomPlayer(), "Random"),
+                       tournament.Agent(FixedDepthAlphaBetaPlayer(search_depth=2), "AB_2")]
+        tallies = []
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            for pool in (None, executor):
+                wins = {agent.player: 0 for agent in [cpu_agent] + test_agents}
+                tournament.play_round(cpu_agent, test_agents, wins, 4,
+                                      seed="test", executor=pool)
+                tallies.append(wins)
+        self.assertEqual(tallies[0], tallies[1])
+        self.assertEqual(sum(tallies[0].values()), 16)
+
+    def test_sprt_round(self):
+        from sample_players import RandomPlayer, GreedyPlayer
+        from ratings import BradleyTerry, SPRT
+        import tournament
+        cpu_agent = tournament.Agent(RandomPlayer(), "Random")
+        test_agents = [tournament.Agent(GreedyPlayer(), "Greedy")]
+        wins = {cpu_agent.player: 0, test_agents[0].player: 0}
+        games = {test_agents[0].player: 0}
+        ratings = BradleyTerry()
+        tournament.play_round(cpu_agent, test_agents, wins, 50, seed="test",
+                              game_counts=games, sprt=SPRT(), ratings=ratings)
+        self.assertLess(games[test_agents[0].player], 100)
+        self.assertEqual(sum(wins.values()), games[test_agents[0].player])
+        self.assertEqual(ratings.games("Greedy"), games[test_agents[0].player])
+
+    def test_unique_names(self):
+        from sample_players import RandomPlayer
+        import tournament
+        agents = [tournament.Agent(RandomPlayer(), "Random")]
+        with self.assertRaises(ValueError):
+            tournament.play_matches(agents, [tournament.Agent(RandomPlayer(), "Random")], 1)
+
+
+class RatingsTest(unittest.TestCase):
+    """Ratings must recover the simulated strengths and SPRT must decide"""
+
+    def test_bradley_terry(self):
+        from ratings import BradleyTerry, expected_score
+        strengths = {"A": 0, "B": 200, "C": -200}
+        rng = random.Random(0)
+        ratings = BradleyTerry()
+        for _ in range(3000):
+            i, j = rng.sample(sorted(strengths), 2)
+            if rng.random() < expected_score(strengths[i] - strengths[j]):
+                ratings.add(i, j)
+            else:
+                ratings.add(j, i)
+        table = ratings.ratings(anchor="A")
+        self.assertEqual(table["A"], (0., 0., 0.))
+        for name, elo in strengths.items():
+            self.assertLess(table[name][1], elo + 1)
+            self.assertGreater(table[name][2], elo - 1)
+        with self.assertRaises(ValueError):
+            ratings.add("A", "A")
+
+    def test_sprt(self):
+        from ratings import SPRT
+        test = SPRT()
+        while test.status is None:
+            test.add(True)
+        self.assertEqual(test.status, "H1")
+        self.assertLess(test.wins, 20)
+        test = SPRT()
+        for won in [True, False] * 100:
+            test.add(won)
+        self.assertIsNone(test.status)
+
+
+class SlowPlayer:
+    """Agent sleeping `delay` seconds before every move."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def get_move(self, game, time_left):
+        import time
+        time.sleep(self.delay)
+        return game.get_legal_moves()[0]
+
+
+class CrashingPlayer:
+    def get_move(self, game, time_left):
+        raise ValueError("Crashing agent")
+
+
+class MatchServerTest(unittest.TestCase):
+    """Agents in worker processes must lose, not stall, on misbehaviour"""
+
+    def test_terminations(self):
+        from match_server import MatchServer, HARD_MARGIN
+        from sample_players import GreedyPlayer
+        with MatchServer(concurrency=2, time_limit=50) as server:
+            start = timeit.default_timer()
+            results = server.run([
+                (GreedyPlayer(), GreedyPlayer(), [(3, 3), (2, 1)], 1),
+                (SlowPlayer(0.1), GreedyPlayer(), [], 2),
+                (GreedyPlayer(), SlowPlayer(60), [], 3),
+                (CrashingPlayer(), GreedyPlayer(), [], 4),
+            ])
+            self.assertLess(timeit.default_timer() - start, 10 + HARD_MARGIN / 1000)
+        winner, history, termination, times = results[0]
+        self.assertEqual(termination, "illegal move")
+        self.assertEqual(len(history), len(times))
+        self.assertEqual([result[0] for result in results[1:]], [1, 0, 1])
+        self.assertEqual([result[2] for result in results[1:]], ["timeout", "timeout", "crash"])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,196 @@
+"""This file contains a batched evaluation API that scores all of the
+successors of a game state with one vectorized NumPy computation instead of
+building a new board and calling the heuristic once per child.
+
+Heuristics opt in by registering a vectorized twin with `batch_score`; the
+twin receives the `ChildFeatures` of every child and must return the same
+values as the scalar heuristic would for each `game.forecast_move(move)`.
+Heuristics without a twin, and positions where the waiting player has not
+been placed yet, fall back to the scalar function.
+
+The search agents do not use it: a node has at most 8 children, too few to
+pay for the NumPy call overhead, and scoring them all at once also scores
+the children an alpha-beta cutoff would have skipped. On the benchmark
+corpus it made depth-6 alpha-beta 1.8x (Board) to 2.3x (BitBoard) slower
+and depth-4 minimax 10-40% slower. It is meant for scoring many positions
+outside the search, e.g., to build training or analysis data.
+"""
+import numpy as np
+
+from game_agent import custom_score, custom_score_2, custom_score_3
+from sample_players import null_score, open_move_score, improved_score, center_score
+
+BATCH_SCORES = {}
+
+_ADJACENCY = {}
+
+
+def knight_adjacency(width, height):
+    """Return the (cells x cells) boolean knight-move adjacency matrix and the
+    row and column of every cell for a board of the given size, using the
+    `Board` square indexing ``idx = row + col * height``.
+    """
+    key = (width, height)
+    if key not in _ADJACENCY:
+        cells = width * height
+        rows = np.arange(cells) % height
+        cols = np.arange(cells) // height
+        dr = np.abs(rows[:, None] - rows[None, :])
+        dc = np.abs(cols[:, None] - cols[None, :])
+        adjacency = ((dr == 1) & (dc == 2)) | ((dr == 2) & (dc == 1))
+        _ADJACENCY[key] = (adjacency, rows, cols)
+    return _ADJACENCY[key]
+
+
+def free_squares(game):
+    """Return a boolean array telling whether each square of `game` is blank,
+    in square index order. It reads the blocked squares bitmask, which
+    `BitBoard` stores directly, instead of its rebuilt list state.
+    """
+    cells = game.width * game.height
+    blocked = game._blocked_mask().to_bytes((cells + 7) // 8, "little")
+    bits = np.unpackbits(np.frombuffer(blocked, dtype=np.uint8)).reshape(-1, 8)[:, ::-1]
+    return bits.ravel()[:cells] == 0
+
+
+class ChildFeatures:
+    """Per-child arrays describing the successors of a game state from the
+    point of view of one player. Both players must be on the board in the
+    children, i.e., the waiting player must have moved; otherwise a
+    ValueError is raised.
+
+    Attributes
+    ----------
+    own_moves, opp_moves : numpy.ndarray
+        Number of legal moves of the player and of its opponent in each child.
+
+    own_row, own_col, opp_row, opp_col : numpy.ndarray
+        Location of the player and of its opponent in each child.
+
+    won, lost : numpy.ndarray
+        Boolean masks of the children in which `is_winner(player)` or
+        `is_loser(player)` holds.
+    """
+
+    def __init__(self, game, player, moves):
+        adjacency, rows, cols = knight_adjacency(game.width, game.height)
+        free = free_squares(game)
+        idx = np.array([r + c * game.height for r, c in moves])
+
+        mover_moves = (adjacency[idx] & free).sum(axis=1)
+        mover_row, mover_col = rows[idx], cols[idx]
+
+        # the waiting player is active in every child and did not move, so
+        # only the square taken by the mover can change its legal moves
+        waiting = game.get_player_location(game.inactive_player)
+        if waiting == game.NOT_MOVED:
+            raise ValueError("The waiting player has no location to compute features from")
+        loc = waiting[0] + waiting[1] * game.height
+        waiting_moves = adjacency[loc][free].sum() - adjacency[loc][idx]
+        waiting_row = np.full(len(moves), waiting[0])
+        waiting_col = np.full(len(moves), waiting[1])
+
+        stuck = waiting_moves == 0
+        if player == game.active_player:
+            self.own_moves, self.opp_moves = mover_moves, waiting_moves
+            self.own_row, self.own_col = mover_row, mover_col
+            self.opp_row, self.opp_col = waiting_row, waiting_col
+            self.won, self.lost = stuck, np.zeros(len(moves), dtype=bool)
+        else:
+            self.own_moves, self.opp_moves = waiting_moves, mover_moves
+            self.own_row, self.own_col = waiting_row, waiting_col
+            self.opp_row, self.opp_col = mover_row, mover_col
+            self.won, self.lost = np.zeros(len(moves), dtype=bool), stuck
+
+
+def batch_score(score_fn):
+    """Decorator registering a vectorized implementation of `score_fn`.
+
+    The decorated function is called as ``fn(features, game)`` with the
+    `ChildFeatures` of the children and the parent board, and returns an
+    array with the non-terminal score of every child.
+    """
+    def register(batch_fn):
+        BATCH_SCORES[score_fn] = batch_fn
+        return batch_fn
+    return register
+
+
+def score_children(game, player, moves, score_fn):
+    """Return the list ``[score_fn(game.forecast_move(m), player) for m in
+    moves]``, computed in one vectorized call if `score_fn` has a registered
+    batched implementation and both players are on the board.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The parent game state; it is not modified.
+
+    player : object
+        The player from whose point of view the children are scored.
+
+    moves : list<(int, int)>
+        Legal moves of the active player in `game`.
+
+    score_fn : callable
+        A heuristic with the signature ``score_fn(game, player)``.
+
+    Returns
+    -------
+    list<float>
+    """
+    batch_fn = BATCH_SCORES.get(score_fn)
+    if (batch_fn is None or not moves or
+            game.get_player_location(game.inactive_player) == game.NOT_MOVED):
+        return [score_fn(game.forecast_move(m), player) for m in moves]
+    features = ChildFeatures(game, player, moves)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        scores = np.asarray(batch_fn(features, game), dtype=float)
+    scores = np.where(features.lost, -np.inf, np.where(features.won, np.inf, scores))
+    return scores.tolist()
+
+
+@batch_score(null_score)
+def batch_null_score(features, game):
+    return np.zeros(len(features.own_moves))
+
+
+@batch_score(open_move_score)
+def batch_open_move_score(features, game):
+    return features.own_moves
+
+
+@batch_score(improved_score)
+def batch_improved_score(features, game):
+    return features.own_moves - features.opp_moves
+
+
+@batch_score(center_score)
+def batch_center_score(features, game):
+    w, h = game.width / 2., game.height / 2.
+    return (h - features.own_row)**2 + (w - features.own_col)**2
+
+
+@batch_score(custom_score)
+def batch_custom_score(features, game):
+    """Vectorized `custom_score` over the children of `game`."""
+    return 10 * features.own_moves - features.opp_moves
+
+
+@batch_score(custom_score_2)
+def batch_custom_score_2(features, game):
+    """Vectorized `custom_score_2` over the children of `game`."""
+    moves_weight = 20
+    central_weight = 1
+    w, h = game.width / 2., game.height / 2.
+    return ((features.own_moves - features.opp_moves) * moves_weight +
+            ((h - features.own_row)**2 + (w - features.own_col)**2) * central_weight)
+
+
+@batch_score(custom_score_3)
+def batch_custom_score_3(features, game):
+    """Vectorized `custom_score_3` over the children of `game`."""
+    difference_in_moves = features.own_moves - 2 * features.opp_moves
+    manhattan_distance = (np.abs(features.own_row - features.opp_row) +
+                          np.abs(features.own_col - features.opp_col))
+    return difference_in_moves / manhattan_distance.astype(float)
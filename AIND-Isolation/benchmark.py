@@ -0,0 +1,298 @@
+"""Benchmark the Isolation search agents on a fixed corpus of positions.
+
+Every combination of search agent (`MinimaxPlayer`, `AlphaBetaPlayer`) and
+heuristic (`custom_score`, `custom_score_2`, `custom_score_3`) searches each
+corpus position to every depth from 1 to `--depth` without a time limit. The
+boards generate legal moves in a fixed order (``rng=None``), so the game
+trees -- and the node counts -- are identical from run to run and only the
+timings depend on the machine. Each search is timed `--repeat` times and the
+fastest run is kept, to filter out noise from the rest of the system. For
+each combination the benchmark reports:
+
+- nodes/sec: nodes expanded per second over all the searches;
+- time to depth N: mean milliseconds to search a position to depth N;
+- stability: fraction of positions whose best move at the deepest depth was
+  already the best move one ply shallower.
+
+Results are written to a JSON baseline with ``--save`` and compared to one
+with ``--compare``; any slowdown or loss of stability beyond ``--tolerance``
+is reported as a regression and makes the script exit with status 1:
+
+    python benchmark.py --save benchmark_baseline.json
+    python benchmark.py --compare benchmark_baseline.json --tolerance 0.15
+
+With ``--savings``, it instead reports the nodes that aspiration windows and
+principal variation search save on the corpus, compared to plain alpha-beta
+with the same move ordering and transposition table, and checks that every
+iteration still finds the same value:
+
+    python benchmark.py --savings --depth 7
+
+With ``--boards``, it reports the time `AlphaBetaPlayer` takes to search the
+corpus to ``--depth`` with `custom_score` on a `Board` and on a `BitBoard`,
+with and without in-place search, keeping the fastest of ``--repeat`` runs
+of each position:
+
+    python benchmark.py --boards --depth 6 --positions 30 --repeat 7
+"""
+import argparse
+import json
+import random
+import sys
+import timeit
+
+from isolation import Board, BitBoard
+from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
+                        custom_score_2, custom_score_3)
+
+AGENTS = [("Minimax", MinimaxPlayer), ("AlphaBeta", AlphaBetaPlayer)]
+SCORES = [custom_score, custom_score_2, custom_score_3]
+
+# Aspiration window half-widths, about one move of mobility for each heuristic
+WINDOWS = {custom_score: 5., custom_score_2: 10., custom_score_3: .5}
+
+# Searches compared by --savings, as (name, use PVS, use an aspiration window);
+# the aspiration window half-width of each heuristic is taken from WINDOWS
+SEARCHES = [("alphabeta", False, False), ("pvs", True, False), ("aspiration", False, True),
+            ("aspiration+pvs", True, True)]
+
+# Corpus positions are drawn from random games, between these plies
+MIN_PLY, MAX_PLY = 8, 16
+
+
+def corpus(count=20, seed=0, width=7, height=7):
+    """Return `count` move sequences leading to mid-game positions in which
+    the player to move has at least two legal moves. The corpus only depends
+    on its arguments.
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = Board("Player1", "Player2", width, height, rng=None)
+        moves = []
+        for _ in range(rng.randint(MIN_PLY, MAX_PLY)):
+            legal_moves = game.get_legal_moves()
+            if not legal_moves:
+                break
+            moves.append(rng.choice(legal_moves))
+            game.apply_move(moves[-1])
+        if len(game.get_legal_moves()) >= 2:
+            positions.append(moves)
+    return positions
+
+
+def run_agent(player_cls, score_fn, positions, max_depth, repeat=3, width=7, height=7):
+    """Search every position to every depth up to `max_depth` and return the
+    benchmark measurements of one agent as a dict.
+    """
+    player = player_cls(score_fn=score_fn)
+    player.time_left = lambda: float("inf")
+    search = player.alphabeta if isinstance(player, AlphaBetaPlayer) else player.minimax
+
+    times = [0.] * max_depth
+    nodes = 0
+    stable = 0
+    for moves in positions:
+        if len(moves) % 2 == 0:
+            game = Board(player, "Opponent", width, height, rng=None)
+        else:
+            game = Board("Opponent", player, width, height, rng=None)
+        for move in moves:
+            game.apply_move(move)
+
+        best_moves = []
+        for depth in range(1, max_depth + 1):
+            elapsed = float("inf")
+            for _ in range(repeat):
+                player.nodes = 0
+                start = timeit.default_timer()
+                move = search(game, depth)
+                elapsed = min(elapsed, timeit.default_timer() - start)
+            best_moves.append(move)
+            times[depth - 1] += elapsed
+            nodes += player.nodes
+        stable += len(best_moves) < 2 or best_moves[-1] == best_moves[-2]
+
+    return {
+        "nodes": nodes,
+        "nodes_per_sec": nodes / sum(times),
+        "time_to_depth_ms": [1000 * t / len(positions) for t in times],
+        "stability": stable / len(positions),
+    }
+
+
+def run(max_depth=5, count=20, seed=0, repeat=3, verbose=False):
+    """Benchmark every agent and heuristic and return the results keyed by
+    "<agent>/<heuristic>".
+    """
+    positions = corpus(count, seed)
+    results = {}
+    for agent_name, player_cls in AGENTS:
+        for score_fn in SCORES:
+            name = "{}/{}".format(agent_name, score_fn.__name__)
+            results[name] = run_agent(player_cls, score_fn, positions, max_depth, repeat)
+            if verbose:
+                result = results[name]
+                print("{:<28}{:>12.0f}{:>12.2f}{:>12.2f}".format(
+                    name, result["nodes_per_sec"], result["time_to_depth_ms"][-1],
+                    result["stability"]), flush=True)
+    return results
+
+
+def compare(results, baseline, tolerance=0.15):
+    """Return the list of regressions of `results` with respect to
+    `baseline`, as human readable messages.
+
+    A regression is a drop of nodes/sec or stability, or a rise of the time
+    to the deepest depth, by more than `tolerance` (a fraction of the
+    baseline). Shallower depths take too little time to be compared reliably.
+    Changed node counts are reported too, since the searches are
+    deterministic and a different count means the game tree changed.
+    """
+    regressions = []
+    for name, base in sorted(baseline.items()):
+        if name not in results:
+            continue
+        result = results[name]
+        if result["nodes"] != base["nodes"]:
+            regressions.append("{}: searched {} nodes instead of {}".format(
+                name, result["nodes"], base["nodes"]))
+        if result["nodes_per_sec"] < base["nodes_per_sec"] * (1 - tolerance):
+            regressions.append("{}: {:.0f} nodes/sec instead of {:.0f}".format(
+                name, result["nodes_per_sec"], base["nodes_per_sec"]))
+        ms, base_ms = result["time_to_depth_ms"][-1], base["time_to_depth_ms"][-1]
+        if ms > base_ms * (1 + tolerance):
+            regressions.append("{}: {:.2f} ms to depth {} instead of {:.2f}".format(
+                name, ms, len(base["time_to_depth_ms"]), base_ms))
+        if result["stability"] < base["stability"] - tolerance:
+            regressions.append("{}: stability {:.2f} instead of {:.2f}".format(
+                name, result["stability"], base["stability"]))
+    return regressions
+
+
+def deepen(player, game, max_depth):
+    """Search `game` with `player` by iterative deepening to `max_depth`
+    like `AlphaBetaPlayer.get_move()`, and return the value of every
+    iteration.
+    """
+    player._best_moves = {}
+    player._killers = {}
+    values = []
+    value = None
+    for depth in range(1, max_depth + 1):
+        _, value = player._iterate(game, depth, value)
+        values.append(value)
+    return values
+
+
+def search_savings(max_depth=6, count=20, seed=0, tt_size=2 ** 16):
+    """Return the (heuristic name, search name, nodes, fraction of nodes
+    saved, same values) of every heuristic and search in `SEARCHES`.
+    """
+    positions = corpus(count, seed)
+    rows = []
+    for score_fn in SCORES:
+        base_nodes = base_values = None
+        for name, pvs, aspiration in SEARCHES:
+            window = WINDOWS[score_fn] if aspiration else 0.
+            nodes = 0
+            values = []
+            for moves in positions:
+                player = AlphaBetaPlayer(score_fn=score_fn, move_ordering=True, tt_size=tt_size,
+                                         pvs=pvs, aspiration=window)
+                player.time_left = lambda: float("inf")
+                if len(moves) % 2 == 0:
+                    game = Board(player, "Opponent", rng=None)
+                else:
+                    game = Board("Opponent", player, rng=None)
+                for move in moves:
+                    game.apply_move(move)
+                values.append(deepen(player, game, max_depth))
+                nodes += player.nodes
+            if base_nodes is None:
+                base_nodes, base_values = nodes, values
+            rows.append((score_fn.__name__, name, nodes, 1 - nodes / base_nodes,
+                         values == base_values))
+    return rows
+
+
+def board_speed(max_depth=6, count=30, seed=0, repeat=7):
+    """Return the (board class name, in-place search, seconds, nodes) of
+    depth-`max_depth` alpha-beta searches of the corpus on each board class.
+    """
+    positions = corpus(count, seed)
+    rows = []
+    for in_place in (False, True):
+        for board_cls in (Board, BitBoard):
+            elapsed = 0.
+            nodes = 0
+            for moves in positions:
+                player = AlphaBetaPlayer(score_fn=custom_score, in_place=in_place)
+                player.time_left = lambda: float("inf")
+                if len(moves) % 2 == 0:
+                    game = board_cls(player, "Opponent", rng=None)
+                else:
+                    game = board_cls("Opponent", player, rng=None)
+                for move in moves:
+                    game.apply_move(move)
+                elapsed += min(timeit.repeat(lambda: player.alphabeta(game, max_depth),
+                                             number=1, repeat=repeat))
+                nodes += player.nodes
+            rows.append((board_cls.__name__, in_place, elapsed, nodes // repeat))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Isolation search agents.")
+    parser.add_argument("--depth", type=int, default=5, help="deepest search depth")
+    parser.add_argument("--positions", type=int, default=20, help="number of corpus positions")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the position corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs of each search")
+    parser.add_argument("--save", metavar="PATH", help="write the results to a baseline file")
+    parser.add_argument("--compare", metavar="PATH", help="compare the results to a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="relative change tolerated before flagging a regression")
+    parser.add_argument("--savings", action="store_true",
+                        help="report the nodes saved by aspiration windows and PVS")
+    parser.add_argument("--boards", action="store_true",
+                        help="compare the search time on Board and BitBoard")
+    args = parser.parse_args()
+
+    if args.boards:
+        print("{:<12}{:>10}{:>12}{:>10}".format("Board", "In place", "Seconds", "Nodes"))
+        for row in board_speed(args.depth, args.positions, args.seed, args.repeat):
+            print("{:<12}{:>10}{:>12.3f}{:>10}".format(row[0], "yes" if row[1] else "no", *row[2:]))
+        return
+
+    if args.savings:
+        print("{:<18}{:<18}{:>10}{:>10}{:>14}".format(
+            "Heuristic", "Search", "Nodes", "Saved", "Same values"))
+        for row in search_savings(args.depth, args.positions, args.seed):
+            print("{:<18}{:<18}{:>10}{:>10.1%}{:>14}".format(*row[:4], "yes" if row[4] else "NO"))
+        return
+
+    print("{:<28}{:>12}{:>12}{:>12}".format(
+        "Agent", "Nodes/sec", "ms@depth{}".format(args.depth), "Stability"))
+    results = run(args.depth, args.positions, args.seed, args.repeat, verbose=True)
+    settings = {"depth": args.depth, "positions": args.positions, "seed": args.seed}
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline["settings"] != settings:
+            sys.exit("The baseline was recorded with different settings: {}".format(
+                baseline["settings"]))
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            sys.exit(1)
+        print("No regressions beyond {:.0%}".format(args.tolerance))
+
+
+if __name__ == "__main__":
+    main()
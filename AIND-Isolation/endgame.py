@@ -0,0 +1,127 @@
+"""This file contains an exact solver for partitioned Isolation endgames.
+
+Once the two players are in disconnected regions of the board (see
+`isolation.Board.is_partitioned()`), neither can block the other any more and
+the game is decided by the length of the longest knight path each player can
+walk inside its own region. The solver finds that path with a depth-first
+search memoized on (position, free squares bitmask) and pruned with the
+colour-parity bound of knight paths.
+"""
+from isolation import knight_tables
+
+
+def popcount(mask):
+    """Return the number of set bits in `mask`."""
+    return bin(mask).count("1")
+
+
+class EndgameSolver:
+    """Longest knight path solver for partitioned positions.
+
+    The memo table is kept between calls, so consecutive moves of the same
+    endgame are mostly answered from it.
+
+    Parameters
+    ----------
+    max_entries : int (optional)
+        The memo table is cleared when it grows beyond this many entries.
+    """
+
+    def __init__(self, max_entries=2**20):
+        self.max_entries = max_entries
+        self.nodes = 0
+        self._size = None
+        self._memo = {}
+
+    def _set_size(self, width, height):
+        """Load the knight tables and colour masks for a board size."""
+        if self._size == (width, height):
+            return
+        self._size = (width, height)
+        self._masks, _, self._cells = knight_tables(width, height)
+        self._colors = [0, 0]
+        for idx, (r, c) in enumerate(self._cells):
+            self._colors[(r + c) % 2] |= 1 << idx
+        self._memo = {}
+
+    def longest_path(self, loc, free, check=None):
+        """Return the number of moves in the longest knight path from square
+        `loc` that only visits squares in the bitmask `free`.
+
+        Parameters
+        ----------
+        loc : int
+            Square index of the starting location.
+
+        free : int
+            Bitmask of the squares that may be visited.
+
+        check : callable (optional)
+            Called every 1024 nodes; may raise to abort the search.
+        """
+        key = (loc, free)
+        length = self._memo.get(key)
+        if length is not None:
+            return length
+
+        self.nodes += 1
+        if check is not None and not self.nodes & 1023:
+            check()
+
+        # knight moves alternate square colours, so a path cannot be longer
+        # than twice the number of squares of the scarcer colour (plus one
+        # if the first step's colour is the more common one)
+        r, c = self._cells[loc]
+        opposite = popcount(free & self._colors[(r + c + 1) % 2])
+        same = popcount(free & self._colors[(r + c) % 2])
+        bound = 2 * min(opposite, same) + int(opposite > same)
+
+        best = 0
+        moves = self._masks[loc] & free
+        while moves and best < bound:
+            bit = moves & -moves
+            moves ^= bit
+            length = 1 + self.longest_path(bit.bit_length() - 1, free & ~bit, check)
+            if length > best:
+                best = length
+
+        if len(self._memo) >= self.max_entries:
+            self._memo.clear()
+        self._memo[key] = best
+        return best
+
+    def solve(self, game, player, check=None):
+        """Return the move that maximizes the remaining path of `player` in a
+        partitioned game, and the number of moves along that path.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            A game state for which `game.is_partitioned()` is True.
+
+        player : object
+            The player to move.
+
+        check : callable (optional)
+            Called periodically during the search; may raise to abort it.
+
+        Returns
+        -------
+        ((int, int), int)
+            The best move, or (-1, -1) if the player has no legal moves, and
+            the length of the longest path starting with that move.
+        """
+        self._set_size(game.width, game.height)
+        region = game.get_region(player)
+        loc = game.get_player_location(player)
+        loc = loc[0] + loc[1] * game.height
+        best_move, best_length = (-1, -1), 0
+        moves = self._masks[loc] & region
+        while moves:
+            bit = moves & -moves
+            moves ^= bit
+            idx = bit.bit_length() - 1
+            length = 1 + self.longest_path(idx, region & ~bit, check)
+            if length > best_length:
+                best_move, best_length = self._cells[idx], length
+        return best_move, best_length
@@ -4,6 +4,25 @@ and include the results in your report.
 """
 import random
 
+from math import isinf
+
+from endgame import EndgameSolver
+from isolation.symmetry import canonical_hash
+from parallel_search import parallel_search
+from sample_players import null_score, open_move_score, improved_score
+from time_manager import TimeManager
+from transposition import TranspositionTable, EXACT, LOWER, UPPER
+
+# Relative width of the null windows of principal variation search; scores
+# must not differ by less than this to be told apart by a scout search
+SCOUT_EPSILON = 1e-9
+
+# With `tt_symmetry`, positions before this ply share transposition table
+# entries with their symmetric variants; later positions are rarely
+# symmetric to one another and use the cheaper Zobrist hash
+SYMMETRY_PLIES = 6
+
+
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
     pass
@@ -43,6 +62,7 @@ def custom_score(game, player):
     
     return float(10 * player_moves - opponent_moves)
 
+
 def custom_score_2(game, player):
     """Calculate the heuristic value of a game state from the point of view
     of the given player.
@@ -77,9 +97,8 @@ def custom_score_2(game, player):
     
     moves_weight = 20
     central_weight = 1
-    w, h = game.width / 2., game.height / 2.
-    y, x = game.get_player_location(player)
-    return float((player_moves - opponent_moves)* moves_weight + ((h - y)**2 + (w - x)**2)*central_weight)
+    center_distance = game.geometry.center_distance[game._location_index(player)]
+    return float((player_moves - opponent_moves)* moves_weight + center_distance*central_weight)
    
     
 def custom_score_3(game, player):
@@ -114,12 +133,84 @@ def custom_score_3(game, player):
     opp_legal_moves = game.get_legal_moves(game.get_opponent(player))
 
     difference_in_moves = len(player_legal_moves) - 2*len(opp_legal_moves)
-    player_posn = game.get_player_location(player)
-    opponent_posn = game.get_player_location(game.get_opponent(player))
-    manhattan_distance = abs(player_posn[0]-opponent_posn[0]) +  abs(player_posn[1]-opponent_posn[1])
+    player_posn = game._location_index(player)
+    opponent_posn = game._location_index(game.get_opponent(player))
+    manhattan_distance = game.geometry.distance[player_posn][opponent_posn]
 
     return(float(difference_in_moves/float(manhattan_distance)))
 
+
+class WeightedScore:
+    """Heuristic with tunable weights, generalizing `custom_score` and
+    `custom_score_2`:
+
+        own * player_moves - opp * opponent_moves + center * center_distance
+
+    where `center_distance` is the squared distance of the player to the
+    center of the board. ``WeightedScore(10, 1, 0)`` scores like
+    `custom_score` and ``WeightedScore(20, 20, 1)`` like `custom_score_2`.
+    Unlike closures, instances can be pickled and sent to worker processes,
+and instances with the same weights compare and hash equal.
+
+    Parameters
+    ----------
+    own, opp, center : float (optional)
+        The weights of the three terms.
+    """
+
+    def __init__(self, own=1., opp=1., center=0.):
+        self.own = own
+        self.opp = opp
+        self.center = center
+
+    def __call__(self, game, player):
+        if game.is_loser(player):
+            return float("-inf")
+
+        if game.is_winner(player):
+            return float("inf")
+
+        player_moves = len(game.get_legal_moves(player))
+        opponent_moves = len(game.get_legal_moves(game.get_opponent(player)))
+        score = self.own * player_moves - self.opp * opponent_moves
+        if self.center:
+            score += self.center * game.geometry.center_distance[game._location_index(player)]
+        return float(score)
+
+    def __repr__(self):
+        return "WeightedScore({!r}, {!r}, {!r})".format(self.own, self.opp, self.center)
+
+    def __eq__(self, other):
+        if not isinstance(other, WeightedScore):
+            return NotImplemented
+        return (self.own, self.opp, self.center) == (other.own, other.opp, other.center)
+
+    def __hash__(self):
+        return hash((WeightedScore, self.own, self.opp, self.center))
+
+    @property
+    def symmetric(self):
+        """True if the score does not change under the board symmetries,
+        i.e., if it has no center term (see `is_symmetric()`).
+        """
+        return not self.center
+
+
+# Heuristics whose value does not change when the board is rotated or
+# reflected. The center distance of `custom_score_2` and `center_score` is
+# measured from (height / 2, width / 2), which is not the center square of a
+# board, so those heuristics are not symmetric.
+SYMMETRIC_SCORES = {null_score, open_move_score, improved_score, custom_score, custom_score_3}
+
+
+def is_symmetric(score_fn):
+    """Return True if `score_fn` gives the same value to every symmetric
+    variant of a position: it is in `SYMMETRIC_SCORES`, or it has a true
+    `symmetric` attribute.
+    """
+    return score_fn in SYMMETRIC_SCORES or getattr(score_fn, "symmetric", False)
+
+
 class IsolationPlayer:
     """Base class for minimax and alphabeta agents -- this class is never
     constructed or tested directly.
@@ -149,10 +240,70 @@ class IsolationPlayer:
         self.TIMER_THRESHOLD = timeout
 
 
-class MinimaxPlayer(IsolationPlayer):
+class SearchPlayer(IsolationPlayer):
+    """Base class of `MinimaxPlayer` and `AlphaBetaPlayer` holding the search
+    options and helpers they share. The first three parameters are those of
+    `IsolationPlayer`.
+
+    Parameters
+    ----------
+    in_place : bool (optional)
+        If True, walk the game tree with `Board.push_move()`/`pop_move()` on
+        the board passed to get_move() instead of allocating a new board with
+        `Board.forecast_move()` at every node.
+
+    time_manager : bool (optional)
+        If True, `self.time_left()` only reads the clock every few nodes
+        through a `TimeManager`, and AlphaBetaPlayer does not start an
+        iteration that is predicted not to finish in time.
+    """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 in_place=False, time_manager=False):
+        super().__init__(search_depth, score_fn, timeout)
+        self.in_place = in_place
+        self.time_manager = TimeManager() if time_manager else None
+
+        # Search statistics of the last call to get_move()
+        self.nodes = 0
+        self.cutoffs = 0
+        self.depth_nodes = []
+
+    def _start_clock(self, time_left):
+        """Install the `time_left` callable of a new move, amortized through
+        the time manager if one is enabled.
+        """
+        if self.time_manager is None:
+            self.time_left = time_left
+        else:
+            self.time_manager.start(time_left)
+            self.time_left = self.time_manager.time_left
+
+    def _check_time(self):
+        """Raise SearchTimeout if the search must be aborted."""
+        if self.time_left() < self.TIMER_THRESHOLD:
+            raise SearchTimeout()
+
+    def _child(self, game, move):
+        """Return the successor of `game` after `move`; in in-place mode this
+        is `game` itself, which must be restored with `_undo()`.
+        """
+        if self.in_place:
+            game.push_move(move)
+            return game
+        return game.forecast_move(move)
+
+    def _undo(self, game):
+        """Revert the move applied to `game` by the matching `_child()` call."""
+        if self.in_place:
+            game.pop_move()
+
+
+class MinimaxPlayer(SearchPlayer):
     """Game-playing agent that chooses a move using depth-limited minimax
     search. You must finish and test this player to make sure it properly uses
     minimax to return a good move before the search time limit expires.
+
+    After each call to get_move(), `nodes` holds the number of nodes expanded.
     """
 
     def get_move(self, game, time_left):
@@ -183,7 +334,8 @@ class MinimaxPlayer(IsolationPlayer):
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        self.time_left = time_left
+        self._start_clock(time_left)
+        self.nodes = 0
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
@@ -205,6 +357,7 @@ class MinimaxPlayer(IsolationPlayer):
     def min_value(self, game, depth): 
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.nodes += 1
         
         moves = game.get_legal_moves()
         if not moves or depth == 0: 
@@ -213,7 +366,10 @@ class MinimaxPlayer(IsolationPlayer):
 
         min_score = float("inf")
         for m in moves: 
-            min_score = min(min_score, self.max_value(game.forecast_move(m), depth -1))
+            try:
+                min_score = min(min_score, self.max_value(self._child(game, m), depth -1))
+            finally:
+                self._undo(game)
             
         return min_score
         
@@ -221,6 +377,7 @@ class MinimaxPlayer(IsolationPlayer):
     def max_value(self, game, depth): 
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.nodes += 1
         
         moves = game.get_legal_moves()
         if not moves or depth == 0: 
@@ -229,7 +386,10 @@ class MinimaxPlayer(IsolationPlayer):
 
         max_score = float("-inf")
         for m in moves : 
-            max_score = max( max_score, self.min_value(game.forecast_move(m), depth -1))
+            try:
+                max_score = max( max_score, self.min_value(self._child(game, m), depth -1))
+            finally:
+                self._undo(game)
 
         return max_score
     
@@ -274,51 +434,282 @@ class MinimaxPlayer(IsolationPlayer):
         """
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.nodes += 1
         legal_moves = game.get_legal_moves()
         if not legal_moves:
             return (-1, -1)
-        return max(legal_moves, key=lambda m: self.min_value(game.forecast_move(m), depth-1))
+        return max(legal_moves, key=lambda m: self._move_value(game, m, depth))
+
+    def _move_value(self, game, move, depth):
+        """Return the minimax value of playing `move` at the root."""
+        try:
+            return self.min_value(self._child(game, move), depth-1)
+        finally:
+            self._undo(game)
 
 
-class AlphaBetaPlayer(IsolationPlayer):
+class AlphaBetaPlayer(SearchPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. You must finish and test this player to
     make sure it returns a good move before the search time limit expires.
+
+    After each call to get_move(), `nodes` holds the number of nodes expanded,
+    `cutoffs` the number of alpha-beta cutoffs and `depth_nodes` the list of
+    (depth, nodes) for every completed iteration.
+
+    The first parameters are those of `SearchPlayer`.
+
+    Parameters
+    ----------
+    tt_size : int (optional)
+        Number of slots in the transposition table kept across search
+        iterations and turns of a game; 0 disables the table.
+
+    move_ordering : bool (optional)
+        If True, search the best move of the previous iteration first, then
+        killer moves, then moves by history score.
+
+    opening_book : `opening_book.OpeningBook` (optional)
+        A book whose move is played without searching whenever the current
+        position is in the book.
+
+    endgame : bool (optional)
+        If True, play partitioned positions perfectly with an exact
+        longest-path `EndgameSolver` instead of heuristic search.
+
+    workers : int (optional)
+        If greater than 1, split the root moves between this many worker
+        processes (see `parallel_search`). `score_fn` must then be
+        picklable, e.g., a module-level function.
+
+    aspiration : float (optional)
+        If positive, each iteration first searches a window of this
+        half-width (in `score_fn` units) around the value of the previous
+        iteration, and searches again with a full window on the side that
+        fails.
+
+    pvs : bool (optional)
+        If True, use principal variation search: every move but the first of
+        a node is first searched with a null window, and only searched again
+        with the full window if it may be better. It saves the most nodes
+        together with `move_ordering`.
+
+    tt_symmetry : bool (optional)
+        If True, the transposition table entries of the positions of the
+        first `SYMMETRY_PLIES` plies are keyed by their canonical form (see
+        `isolation.symmetry.canonical_hash()`), so that symmetric positions
+        share them. The value of `score_fn` must then be invariant under the
+        board symmetries (see `is_symmetric()`), otherwise a ValueError is
+        raised.
     """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 in_place=False, time_manager=False, tt_size=0, move_ordering=False,
+                 opening_book=None, endgame=False, workers=1, aspiration=0., pvs=False,
+                 tt_symmetry=False):
+        if tt_symmetry and not is_symmetric(score_fn):
+            raise ValueError("tt_symmetry requires a score_fn invariant under the "
+                             "board symmetries, not {!r}".format(score_fn))
+        super().__init__(search_depth, score_fn, timeout, in_place, time_manager)
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        self.move_ordering = move_ordering
+        self.opening_book = opening_book
+        self.endgame = EndgameSolver() if endgame else None
+        self.workers = workers
+        self.aspiration = aspiration
+        self.pvs = pvs
+        self.tt_symmetry = tt_symmetry
+        self._last_move_count = None
+
+        # Move ordering state: best move per position (keyed by hash) and
+        # killer moves per ply for the current turn, and history scores for
+        # max (index 1) and min (index 0) nodes aged between turns
+        self._best_moves = {}
+        self._killers = {}
+        self._history = ({}, {})
+        self._root_move_count = 0
+        self.principal_variation = []
+
     def min_value(self, game, depth, alpha, beta): 
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.nodes += 1
         
         moves = game.get_legal_moves()
         if not moves or depth == 0: 
             #Terminal state, return score
             return self.score(game, self)
 
+        if self.tt is not None:
+            value = self._probe(game, depth, alpha, beta)
+            if value is not None:
+                return value
+        alpha_orig, beta_orig = alpha, beta
+        if self.move_ordering:
+            self._order_moves(game, moves, False)
+
         min_score = float("inf")
-        for m in moves: 
-            min_score = min(min_score, self.max_value(game.forecast_move(m), depth -1, alpha, beta))
+        min_move = None
+        for i, m in enumerate(moves): 
+            value = self._child_value(game, m, depth - 1, alpha, beta, False,
+                                      self.pvs and i > 0)
+            if value < min_score or min_move is None:
+                min_score, min_move = value, m
             if min_score <= alpha: 
-                return min_score
+                self.cutoffs += 1
+                if self.move_ordering:
+                    self._record_cutoff(game, m, depth, False)
+                break
             beta = min(beta, min_score)
+
+        if self.move_ordering:
+            self._best_moves[game.hash()] = min_move
+        if self.tt is not None:
+            self._record(game, depth, alpha_orig, beta_orig, min_score, min_move)
         return min_score
         
         
     def max_value(self, game, depth, alpha, beta): 
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.nodes += 1
         
         if depth == 0: 
             #Terminal state, return score
             return self.score(game, self)
+
+        if self.tt is not None:
+            value = self._probe(game, depth, alpha, beta)
+            if value is not None:
+                return value
+        alpha_orig, beta_orig = alpha, beta
         moves = game.get_legal_moves()
+        if self.move_ordering:
+            self._order_moves(game, moves, True)
         
         max_score = float("-inf")
-        for m in moves : 
-            max_score = max( max_score, self.min_value(game.forecast_move(m), depth -1, alpha, beta))
+        max_move = None
+        for i, m in enumerate(moves): 
+            value = self._child_value(game, m, depth - 1, alpha, beta, True,
+                                      self.pvs and i > 0)
+            if value > max_score or max_move is None:
+                max_score, max_move = value, m
             if max_score >= beta: 
-                return max_score
+                self.cutoffs += 1
+                if self.move_ordering:
+                    self._record_cutoff(game, m, depth, True)
+                break
             alpha = max(alpha, max_score)
+
+        if self.move_ordering and max_move is not None:
+            self._best_moves[game.hash()] = max_move
+        if self.tt is not None:
+            self._record(game, depth, alpha_orig, beta_orig, max_score, max_move)
         return max_score
+
+    def _child_value(self, game, move, depth, alpha, beta, is_max, scout):
+        """Return the value of the child of `game` reached by `move`, searched
+        to `depth` plies with the (alpha, beta) window from a max node if
+        `is_max`, or from a min node otherwise.
+
+        With `scout`, the child is first searched with a null window at the
+        bound the move has to beat (alpha at max nodes, beta at min nodes),
+        and searched again with the full window only if it may beat it.
+        """
+        search = self.min_value if is_max else self.max_value
+        child = self._child(game, move)
+        try:
+            bound = alpha if is_max else beta
+            if scout and not isinf(bound):
+                epsilon = SCOUT_EPSILON * max(1., abs(bound))
+                if is_max:
+                    value = search(child, depth, alpha, alpha + epsilon)
+                else:
+                    value = search(child, depth, beta - epsilon, beta)
+                if not alpha < value < beta:
+                    return value
+            return search(child, depth, alpha, beta)
+        finally:
+            self._undo(game)
+
+    def _probe(self, game, depth, alpha, beta):
+        """Return the value stored in the transposition table for `game` if it
+        was searched at least `depth` plies deep and the stored bound decides
+        the (alpha, beta) window, otherwise None.
+        """
+        entry = self.tt.lookup(self._tt_key(game))
+        if entry is None or entry[1] < depth:
+            return None
+        _, _, flag, value, _ = entry
+        if (flag == EXACT or (flag == LOWER and value >= beta) or
+                (flag == UPPER and value <= alpha)):
+            return value
+        return None
+
+    def _record(self, game, depth, alpha, beta, value, move):
+        """Store a search result in the transposition table, classifying it
+        against the (alpha, beta) window the node was searched with.
+        """
+        if value <= alpha:
+            flag = UPPER
+        elif value >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.tt.store(self._tt_key(game), depth, flag, value, move)
+
+    def _tt_key(self, game):
+        """Return the transposition table key of `game`.
+
+        Entries shared by symmetric positions keep the move in the
+        orientation of the position that stored it; the search only reads
+        values back from the table, and orders moves with `_best_moves`.
+        """
+        if self.tt_symmetry and game.move_count < SYMMETRY_PLIES:
+            return canonical_hash(game)[0]
+        return game.hash()
+
+    def _order_moves(self, game, moves, is_max):
+        """Sort `moves` in place: the best move found for this position by the
+        previous iteration first, then the killer moves of this ply, then the
+        remaining moves by decreasing history score.
+        """
+        best = self._best_moves.get(game.hash())
+        killers = self._killers.get(game.move_count - self._root_move_count, ())
+        history = self._history[is_max]
+
+        def priority(move):
+            if move == best:
+                return 3e9
+            if move in killers:
+                return 2e9 - killers.index(move)
+            return history.get(move, 0)
+
+        moves.sort(key=priority, reverse=True)
+
+    def _record_cutoff(self, game, move, depth, is_max):
+        """Update the killer moves and history scores after `move` caused a
+        cutoff at a node searched to `depth` plies.
+        """
+        killers = self._killers.setdefault(game.move_count - self._root_move_count, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        history = self._history[is_max]
+        history[move] = history.get(move, 0) + depth * depth
+
+    def _extract_pv(self, game, depth):
+        """Return the principal variation of the last completed iteration by
+        following the best move stored for each position from the root.
+        """
+        pv = []
+        game = game.copy()
+        while len(pv) < depth:
+            move = self._best_moves.get(game.hash())
+            if move is None or not game.move_is_legal(move):
+                break
+            pv.append(move)
+            game.apply_move(move)
+        return pv
     
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -350,19 +741,69 @@ class AlphaBetaPlayer(IsolationPlayer):
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        self.time_left = time_left
+        self._start_clock(time_left)
+        self.nodes = 0
+        self.cutoffs = 0
+        self.depth_nodes = []
+
+        # The table is only valid for the game it was filled in; each agent
+        # moves at strictly increasing move counts within one game
+        if self.tt is not None:
+            if (self._last_move_count is not None and
+                    game.move_count <= self._last_move_count):
+                self.tt.clear()
+            self._last_move_count = game.move_count
+
+        if self.opening_book is not None:
+            move = self.opening_book.lookup(game)
+            if move is not None and move in game.get_legal_moves():
+                return move
+
+        # Partitioned positions are solved exactly; if the solver runs out of
+        # time, the heuristic search below gets whatever time is left
+        if self.endgame is not None and game.is_partitioned():
+            nodes = self.endgame.nodes
+            try:
+                move, _ = self.endgame.solve(game, self, self._check_time)
+                self.nodes = self.endgame.nodes - nodes
+                return move
+            except SearchTimeout:
+                pass
+
+        if self.workers > 1:
+            return parallel_search(self, game, self.workers)
+
+        # Ordering hints are relative to the root; history scores decay
+        self._best_moves = {}
+        self._killers = {}
+        for history in self._history:
+            for move in history:
+                history[move] //= 2
 
         # Initialize the best move so that this function returns something
         # in case the search fails due to timeout
         best_move = (-1, -1)
+        value = None
         depth = 1
         try:
             # The try/except block will automatically catch the exception
             # raised when the timer is about to expire.
             while 1:
-                move = self.alphabeta(game, depth)
+                start_nodes = self.nodes
+                move, value = self._iterate(game, depth, value)
+                self.depth_nodes.append((depth, self.nodes - start_nodes))
                 if move != (-1, -1): 
                     best_move = move
+                if self.move_ordering:
+                    self.principal_variation = self._extract_pv(game, depth)
+                if self.time_manager is not None:
+                    # Stop once the whole game tree has been searched, or when
+                    # the next iteration is not expected to finish in time
+                    if depth >= len(game.get_blank_spaces()):
+                        break
+                    self.time_manager.iteration_finished()
+                    if not self.time_manager.can_finish_next(self.TIMER_THRESHOLD):
+                        break
                 depth = depth+1
                 
         except SearchTimeout:
@@ -376,6 +817,24 @@ class AlphaBetaPlayer(IsolationPlayer):
         # Return the best move from the last completed search iteration
         return best_move
 
+    def _iterate(self, game, depth, guess=None):
+        """Search `game` to `depth` plies as one iteration of iterative
+        deepening and return the best move and its value. If aspiration
+        windows are enabled and `guess`, the value of the previous iteration,
+        is finite, the search starts with a window around `guess`.
+        """
+        if not self.aspiration or guess is None or isinf(guess):
+            return self._search_root(game, depth)
+        alpha, beta = guess - self.aspiration, guess + self.aspiration
+        while True:
+            move, value = self._search_root(game, depth, alpha, beta)
+            if value <= alpha and not isinf(alpha):
+                alpha = float("-inf")
+            elif value >= beta and not isinf(beta):
+                beta = float("inf")
+            else:
+                return move, value
+
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
         """Implement depth-limited minimax search with alpha-beta pruning as
         described in the lectures.
@@ -421,16 +880,39 @@ class AlphaBetaPlayer(IsolationPlayer):
                 each helper function or else your agent will timeout during
                 testing.
         """
+        return self._search_root(game, depth, alpha, beta)[0]
+
+    def _search_root(self, game, depth, alpha=float("-inf"), beta=float("inf")):
+        """Return the best move of the root `game` searched to `depth` plies
+        with the (alpha, beta) window, and its value; the value is only a
+        bound if it falls outside the window.
+        """
         if self.time_left() < self.TIMER_THRESHOLD:
             raise SearchTimeout()
+        self.nodes += 1
+        self._root_move_count = game.move_count
 
         max_move = (-1, -1)
         max_value = float("-inf")
-        for m in game.get_legal_moves():
-            value = self.min_value(game.forecast_move(m), depth-1, alpha, beta)
+        alpha_orig, beta_orig = alpha, beta
+        moves = game.get_legal_moves()
+        if self.move_ordering:
+            self._order_moves(game, moves, True)
+        for i, m in enumerate(moves):
+            value = self._child_value(game, m, depth - 1, alpha, beta, True,
+                                      self.pvs and i > 0)
             if value > max_value:
                 # Need to take care of setting the alpha value, otherwise it will not be shared among other moves at this level
                 max_move = m
                 max_value = value
                 alpha = max(alpha, max_value)
-        return max_move
+            if max_value >= beta and not isinf(beta):
+                # the aspiration window failed high and is widened
+                self.cutoffs += 1
+                break
+
+        if self.move_ordering and max_move != (-1, -1):
+            self._best_moves[game.hash()] = max_move
+        if self.tt is not None and max_move != (-1, -1):
+            self._record(game, depth, alpha_orig, beta_orig, max_value, max_move)
+        return max_move, max_value
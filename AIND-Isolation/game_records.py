@@ -0,0 +1,244 @@
+"""This file contains a compact binary log of Isolation games and a replayer.
+
+A log file starts with the `MAGIC` bytes and holds one record per game:
+
+    <I  size of the rest of the record in bytes
+    <BBH  board width, board height, number of moves n
+    <H  size m of the metadata
+    m bytes  metadata as a UTF-8 JSON object (agents, seed, termination, ...)
+    n bytes  the square index (row + col * height) of every move, in order
+    n * <f  the time taken by every move in milliseconds (NaN if unknown)
+
+Records are appended one at a time, so a log can be written while a
+tournament is running. `GameLog` loads a whole log into a few flat columns
+(all the moves in a single bytes object, all the move times in a single
+float array, and the offset of every game in them), from which any position
+of any game is rebuilt directly, without replaying the agents or even
+applying the moves one by one:
+
+    log = GameLog.load("games.bin")
+    game = log.position(12, ply=20)  # board after 20 moves of game 12
+
+From the command line, summarize a log or print one of its positions with:
+
+    python game_records.py games.bin
+    python game_records.py games.bin --game 12 --ply 20
+"""
+import argparse
+import json
+import random
+import struct
+
+from array import array
+from collections import namedtuple
+
+from isolation import Board
+
+MAGIC = b"ISOLOG1\n"
+
+_HEADER = struct.Struct("<IBBHH")
+
+GameRecord = namedtuple("GameRecord", ["width", "height", "moves", "times", "meta"])
+
+
+def encode_moves(moves, height):
+    """Return the moves as bytes, one square index per move."""
+    return bytes(row + col * height for row, col in moves)
+
+
+def decode_moves(data, height):
+    """Return the (row, col) moves encoded by `encode_moves()`."""
+    return [(idx % height, idx // height) for idx in data]
+
+
+def write_record(f, record):
+    """Append `record` to the binary file `f`, which must be positioned after
+    the `MAGIC` bytes of a log.
+    """
+    if record.width * record.height > 256:
+        raise ValueError("Boards of more than 256 squares do not fit one byte per move")
+    meta = json.dumps(record.meta, separators=(",", ":")).encode("utf-8")
+    moves = bytes(record.moves)
+    times = array("f", record.times)
+    if len(times) != len(moves):
+        raise ValueError("Expected one time per move")
+    size = _HEADER.size - 4 + len(meta) + len(moves) + 4 * len(times)
+    f.write(_HEADER.pack(size, record.width, record.height, len(moves), len(meta)))
+    f.write(meta)
+    f.write(moves)
+    f.write(times.tobytes())
+
+
+def read_records(f):
+    """Yield the `GameRecord` of every game in the binary file `f`."""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not an Isolation game log")
+    while True:
+        header = f.read(_HEADER.size)
+        if not header:
+            return
+        if len(header) < _HEADER.size:
+            raise ValueError("Truncated game log")
+        size, width, height, count, meta_size = _HEADER.unpack(header)
+        body = f.read(size - _HEADER.size + 4)
+        if len(body) < size - _HEADER.size + 4:
+            raise ValueError("Truncated game log")
+        meta = json.loads(body[:meta_size].decode("utf-8"))
+        moves = body[meta_size:meta_size + count]
+        times = array("f")
+        times.frombytes(body[meta_size + count:])
+        yield GameRecord(width, height, moves, times, meta)
+
+
+class GameLogWriter:
+    """Append game records to a log file, creating it if needed.
+
+    Parameters
+    ----------
+    path : str
+        Path of the log file.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+    def write(self, record):
+        write_record(self.file, record)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameLog:
+    """Columnar view of the games of a log.
+
+    Attributes
+    ----------
+    moves : bytes
+        The square indices of the moves of all the games, back to back.
+
+    times : array<float>
+        The time of every move in milliseconds, aligned with `moves`.
+
+    offsets : array<int>
+        Game i occupies ``moves[offsets[i]:offsets[i + 1]]``.
+
+    sizes : list<(int, int)>
+        The (width, height) of the board of every game.
+
+    meta : list<dict>
+        The metadata of every game.
+    """
+
+    def __init__(self, records=()):
+        moves = bytearray()
+        self.times = array("f")
+        self.offsets = array("I", [0])
+        self.sizes = []
+        self.meta = []
+        for record in records:
+            moves += record.moves
+            self.times.extend(record.times)
+            self.offsets.append(len(moves))
+            self.sizes.append((record.width, record.height))
+            self.meta.append(record.meta)
+        self.moves = bytes(moves)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls(read_records(f))
+
+    def __len__(self):
+        return len(self.meta)
+
+    def record(self, index):
+        """Return the `GameRecord` of game `index`."""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        width, height = self.sizes[index]
+        return GameRecord(width, height, self.moves[start:end],
+                          self.times[start:end], self.meta[index])
+
+    def game_moves(self, index):
+        """Return the (row, col) moves of game `index`."""
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return decode_moves(self.moves[start:end], self.sizes[index][1])
+
+    def position(self, index, ply, player_1="Player1", player_2="Player2", rng=None):
+        """Return the board of game `index` after its first `ply` moves.
+
+        The board is built directly from the moves: every square moved to is
+        blocked, and each player stands on the last square it moved to.
+        Moves are generated in a fixed order unless `rng` is given.
+        """
+        start, end = self.offsets[index], self.offsets[index + 1]
+        if not 0 <= ply <= end - start:
+            raise IndexError("Game {} has {} moves".format(index, end - start))
+        width, height = self.sizes[index]
+        game = Board(player_1, player_2, width, height, rng)
+        state = game._board_state
+        moves = self.moves[start:start + ply]
+        for idx in moves:
+            state[idx] = 1
+        if ply:
+            state[-1 - (ply - 1) % 2] = moves[-1]
+        if ply > 1:
+            state[-1 - ply % 2] = moves[-2]
+        if ply % 2:
+            state[-3] = 1
+            game._active_player, game._inactive_player = player_2, player_1
+        game.move_count = ply
+        game._hash_key = game._compute_hash()
+        return game
+
+    def positions(self, min_ply=0, max_ply=None, count=None, seed=0):
+        """Return the (game index, ply) pairs of the logged positions between
+        `min_ply` and `max_ply` moves, e.g., to build a training or benchmark
+        corpus. If `count` is given, a random sample of that many pairs is
+        drawn.
+        """
+        pairs = []
+        for index in range(len(self)):
+            length = self.offsets[index + 1] - self.offsets[index]
+            last = length if max_ply is None else min(length, max_ply)
+            pairs.extend((index, ply) for ply in range(min_ply, last + 1))
+        if count is not None and count < len(pairs):
+            pairs = random.Random(seed).sample(pairs, count)
+        return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize or replay an Isolation game log.")
+    parser.add_argument("path", help="game log written by tournament.py --record")
+    parser.add_argument("--game", type=int, default=None, help="index of the game to replay")
+    parser.add_argument("--ply", type=int, default=None,
+                        help="number of moves to replay (default: the whole game)")
+    args = parser.parse_args()
+
+    log = GameLog.load(args.path)
+    if args.game is None:
+        print("{:>6}{:>28}{:>8}{:>16}{:>12}".format(
+            "Game", "Players", "Moves", "Termination", "Winner"))
+        for index, meta in enumerate(log.meta):
+            print("{:>6}{:>28}{:>8}{:>16}{:>12}".format(
+                index, " vs ".join(meta["players"]), log.offsets[index + 1] - log.offsets[index],
+                meta["termination"], meta["players"][meta["winner"]]))
+        return
+
+    record = log.record(args.game)
+    ply = len(record.moves) if args.ply is None else args.ply
+    print(log.position(args.game, ply).to_string())
+    print(" ".join("{}{}".format(move, "" if time != time else " {:.1f}ms".format(time))
+                   for move, time in zip(log.game_moves(args.game)[:ply], record.times)))
+
+
+if __name__ == "__main__":
+    main()
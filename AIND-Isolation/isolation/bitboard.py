@@ -0,0 +1,253 @@
+"""
+This file contains the `BitBoard` class, an alternative implementation of
+`isolation.Board` that stores the blocked cells of the game in a single
+integer and looks up knight moves from tables precomputed once per board size.
+
+BitBoard keeps the public API of `Board`, so it can be used anywhere a Board
+is expected (including `Board.play()`). Copying, undoing moves and the
+terminal tests are cheaper than on a Board, and the legal moves are looked up
+by the blocked neighbours of a square instead of tested one by one. The
+search agents and heuristics take most of the time of a search, though: on
+the benchmark corpus, depth-6 alpha-beta with in-place search runs about 25%
+faster on a BitBoard, and searches that copy the board at every node are not
+measurably faster (see ``python benchmark.py --boards``).
+"""
+import random
+
+from .isolation import Board, geometry, knight_tables, zobrist_keys
+
+_MOVE_LISTS = {}
+
+
+def move_lists(width, height):
+    """Return, for each square index of a board of the given size, the dict
+    memoizing the knight moves available from that square by the bitmask of
+    its blocked neighbours. The dicts are filled as positions are met.
+    """
+    key = (width, height)
+    if key not in _MOVE_LISTS:
+        _MOVE_LISTS[key] = [{} for _ in range(width * height)]
+    return _MOVE_LISTS[key]
+
+
+class BitBoard(Board):
+    """Implement a model for the game Isolation assuming each player moves like
+    a knight in chess, using an integer bitmask for the blocked cells.
+
+    The constructor arguments are the same as `isolation.Board`.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7, rng=random):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+
+        self._blocked = 0
+        self._p1_loc = Board.NOT_MOVED
+        self._p2_loc = Board.NOT_MOVED
+        self._undo_stack = []
+        self._zobrist = zobrist_keys(width, height)
+        self._hash_key = 0
+        self._p1_moves = None
+        self._p2_moves = None
+        self.geometry = geometry(width, height)
+        self._rng = rng
+        self._masks, self._neighbors, self._cells = knight_tables(width, height)
+        self._move_lists = move_lists(width, height)
+
+    @classmethod
+    def from_board(cls, board):
+        """Return a BitBoard encoding the same game state as `board`, which
+        may be any `isolation.Board` instance.
+        """
+        if isinstance(board, BitBoard):
+            return board.copy()
+        new_board = cls(board._player_1, board._player_2, width=board.width,
+                        height=board.height, rng=board._rng)
+        new_board.move_count = board.move_count
+        new_board._active_player = board._active_player
+        new_board._inactive_player = board._inactive_player
+        state = board._board_state
+        new_board._blocked = sum(1 << idx for idx in range(board.width * board.height)
+                                 if state[idx] != Board.BLANK)
+        new_board._p1_loc = state[-1]
+        new_board._p2_loc = state[-2]
+        new_board._hash_key = new_board._compute_hash()
+        return new_board
+
+    @property
+    def _board_state(self):
+        """List encoding of the game state in the layout used by `Board`.
+
+        The list is rebuilt on every access; BitBoard overrides every Board
+        method used during a search that reads it, so only serialization and
+        tests pay for it.
+        """
+        size = self.width * self.height
+        state = [int(bool(self._blocked >> idx & 1)) for idx in range(size)]
+        state.append(int(self._active_player == self._player_2))
+        state.append(self._p2_loc)
+        state.append(self._p1_loc)
+        return state
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        new_board = BitBoard.__new__(BitBoard)
+        new_board.__dict__.update(self.__dict__)
+        new_board._undo_stack = []
+        return new_board
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
+                not self._blocked >> (move[0] + move[1] * self.height) & 1)
+
+    def get_blank_spaces(self):
+        """Return a list of the locations that are still available on the board.
+        """
+        blocked = self._blocked
+        return [cell for idx, cell in enumerate(self._cells)
+                if not blocked >> idx & 1]
+
+    def _location_index(self, player):
+        """Return the square index of the player, or None if it has not moved.
+        """
+        if player == self._player_1:
+            return self._p1_loc
+        elif player == self._player_2:
+            return self._p2_loc
+        raise RuntimeError(
+            "Invalid player in get_player_location: {}".format(player))
+
+    def _blocked_mask(self):
+        """Return the blocked squares as a bitmask over square indices."""
+        return self._blocked
+
+    def get_player_location(self, player):
+        """Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (int, int) or None
+            The coordinate pair (row, column) of the input player, or None
+            if the player has not moved.
+        """
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self._cells[idx]
+
+    def _moves_from(self, loc):
+        """Generate the list of possible knight moves from the square index
+        `loc` (see `Board.get_legal_moves`, which caches them).
+        """
+        if loc == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        key = self._masks[loc] & self._blocked
+        moves = self._move_lists[loc].get(key)
+        if moves is None:
+            moves = tuple(move for bit, move in self._neighbors[loc] if not key & bit)
+            self._move_lists[loc][key] = moves
+        valid_moves = list(moves)
+        if self._rng is not None:
+            self._rng.shuffle(valid_moves)
+        return valid_moves
+
+    def apply_move(self, move):
+        """Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        blocked, locations, side = self._zobrist
+        if self._active_player == self._player_2:
+            last_loc, locations = self._p2_loc, locations[1]
+            self._p2_loc = idx
+        else:
+            last_loc, locations = self._p1_loc, locations[0]
+            self._p1_loc = idx
+        if last_loc != Board.NOT_MOVED:
+            self._hash_key ^= locations[last_loc]
+        self._hash_key ^= locations[idx] ^ blocked[idx] ^ side
+        self._blocked |= 1 << idx
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self._p1_moves = self._p2_moves = None
+        self.move_count += 1
+
+    def push_move(self, move):
+        """Apply a move in place and record how to revert it with pop_move()
+        (see `Board.push_move`).
+        """
+        if self._active_player == self._player_2:
+            self._undo_stack.append(self._p2_loc)
+        else:
+            self._undo_stack.append(self._p1_loc)
+        self._undo_stack.append(self._hash_key)
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Revert the most recent move applied with push_move()."""
+        self._hash_key = self._undo_stack.pop()
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        if self._active_player == self._player_2:
+            self._blocked ^= 1 << self._p2_loc
+            self._p2_loc = self._undo_stack.pop()
+        else:
+            self._blocked ^= 1 << self._p1_loc
+            self._p1_loc = self._undo_stack.pop()
+        self._p1_moves = self._p2_moves = None
+        self.move_count -= 1
+
+    def _active_is_stuck(self):
+        """Return True if the active player has no legal moves left."""
+        idx = self._location_index(self._active_player)
+        if idx == Board.NOT_MOVED:
+            return self._blocked == (1 << (self.width * self.height)) - 1
+        return not self._masks[idx] & ~self._blocked
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self._inactive_player and self._active_is_stuck()
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self._active_player and self._active_is_stuck()
+
+    def utility(self, player):
+        """Returns the utility of the current game state from the perspective
+        of the specified player (see `Board.utility`).
+        """
+        if self._active_is_stuck():
+
+            if player == self._inactive_player:
+                return float("inf")
+
+            if player == self._active_player:
+                return float("-inf")
+
+        return 0.
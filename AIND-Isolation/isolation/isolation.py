@@ -10,9 +10,119 @@ be available to project reviewers.
 import random
 import timeit
 from copy import copy
+from itertools import compress
 
 TIME_LIMIT_MILLIS = 250
 
+DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+              (1, -2), (1, 2), (2, -1), (2, 1)]
+
+_GEOMETRIES = {}
+
+
+class Geometry:
+    """Precomputed tables for a board of the given size, shared by every
+    board with the same dimensions through `geometry()`.
+
+    Squares are indexed the same way as `Board._board_state`, i.e.,
+    ``idx = row + col * height``.
+
+    Attributes
+    ----------
+    cells : list<(int, int)>
+        The (row, col) coordinates of each square.
+
+    neighbors : list<list<(int, (int, int))>>
+        For each square, the (index, (row, col)) pairs of the squares a knight
+        can reach from it.
+
+    masks : list<int>
+        For each square, the bitmask of the squares a knight can reach.
+
+    bits : list<int>
+        For each square, the bitmask of the square itself.
+
+    center_distance : list<float>
+        For each square, the squared distance to the point (height / 2,
+        width / 2), as computed by `sample_players.center_score`.
+
+    distance : list<list<int>>
+        The Manhattan distance between every pair of squares.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.cells = [(idx % height, idx // height) for idx in range(width * height)]
+        self.neighbors = [[(r + dr + (c + dc) * height, (r + dr, c + dc))
+                           for dr, dc in DIRECTIONS
+                           if 0 <= r + dr < height and 0 <= c + dc < width]
+                          for r, c in self.cells]
+        self.masks = [sum(1 << idx for idx, _ in pairs) for pairs in self.neighbors]
+        self.bits = [1 << idx for idx in range(width * height)]
+        w, h = width / 2., height / 2.
+        self.center_distance = [(h - r)**2 + (w - c)**2 for r, c in self.cells]
+        self.distance = [[abs(r1 - r2) + abs(c1 - c2) for r2, c2 in self.cells]
+                         for r1, c1 in self.cells]
+
+
+def geometry(width, height):
+    """Return the `Geometry` of a board of the given size, building it on
+    first use.
+    """
+    key = (width, height)
+    if key not in _GEOMETRIES:
+        _GEOMETRIES[key] = Geometry(width, height)
+    return _GEOMETRIES[key]
+
+
+_KNIGHT_TABLES = {}
+
+
+def knight_tables(width, height):
+    """Return the knight-move tables for a board of the given size in the
+    form used by bitmask code, from the shared `geometry()` of that size.
+
+    Returns
+    -------
+    (list<int>, list<list<(int, (int, int))>>, list<(int, int)>)
+        For each square index: the bitmask of the squares a knight can reach,
+        the list of (bit, (row, col)) pairs for those squares, and the
+        (row, col) coordinates of the square itself.
+    """
+    key = (width, height)
+    if key not in _KNIGHT_TABLES:
+        geo = geometry(width, height)
+        neighbors = [[(1 << idx, move) for idx, move in pairs] for pairs in geo.neighbors]
+        _KNIGHT_TABLES[key] = (geo.masks, neighbors, geo.cells)
+    return _KNIGHT_TABLES[key]
+
+
+_ZOBRIST_KEYS = {}
+
+
+def zobrist_keys(width, height):
+    """Return the Zobrist keys used to hash boards of the given size.
+
+    The keys are drawn from a generator seeded by the board size, so every
+    process computes the same hash for the same position.
+
+    Returns
+    -------
+    (list<int>, (list<int>, list<int>), int)
+        The key of each blocked square, the keys of each location for player
+        1 and player 2, and the key toggled whenever the initiative changes.
+    """
+    size = (width, height)
+    if size not in _ZOBRIST_KEYS:
+        rng = random.Random(1000 * width + height)
+        cells = width * height
+        blocked = [rng.getrandbits(64) for _ in range(cells)]
+        locations = ([rng.getrandbits(64) for _ in range(cells)],
+                     [rng.getrandbits(64) for _ in range(cells)])
+        _ZOBRIST_KEYS[size] = (blocked, locations, rng.getrandbits(64))
+    return _ZOBRIST_KEYS[size]
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -33,11 +143,17 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    rng : `random.Random` or None (optional)
+        The generator used to shuffle the legal moves, shared with every copy
+        of the board. The global `random` module is used by default; pass a
+        seeded `random.Random` to make the move order reproducible, or None
+        to return the legal moves in a fixed order without shuffling.
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    def __init__(self, player_1, player_2, width=7, height=7, rng=random):
         self.width = width
         self.height = height
         self.move_count = 0
@@ -52,8 +168,44 @@ class Board(object):
         self._board_state[-1] = Board.NOT_MOVED
         self._board_state[-2] = Board.NOT_MOVED
 
+        # Move and distance tables shared by all boards of this size
+        self.geometry = geometry(width, height)
+        self._rng = rng
+
+        # Flat stack of (square index, previous location, previous hash)
+        # triples recorded by push_move() so that pop_move() can restore the
+        # previous state
+        self._undo_stack = []
+
+        # Zobrist hash of the current state, updated incrementally by
+        # apply_move()
+        self._zobrist = zobrist_keys(width, height)
+        self._hash_key = 0
+
+        # Legal moves of each player in the current state, generated on the
+        # first query and dropped by every move; heuristics, terminal tests
+        # and the search ask for the same lists several times per node
+        self._p1_moves = None
+        self._p2_moves = None
+
     def hash(self):
-        return str(self._board_state).__hash__()
+        return self._hash_key
+
+    def _compute_hash(self):
+        """Compute the Zobrist hash of the current state from scratch."""
+        blocked, locations, side = self._zobrist
+        state = self._board_state
+        key = 0
+        for idx in range(self.width * self.height):
+            if state[idx] != Board.BLANK:
+                key ^= blocked[idx]
+        if state[-1] != Board.NOT_MOVED:
+            key ^= locations[0][state[-1]]
+        if state[-2] != Board.NOT_MOVED:
+            key ^= locations[1][state[-2]]
+        if self._active_player == self._player_2:
+            key ^= side
+        return key
 
     @property
     def active_player(self):
@@ -92,11 +244,15 @@ class Board(object):
 
     def copy(self):
         """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+        new_board = Board(self._player_1, self._player_2, width=self.width,
+                          height=self.height, rng=self._rng)
         new_board.move_count = self.move_count
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
         new_board._board_state = copy(self._board_state)
+        new_board._hash_key = self._hash_key
+        new_board._p1_moves = self._p1_moves
+        new_board._p2_moves = self._p2_moves
         return new_board
 
     def forecast_move(self, move):
@@ -187,8 +343,20 @@ class Board(object):
             for the player constrained by the current game state.
         """
         if player is None:
-            player = self.active_player
-        return self.__get_moves(self.get_player_location(player))
+            player = self._active_player
+        # The cached lists are never handed out, so callers may modify the
+        # returned copies (e.g., sort them) and copies of the board may share
+        # them
+        if player == self._player_1:
+            if self._p1_moves is None:
+                self._p1_moves = self._moves_from(self._location_index(player))
+            return list(self._p1_moves)
+        elif player == self._player_2:
+            if self._p2_moves is None:
+                self._p2_moves = self._moves_from(self._location_index(player))
+            return list(self._p2_moves)
+        raise RuntimeError(
+            "Invalid player in get_legal_moves: {}".format(player))
 
     def apply_move(self, move):
         """Move the active player to a specified location.
@@ -201,12 +369,111 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         last_move_idx = int(self.active_player == self._player_2) + 1
+        blocked, locations, side = self._zobrist
+        locations = locations[last_move_idx - 1]
+        last_loc = self._board_state[-last_move_idx]
+        if last_loc != Board.NOT_MOVED:
+            self._hash_key ^= locations[last_loc]
+        self._hash_key ^= locations[idx] ^ blocked[idx] ^ side
         self._board_state[-last_move_idx] = idx
         self._board_state[idx] = 1
         self._board_state[-3] ^= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self._p1_moves = self._p2_moves = None
         self.move_count += 1
 
+    def push_move(self, move):
+        """Apply a move in place like apply_move(), and record the information
+        required to revert it with pop_move().
+
+        Search algorithms can use push_move()/pop_move() pairs to walk the
+        game tree on a single board instead of allocating a new board at every
+        node with forecast_move(). Moves must be popped in the reverse order
+        they were pushed, and apply_move() must not be called in between.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        last_move_idx = int(self._active_player == self._player_2) + 1
+        self._undo_stack.append(move[0] + move[1] * self.height)
+        self._undo_stack.append(self._board_state[-last_move_idx])
+        self._undo_stack.append(self._hash_key)
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Revert the most recent move applied with push_move()."""
+        self._hash_key = self._undo_stack.pop()
+        last_loc = self._undo_stack.pop()
+        idx = self._undo_stack.pop()
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        last_move_idx = int(self._active_player == self._player_2) + 1
+        self._board_state[-last_move_idx] = last_loc
+        self._board_state[idx] = Board.BLANK
+        self._board_state[-3] ^= 1
+        self._p1_moves = self._p2_moves = None
+        self.move_count -= 1
+
+    def _location_index(self, player):
+        """Return the square index of the player, or None if it has not moved.
+        """
+        if player == self._player_1:
+            return self._board_state[-1]
+        elif player == self._player_2:
+            return self._board_state[-2]
+        raise RuntimeError(
+            "Invalid player in get_player_location: {}".format(player))
+
+    def _blocked_mask(self):
+        """Return the blocked squares as a bitmask over square indices."""
+        bits = self.geometry.bits
+        return sum(compress(bits, self._board_state[:len(bits)]))
+
+    def get_region(self, player):
+        """Return the blank squares that the specified player can reach with
+        any number of knight moves, as a bitmask over square indices
+        (``idx = row + col * height``).
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        int
+            The bitmask of reachable squares; every blank square if the
+            player has not moved yet.
+        """
+        free = ~self._blocked_mask() & ((1 << (self.width * self.height)) - 1)
+        loc = self._location_index(player)
+        if loc == Board.NOT_MOVED:
+            return free
+        masks = self.geometry.masks
+        region = 0
+        frontier = masks[loc] & free
+        while frontier:
+            region |= frontier
+            reach = 0
+            while frontier:
+                bit = frontier & -frontier
+                reach |= masks[bit.bit_length() - 1]
+                frontier ^= bit
+            frontier = reach & free & ~region
+        return region
+
+    def is_partitioned(self):
+        """Return True if both players have moved and no blank square can be
+        reached by both of them, so that the players can no longer interfere
+        with each other.
+        """
+        if (self._location_index(self._player_1) == Board.NOT_MOVED or
+                self._location_index(self._player_2) == Board.NOT_MOVED):
+            return False
+        return not self.get_region(self._player_1) & self.get_region(self._player_2)
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self._inactive_player and not self.get_legal_moves(self._active_player)
@@ -247,19 +514,18 @@ class Board(object):
 
         return 0.
 
-    def __get_moves(self, loc):
+    def _moves_from(self, loc):
         """Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+        knight in chess) from the square index `loc`.
         """
         if loc == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = loc
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2), (1, 2), (2, -1), (2, 1)]
-        valid_moves = [(r + dr, c + dc) for dr, dc in directions
-                       if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
+        state = self._board_state
+        valid_moves = [move for idx, move in self.geometry.neighbors[loc]
+                       if state[idx] == Board.BLANK]
+        if self._rng is not None:
+            self._rng.shuffle(valid_moves)
         return valid_moves
 
     def print_board(self):
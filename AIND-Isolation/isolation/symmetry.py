@@ -0,0 +1,185 @@
+"""
+This file contains helpers for the symmetries of the Isolation board.
+
+Knight moves are preserved by every rotation and reflection of the board, so
+positions that differ only by such a transformation have the same value and
+their best moves map onto each other. A square board has 8 symmetries (the
+dihedral group of the square); any other rectangle has 4.
+
+Squares are indexed as in `Board._board_state`, i.e., ``idx = row + col *
+height``, and a symmetry is represented by the permutation of square indices
+it induces. Bitmasks of squares are transformed a byte at a time with the
+lookup tables of `byte_tables()`.
+"""
+from .isolation import Board
+
+_SYMMETRIES = {}
+_BYTE_TABLES = {}
+
+# Tag setting the canonical hashes apart from the 64-bit Zobrist hashes
+_CANONICAL_TAG = 1 << 64
+_MASK64 = (1 << 64) - 1
+
+
+def symmetries(width, height):
+    """Return the list of square-index permutations for the symmetries of a
+    board of the given size. The first permutation is always the identity.
+    """
+    size = (width, height)
+    if size not in _SYMMETRIES:
+        h, w = height - 1, width - 1
+        transforms = [lambda r, c: (r, c),
+                      lambda r, c: (h - r, c),
+                      lambda r, c: (r, w - c),
+                      lambda r, c: (h - r, w - c)]
+        if width == height:
+            transforms += [lambda r, c: (c, r),
+                           lambda r, c: (c, h - r),
+                           lambda r, c: (w - c, r),
+                           lambda r, c: (w - c, h - r)]
+        perms = []
+        for transform in transforms:
+            perm = []
+            for idx in range(width * height):
+                r, c = transform(idx % height, idx // height)
+                perm.append(r + c * height)
+            perms.append(perm)
+        _SYMMETRIES[size] = perms
+    return _SYMMETRIES[size]
+
+
+def byte_tables(width, height):
+    """Return, for each symmetry of `symmetries(width, height)`, the list of
+    256-entry tables mapping the value of each byte of a bitmask of squares
+    (least significant byte first) to the transformed squares of that byte.
+    """
+    size = (width, height)
+    if size not in _BYTE_TABLES:
+        cells = width * height
+        tables = []
+        for perm in symmetries(width, height):
+            chunks = []
+            for base in range(0, cells, 8):
+                table = [0] * 256
+                for bit in range(min(8, cells - base)):
+                    target = 1 << perm[base + bit]
+                    for byte in range(1 << bit, 256, 2 << bit):
+                        for value in range(byte, byte + (1 << bit)):
+                            table[value] |= target
+                chunks.append(table)
+            tables.append(chunks)
+        _BYTE_TABLES[size] = tables
+    return _BYTE_TABLES[size]
+
+
+def transform_mask(mask, sym, width, height):
+    """Return the bitmask of squares `mask` mapped through symmetry `sym`."""
+    data = mask.to_bytes((width * height + 7) // 8, "little")
+    result = 0
+    for table, byte in zip(byte_tables(width, height)[sym], data):
+        result |= table[byte]
+    return result
+
+
+def inverse(perm):
+    """Return the inverse of a square-index permutation."""
+    inv = [0] * len(perm)
+    for idx, target in enumerate(perm):
+        inv[target] = idx
+    return inv
+
+
+def location_bits(cells):
+    """Return the width of the player location fields of the position keys
+    of a board with `cells` squares: 7 bits, or more for boards of more than
+    127 squares, so that every square index + 1 fits.
+    """
+    return max(7, cells.bit_length())
+
+
+def position_key(blocked, p1_loc, p2_loc, p2_to_move, cells):
+    """Pack a position into one integer.
+
+    The low `cells` bits hold the blocked squares, followed by
+    `location_bits(cells)` bits for each player location (square index + 1,
+    or 0 if the player has not moved) and one bit for the initiative.
+    """
+    bits = location_bits(cells)
+    p1 = 0 if p1_loc == Board.NOT_MOVED else p1_loc + 1
+    p2 = 0 if p2_loc == Board.NOT_MOVED else p2_loc + 1
+    return (blocked | (p1 << cells) | (p2 << (cells + bits)) |
+            (int(p2_to_move) << (cells + 2 * bits)))
+
+
+def canonical_key(game):
+    """Return the canonical key of a game state and the index of the symmetry
+    that maps the state onto its canonical orientation.
+
+    The canonical key is the smallest `position_key` over all symmetries of
+    the board, so every symmetric variant of a position gets the same key.
+    The player locations occupy the high bits of the key, so they are
+    compared first and the blocked squares are only transformed for the
+    symmetries that tie on the locations -- usually a single one once both
+    players have moved.
+
+    Returns
+    -------
+    (int, int)
+        The canonical key, and the index into `symmetries(width, height)` of
+        the transformation that produced it.
+    """
+    width, height = game.width, game.height
+    cells = width * height
+    p1_loc = game._location_index(game._player_1)
+    p2_loc = game._location_index(game._player_2)
+    p2_to_move = game.active_player is game._player_2
+
+    best_locs, candidates = None, []
+    for sym, perm in enumerate(symmetries(width, height)):
+        locs = (0 if p2_loc == Board.NOT_MOVED else perm[p2_loc] + 1,
+                0 if p1_loc == Board.NOT_MOVED else perm[p1_loc] + 1)
+        if best_locs is None or locs < best_locs:
+            best_locs, candidates = locs, [sym]
+        elif locs == best_locs:
+            candidates.append(sym)
+
+    blocked = game._blocked_mask()
+    best = None
+    for sym in candidates:
+        mask = transform_mask(blocked, sym, width, height) if sym else blocked
+        if best is None or mask < best[0]:
+            best = (mask, sym)
+    p2, p1 = best_locs
+    bits = location_bits(cells)
+    key = (best[0] | (p1 << cells) | (p2 << (cells + bits)) |
+           (int(p2_to_move) << (cells + 2 * bits)))
+    return key, best[1]
+
+
+def canonical_hash(game):
+    """Return a hash of the canonical key of a game state, for use as a
+    `TranspositionTable` key shared by all the symmetric variants of the
+    state, and the index of its symmetry (see `canonical_key()`).
+
+    The low 64 bits of the key are mixed (with the bijective SplitMix64
+    finalizer) so that the low bits selecting a table slot depend on the
+    whole position, and tagged above 64 bits so that they never equal a
+    Zobrist hash. Keys of boards of more than 49 squares are longer than 64
+    bits; their high bits are kept above the tag, so the hash stays unique.
+    """
+    key, sym = canonical_key(game)
+    mixed = key & _MASK64
+    mixed = (mixed ^ mixed >> 30) * 0xbf58476d1ce4e5b9 & _MASK64
+    mixed = (mixed ^ mixed >> 27) * 0x94d049bb133111eb & _MASK64
+    return (mixed ^ mixed >> 31) | _CANONICAL_TAG | (key >> 64 << 65), sym
+
+
+def transform_move(move, sym, width, height, reverse=False):
+    """Map a (row, column) move through symmetry `sym`; with `reverse=True`,
+    map a move from the transformed orientation back to the original one.
+    """
+    perm = symmetries(width, height)[sym]
+    if reverse:
+        perm = inverse(perm)
+    idx = perm[move[0] + move[1] * height]
+    return (idx % height, idx // height)
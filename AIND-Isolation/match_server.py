@@ -0,0 +1,258 @@
+"""This file contains an asyncio match server that runs every Isolation agent
+in a separate worker process.
+
+`Board.play()` calls `get_move()` in the same process as the tournament, so
+an agent that hangs, crashes or leaks memory takes the whole tournament down
+with it. `MatchServer` keeps the board in the server process and hosts each
+seat of each game in a worker process instead. The two processes talk over
+the worker's stdin/stdout with length-prefixed pickled messages:
+
+    ("init", player, seed)        -> ("ready",)
+    ("move", state, time_limit)   -> ("move", move, time_left)
+                                  or ("error", traceback)
+
+The worker rebuilds the board from the plain board state (see
+`parallel_search.encode_state()`) at every move, and keeps the player object
+for the whole game, so agents keep their state between moves as they do
+under `Board.play()`.
+
+Time is accounted as in `Board.play()`: the worker measures the time left
+when `get_move()` returns, and a negative value loses the game by timeout,
+whatever the cost of the messages. The server also enforces the budget
+externally: a worker that has not answered `HARD_MARGIN` milliseconds after
+the time limit is killed and its agent loses by timeout. An agent that
+raises an exception or whose process dies loses with the termination
+"crash". Games run concurrently, one active search per core by default:
+
+    server = MatchServer(concurrency=4)
+    results = server.run([(player_1, player_2, opening, seed), ...])
+    server.close()
+"""
+import asyncio
+import os
+import pickle
+import random
+import struct
+import sys
+import traceback
+
+from timeit import default_timer
+
+from isolation import Board, BitBoard
+from parallel_search import decode_state
+
+TIME_LIMIT = 150  # milliseconds per move, as in tournament.py
+
+# Milliseconds a worker may overrun the time limit before it is killed
+HARD_MARGIN = 1000
+
+_FRAME = struct.Struct("<I")
+
+
+def _encode(message):
+    data = pickle.dumps(message, pickle.HIGHEST_PROTOCOL)
+    return _FRAME.pack(len(data)) + data
+
+
+def worker_main():
+    """Serve the requests of a `MatchServer` on stdin/stdout."""
+    # The protocol owns the original stdout; anything the agents print goes
+    # to stderr instead of corrupting it
+    out = os.fdopen(os.dup(1), "wb")
+    os.dup2(2, 1)
+    inp = sys.stdin.buffer
+    player = None
+    while True:
+        header = inp.read(_FRAME.size)
+        if len(header) < _FRAME.size:
+            return
+        message = pickle.loads(inp.read(_FRAME.unpack(header)[0]))
+        try:
+            if message[0] == "init":
+                _, player, seed = message
+                random.seed(seed)
+                reply = ("ready",)
+            else:
+                _, state, time_limit = message
+                game = decode_state(state, player)
+                start = default_timer()
+                time_left = lambda: time_limit - 1000 * (default_timer() - start)
+                move = player.get_move(game, time_left)
+                reply = ("move", move, time_left())
+        except Exception:
+            reply = ("error", traceback.format_exc())
+        out.write(_encode(reply))
+        out.flush()
+
+
+class AgentCrashed(Exception):
+    """The worker process of an agent raised an exception or died."""
+    pass
+
+
+class AgentProcess:
+    """Handle on one worker process of a `MatchServer`."""
+
+    def __init__(self, process):
+        self.process = process
+
+    @classmethod
+    async def spawn(cls):
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--worker",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE)
+        return cls(process)
+
+    async def _read(self):
+        header = await self.process.stdout.readexactly(_FRAME.size)
+        data = await self.process.stdout.readexactly(_FRAME.unpack(header)[0])
+        return pickle.loads(data)
+
+    async def request(self, message, timeout=None):
+        """Send `message` and return the reply. Raise `asyncio.TimeoutError`
+        if there is no reply within `timeout` seconds, or `AgentCrashed` if
+        the agent raised an exception or the process died.
+        """
+        try:
+            self.process.stdin.write(_encode(message))
+            await self.process.stdin.drain()
+            reply = await asyncio.wait_for(self._read(), timeout)
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            raise AgentCrashed("worker process died") from e
+        if reply[0] == "error":
+            raise AgentCrashed(reply[1])
+        return reply
+
+    async def kill(self):
+        if self.process.returncode is None:
+            self.process.kill()
+        await self.process.wait()
+
+    async def close(self):
+        self.process.stdin.close()
+        await self.process.wait()
+
+
+class MatchServer:
+    """Play Isolation games with every agent in its own worker process.
+
+    Parameters
+    ----------
+    concurrency : int (optional)
+        Number of games played at the same time; defaults to the number of
+        cores. Each game uses two worker processes, only one of which is
+        searching at any time.
+
+    time_limit : numeric (optional)
+        Milliseconds allowed for each move.
+
+    board_cls : callable (optional)
+        Board class (e.g., `Board` or `BitBoard`) the games are played on.
+    """
+
+    def __init__(self, concurrency=None, time_limit=TIME_LIMIT, board_cls=Board):
+        self.concurrency = concurrency or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.board_cls = board_cls
+        self._idle = []
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+
+    async def _acquire(self):
+        if self._idle:
+            return self._idle.pop()
+        return await AgentProcess.spawn()
+
+    async def play_game(self, player_1, player_2, opening=(), seed=None):
+        """Play one game between two picklable players, after applying the
+        `opening` moves, and return the result.
+
+        Returns
+        -------
+        (int, list<(int, int)>, str, list<float>)
+            The seat of the winner (0 for `player_1`, 1 for `player_2`), the
+            moves played after the opening, the termination reason ("illegal
+            move", "forfeit" or "timeout" as returned by `Board.play()`, or
+            "crash"), and the milliseconds each move took as measured by the
+            worker.
+        """
+        game = self.board_cls("Player1", "Player2")
+        for move in opening:
+            game.apply_move(move)
+        seed = random.getrandbits(32) if seed is None else seed
+        agents = [await self._acquire(), await self._acquire()]
+        healthy = [True, True]
+        history, times = [], []
+        try:
+            seat = 0
+            try:
+                for seat, player in enumerate((player_1, player_2)):
+                    await agents[seat].request(("init", player, seed + seat))
+
+                while True:
+                    seat = int(game.active_player == game._player_2)
+                    legal_moves = game.get_legal_moves()
+                    state = (game.width, game.height, list(game._board_state), game.move_count,
+                             seat == 0, isinstance(game, BitBoard), game._rng is None)
+                    _, move, time_left = await agents[seat].request(
+                        ("move", state, self.time_limit),
+                        (self.time_limit + HARD_MARGIN) / 1000)
+
+                    if move is None:
+                        move = Board.NOT_MOVED
+                    if time_left < 0:
+                        return 1 - seat, history, "timeout", times
+                    if move not in legal_moves:
+                        if legal_moves:
+                            return 1 - seat, history, "forfeit", times
+                        return 1 - seat, history, "illegal move", times
+
+                    history.append(move)
+                    times.append(self.time_limit - time_left)
+                    game.apply_move(move)
+            except asyncio.TimeoutError:
+                healthy[seat] = False
+                return 1 - seat, history, "timeout", times
+            except AgentCrashed:
+                healthy[seat] = False
+                return 1 - seat, history, "crash", times
+        finally:
+            for agent, ok in zip(agents, healthy):
+                if ok:
+                    self._idle.append(agent)
+                else:
+                    await agent.kill()
+
+    async def play_games(self, games):
+        """Play the (player_1, player_2, opening, seed) `games` with at most
+        `concurrency` of them at a time, and return their results in order.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def play(game):
+            async with semaphore:
+                return await self.play_game(*game)
+
+        return await asyncio.gather(*[play(game) for game in games])
+
+    def run(self, games):
+        """Synchronous version of `play_games()`."""
+        return self._loop.run_until_complete(self.play_games(games))
+
+    def close(self):
+        """Stop the idle worker processes and the event loop."""
+        idle, self._idle = self._idle, []
+        if idle:
+            self._loop.run_until_complete(asyncio.gather(*[agent.close() for agent in idle]))
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--worker"]:
+        worker_main()
@@ -0,0 +1,224 @@
+"""This file contains a Monte Carlo tree search (UCT) agent for knight
+Isolation.
+
+The agent never copies boards: the tree is walked and the random playouts
+are run on a position reduced to three integers -- the bitmask of blocked
+squares and the square indices of the player to move and of the waiting
+player -- with the knight tables of `isolation.knight_tables()`. The subtree
+of the position reached after the agent's move and the opponent's reply is
+kept as the root of the next search.
+"""
+from math import log, sqrt
+from random import random
+
+from isolation import Board, knight_tables
+
+_STEPS = {}
+
+
+def knight_steps(width, height):
+    """Return, for each square index, the list of (bit, index) pairs of the
+    squares a knight can reach from it, repeated twice so that the playouts
+    can scan the moves from any starting offset with a single slice.
+    """
+    key = (width, height)
+    if key not in _STEPS:
+        _, neighbors, _ = knight_tables(width, height)
+        _STEPS[key] = [[(bit, bit.bit_length() - 1) for bit, _ in pairs] * 2
+                       for pairs in neighbors]
+    return _STEPS[key]
+
+
+class _Node:
+    """Search tree node for the position reached by `move`.
+
+    `wins` counts the playouts won by the player who made `move`. Nodes do
+    not link back to their parent, so that discarded subtrees are freed by
+    reference counting instead of by the cyclic garbage collector in the
+    middle of a later move.
+    """
+
+    __slots__ = ("move", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, untried):
+        self.move = move
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.
+
+
+class MCTSPlayer:
+    """Game-playing agent that chooses a move with Monte Carlo tree search
+    and the UCT selection rule.
+
+    Parameters
+    ----------
+    exploration : float (optional)
+        Exploration constant of the UCT formula.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is aborted.
+
+    check_interval : int (optional)
+        Number of playouts between two calls to `time_left()`.
+
+    reuse_tree : bool (optional)
+        If True, keep the subtree of the current position between moves.
+
+    After each call to get_move(), `playouts` holds the number of playouts
+    run for the move.
+    """
+
+    def __init__(self, exploration=sqrt(2), timeout=10., check_interval=32,
+                 reuse_tree=True):
+        self.exploration = exploration
+        self.TIMER_THRESHOLD = timeout
+        self.check_interval = check_interval
+        self.reuse_tree = reuse_tree
+        self.playouts = 0
+        self._tree = None
+
+    def _moves(self, blocked, loc):
+        """Return the square indices the player at `loc` can move to."""
+        if loc is Board.NOT_MOVED:
+            return [idx for idx in range(self._cells) if not blocked >> idx & 1]
+        steps = self._steps[loc]
+        return [idx for bit, idx in steps[:len(steps) // 2] if not blocked & bit]
+
+    def _find_root(self, size, state):
+        """Return the node of the previous search for the position `state`
+        on a board of the given size, or None if there is none.
+        """
+        tree, self._tree = self._tree, None
+        if tree is None or not self.reuse_tree or tree[0] != size:
+            return None
+        # the position must follow from the previous root by our move and
+        # one opponent move
+        _, root, move, blocked = tree
+        if state[1] != move or state[0] != blocked | 1 << move | 1 << state[2]:
+            return None
+        for child in root.children:
+            if child.move == move:
+                for grandchild in child.children:
+                    if grandchild.move == state[2]:
+                        return grandchild
+        return None
+
+    def get_move(self, game, time_left):
+        """Search for the best move until the time runs out.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            The most visited legal move; (-1, -1) if there are no legal moves.
+        """
+        size = (game.width, game.height)
+        self._steps = knight_steps(*size)
+        self._cells = game.width * game.height
+        blocked = game._blocked_mask()
+        state = (blocked, game._location_index(self),
+                 game._location_index(game.get_opponent(self)))
+
+        # the rest of the previous tree is freed here, where the time it takes
+        # is accounted for by the clock checks of the search below
+        root = self._find_root(size, state)
+        if root is None:
+            root = _Node(None, self._moves(blocked, state[1]))
+        if not root.children and not root.untried:
+            return (-1, -1)
+
+        self.playouts = 0
+        while True:
+            for _ in range(self.check_interval):
+                self._playout(root, state)
+            self.playouts += self.check_interval
+            if time_left() < self.TIMER_THRESHOLD:
+                break
+
+        best = max(root.children, key=lambda child: child.visits)
+        self._tree = (size, root, best.move, blocked)
+        return (best.move % game.height, best.move // game.height)
+
+    def _playout(self, root, state):
+        """Run one selection, expansion, simulation and backpropagation step
+        from `root`, the position `state` = (blocked, loc, other) with the
+        player at `loc` to move.
+        """
+        blocked, loc, other = state
+        node = root
+        path = [root]
+        c = self.exploration
+
+        # selection
+        while not node.untried and node.children:
+            log_visits = log(node.visits)
+            best, best_value = None, -1.
+            for child in node.children:
+                value = child.wins / child.visits + c * sqrt(log_visits / child.visits)
+                if value > best_value:
+                    best, best_value = child, value
+            node = best
+            path.append(node)
+            blocked |= 1 << node.move
+            loc, other = other, node.move
+
+        # expansion
+        if node.untried:
+            untried = node.untried
+            i = int(random() * len(untried))
+            move = untried[i]
+            untried[i] = untried[-1]
+            untried.pop()
+            blocked |= 1 << move
+            loc, other = other, move
+            node = _Node(move, self._moves(blocked, loc))
+            path[-1].children.append(node)
+            path.append(node)
+
+        # simulation: the player to move at the end has no moves and loses;
+        # `mover_lost` tracks whether that is the player to move at `node`
+        mover_lost = True
+        while loc is Board.NOT_MOVED:
+            options = self._moves(blocked, loc)
+            move = options[int(random() * len(options))]
+            blocked |= 1 << move
+            loc, other = other, move
+            mover_lost = not mover_lost
+
+        # each move is the first open square in the knight moves scanned
+        # from a random offset, which is much cheaper than listing the
+        # open squares and nearly as random
+        steps = self._steps
+        while True:
+            ring = steps[loc]
+            n = len(ring) >> 1
+            start = int(random() * n)
+            for bit, move in ring[start:start + n]:
+                if not blocked & bit:
+                    break
+            else:
+                break
+            blocked |= bit
+            loc, other = other, move
+            mover_lost = not mover_lost
+
+        # backpropagation: `node.move` was made by the player not to move
+        # at `node`, who won if the player to move at `node` lost
+        won = mover_lost
+        for node in reversed(path):
+            node.visits += 1
+            if won:
+                node.wins += 1
+            won = not won
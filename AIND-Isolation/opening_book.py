@@ -0,0 +1,189 @@
+"""Build and query an opening book for knight Isolation.
+
+The book maps every position of the first few plies of the game (up to board
+symmetry) to the move chosen by a deep fixed-depth alpha-beta search run
+offline, so agents can answer those positions with a dictionary lookup
+instead of spending their whole time budget where the branching factor is
+highest.
+
+Books are stored in a compact binary file: a header with the board size and
+the number of entries, followed by one 8-byte canonical position key (see
+`isolation.symmetry.position_key`) and one byte for the square of the book
+move (in the canonical orientation) per entry.
+
+Build a book for the default 7x7 board with:
+
+    python opening_book.py --max-ply 4 --depth 6 --output opening_book.bin
+"""
+import argparse
+import struct
+import timeit
+
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation import Board
+from isolation.symmetry import canonical_key, transform_move
+from game_agent import AlphaBetaPlayer, custom_score
+
+MAGIC = b"ISOB"
+HEADER = struct.Struct("<4sBBI")
+
+
+class OpeningBook:
+    """Mapping from canonical positions to book moves.
+
+    Parameters
+    ----------
+    width, height : int (optional)
+        The size of the boards the book applies to.
+    """
+
+    def __init__(self, width=7, height=7):
+        if width * height + 15 > 64:
+            raise ValueError("Opening books support boards of at most 49 squares.")
+        self.width = width
+        self.height = height
+        self._moves = {}
+
+    def __len__(self):
+        return len(self._moves)
+
+    def __contains__(self, game):
+        return self.lookup(game) is not None
+
+    def add(self, game, move):
+        """Record `move` as the book move for the game state `game`."""
+        key, sym = canonical_key(game)
+        canonical_move = transform_move(move, sym, self.width, self.height)
+        self._moves[key] = canonical_move[0] + canonical_move[1] * self.height
+
+    def lookup(self, game):
+        """Return the book move for `game` in the orientation of `game`, or
+        None if the position is not in the book.
+        """
+        if game.width != self.width or game.height != self.height:
+            return None
+        key, sym = canonical_key(game)
+        idx = self._moves.get(key)
+        if idx is None:
+            return None
+        move = (idx % self.height, idx // self.height)
+        return transform_move(move, sym, self.width, self.height, reverse=True)
+
+    def save(self, path):
+        """Write the book to `path` in the binary book format."""
+        keys = sorted(self._moves)
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.width, self.height, len(keys)))
+            array("Q", keys).tofile(f)
+            array("B", [self._moves[key] for key in keys]).tofile(f)
+
+    @classmethod
+    def load(cls, path):
+        """Read a book written by `save()`."""
+        with open(path, "rb") as f:
+            magic, width, height, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError("{} is not an opening book file.".format(path))
+            keys = array("Q")
+            keys.fromfile(f, count)
+            moves = array("B")
+            moves.fromfile(f, count)
+        book = cls(width, height)
+        book._moves = dict(zip(keys, moves))
+        return book
+
+
+def book_positions(max_ply, width=7, height=7):
+    """Return one representative move sequence for every position (up to
+    symmetry) reachable in fewer than `max_ply` plies from the empty board,
+    ordered by ply.
+    """
+    positions = [[]]
+    frontier = [[]]
+    for _ in range(max_ply - 1):
+        seen = {}
+        for moves in frontier:
+            game = Board("Player1", "Player2", width, height)
+            for move in moves:
+                game.apply_move(move)
+            for move in game.get_legal_moves():
+                child = game.forecast_move(move)
+                seen.setdefault(canonical_key(child)[0], moves + [move])
+        frontier = list(seen.values())
+        positions.extend(frontier)
+    return positions
+
+
+def search_position(task):
+    """Search the position reached by a move sequence and return the sequence
+    with the best move found.
+
+    The task is a tuple (moves, depth, score_fn, width, height).
+    """
+    moves, depth, score_fn, width, height = task
+    player = AlphaBetaPlayer(score_fn=score_fn, in_place=True, move_ordering=True)
+    player.time_left = lambda: float("inf")
+    if len(moves) % 2 == 0:
+        game = Board(player, "Opponent", width, height)
+    else:
+        game = Board("Opponent", player, width, height)
+    for move in moves:
+        game.apply_move(move)
+    best_move = (-1, -1)
+    for d in range(1, depth + 1):
+        move = player.alphabeta(game, d)
+        if move != (-1, -1):
+            best_move = move
+    if best_move == (-1, -1):
+        # every move loses at all depths; store a legal move rather than the sentinel
+        best_move = game.get_legal_moves()[0]
+    return moves, best_move
+
+
+def build_book(max_ply=4, depth=6, score_fn=custom_score, width=7, height=7,
+               workers=1, verbose=False):
+    """Build an opening book by searching every position of the first
+    `max_ply` plies (up to symmetry) with iterative deepening to `depth`.
+    """
+    book = OpeningBook(width, height)
+    tasks = [(moves, depth, score_fn, width, height)
+             for moves in book_positions(max_ply, width, height)]
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    results = map(search_position, tasks) if executor is None else executor.map(search_position, tasks)
+    start = timeit.default_timer()
+    for count, (moves, move) in enumerate(results, 1):
+        game = Board("Player1", "Player2", width, height)
+        for m in moves:
+            game.apply_move(m)
+        book.add(game, move)
+        if verbose and count % 50 == 0:
+            print("{}/{} positions ({:.0f}s)".format(
+                count, len(tasks), timeit.default_timer() - start), flush=True)
+    if executor is not None:
+        executor.shutdown()
+    return book
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an Isolation opening book.")
+    parser.add_argument("--max-ply", type=int, default=4,
+                        help="include positions with fewer than this many moves played")
+    parser.add_argument("--depth", type=int, default=6, help="search depth per position")
+    parser.add_argument("--size", type=int, nargs=2, default=(7, 7),
+                        metavar=("WIDTH", "HEIGHT"), help="board size")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes searching positions")
+    parser.add_argument("--output", default="opening_book.bin", help="book file to write")
+    args = parser.parse_args()
+
+    width, height = args.size
+    book = build_book(args.max_ply, args.depth, width=width, height=height,
+                      workers=args.workers, verbose=True)
+    book.save(args.output)
+    print("Wrote {} positions to {}".format(len(book), args.output))
+
+
+if __name__ == "__main__":
+    main()
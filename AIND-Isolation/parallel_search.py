@@ -0,0 +1,283 @@
+"""This file contains the root-splitting parallel search of AlphaBetaPlayer.
+
+With ``AlphaBetaPlayer(workers=N)``, the legal moves at the root are split
+into N groups and each group is searched with iterative deepening alpha-beta
+in a worker process. Every worker reports the best move and value of its
+group for each depth it completed, and the player returns the best move of
+the deepest iteration completed by all the workers. If some workers have not
+reported by the deadline, the player plays the best move of the workers that
+did, and the late ones are waited for before the next search is submitted.
+
+The workers cannot call the `time_left` callable of `Board.play()`, so they
+are given the absolute time at which the move is due on the system-wide
+monotonic clock instead. The game state is sent as the plain board state
+list rather than as a pickled board and players, and the worker processes
+(and the search agents they keep, with their transposition tables) persist
+between moves in a pool shared by all the players of this process. The
+transposition tables are cleared whenever a worker searches for a different
+game than before.
+
+Measure the depth reached by serial and parallel search with:
+
+    python parallel_search.py --workers 4 --time-limit 150
+"""
+import argparse
+import os
+import random
+import time
+import weakref
+from collections import OrderedDict
+
+from concurrent.futures import ProcessPoolExecutor, wait
+
+from isolation import Board, BitBoard
+
+_POOLS = {}
+
+# Futures of each pool still running after the deadline of their search
+_PENDING = {}
+
+# (number of games, move count of the last search) of each parallel player
+_GAMES = weakref.WeakKeyDictionary()
+
+# Search agents of a worker process, keyed by their configuration; the least
+# recently used agent is dropped when there are more than _MAX_WORKER_PLAYERS
+_WORKER_PLAYERS = OrderedDict()
+_MAX_WORKER_PLAYERS = 8
+
+
+def get_pool(workers):
+    """Return the persistent process pool with `workers` processes."""
+    if workers not in _POOLS:
+        _POOLS[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _POOLS[workers]
+
+
+def encode_state(game, player):
+    """Return a picklable tuple describing `game` from the point of view of
+    `player`, who must be the active player.
+    """
+    return (game.width, game.height, list(game._board_state), game.move_count,
+            player is game._player_1, isinstance(game, BitBoard), game._rng is None)
+
+
+def decode_state(state, player):
+    """Rebuild the board encoded by `encode_state()` with `player` in its
+    seat and a placeholder opponent.
+    """
+    width, height, board_state, move_count, first, bitboard, fixed_order = state
+    rng = None if fixed_order else random
+    if first:
+        game = Board(player, "Opponent", width, height, rng)
+    else:
+        game = Board("Opponent", player, width, height, rng)
+    game._board_state = board_state
+    game.move_count = move_count
+    if board_state[-3]:
+        game._active_player, game._inactive_player = game._player_2, game._player_1
+    game._hash_key = game._compute_hash()
+    return BitBoard.from_board(game) if bitboard else game
+
+
+def search_root_moves(task):
+    """Search a subset of the root moves with iterative deepening until the
+    deadline, in a worker process.
+
+    The task is a tuple (state, moves, config, deadline, game_id): the
+    `encode_state()` of the root, the root moves to search, the keyword
+    arguments of the `AlphaBetaPlayer` doing the search, the
+    `time.monotonic()` time at which the move is due, and a value identifying
+    the game, which resets the transposition table of the agent when it
+    changes.
+
+    Returns
+    -------
+    (list<(int, (int, int), float)>, bool, int, int)
+        The (depth, best move, value) of every completed iteration, whether
+        the last iteration searched to the end of the game, and the number of
+        nodes and cutoffs of the search.
+    """
+    from game_agent import AlphaBetaPlayer, SearchTimeout
+
+    state, moves, config, deadline, game_id = task
+    # transposition table values are from the point of view of the seat
+    key = (state[4],) + tuple(sorted(config.items()))
+    player = _WORKER_PLAYERS.get(key)
+    if player is None:
+        player = _WORKER_PLAYERS[key] = AlphaBetaPlayer(**config)
+        player._game_id = game_id
+        if len(_WORKER_PLAYERS) > _MAX_WORKER_PLAYERS:
+            _WORKER_PLAYERS.popitem(last=False)
+    else:
+        _WORKER_PLAYERS.move_to_end(key)
+    if player._game_id != game_id:
+        player._game_id = game_id
+        if player.tt is not None:
+            player.tt.clear()
+    game = decode_state(state, player)
+    player.time_left = lambda: 1000 * (deadline - time.monotonic())
+    player.nodes = player.cutoffs = 0
+    player._best_moves = {}
+    player._killers = {}
+    player._root_move_count = game.move_count
+
+    results = []
+    exhausted = False
+    blanks = len(game.get_blank_spaces())
+    depth = 1
+    try:
+        while not exhausted:
+            best_move, best_value = moves[0], float("-inf")
+            for move in moves:
+                value = player._child_value(game, move, depth - 1, best_value,
+                                            float("inf"), True, player.pvs and move != moves[0])
+                if value > best_value:
+                    best_move, best_value = move, value
+            results.append((depth, best_move, best_value))
+            exhausted = depth >= blanks
+            depth += 1
+    except SearchTimeout:
+        pass
+    return results, exhausted, player.nodes, player.cutoffs
+
+
+def merge_results(results):
+    """Combine the `search_root_moves()` results of all the root groups.
+
+    Groups that completed no iteration are skipped, so that the results of
+    the groups that finished in time can still be merged.
+
+    Returns
+    -------
+    (int, (int, int))
+        The deepest iteration completed by every group, and the best root
+        move of that iteration; (0, None) if no group completed any.
+    """
+    results = [result for result in results if result[0]]
+    if not results:
+        return 0, None
+    depth = None
+    for iterations, exhausted, _, _ in results:
+        if not exhausted:
+            last = iterations[-1][0]
+            depth = last if depth is None else min(depth, last)
+    if depth is None:
+        depth = max(iterations[-1][0] for iterations, _, _, _ in results)
+
+    best_move, best_value = None, float("-inf")
+    for iterations, _, _, _ in results:
+        _, move, value = iterations[min(depth, len(iterations)) - 1]
+        if best_move is None or value > best_value:
+            best_move, best_value = move, value
+    return depth, best_move
+
+
+def game_id(player, game):
+    """Return a value identifying the game `player` is searching, on the same
+    grounds as the transposition table reset of `AlphaBetaPlayer.get_move()`:
+    a player moves at strictly increasing move counts within one game.
+    """
+    games, last_move_count = _GAMES.get(player, (0, None))
+    if last_move_count is None or game.move_count <= last_move_count:
+        games += 1
+    _GAMES[player] = (games, game.move_count)
+    return os.getpid(), id(player), games
+
+
+def best_scored_move(player, game, moves):
+    """Return the move of `moves` leading to the position with the best
+    heuristic value for `player`.
+    """
+    return max(moves, key=lambda move: player.score(game.forecast_move(move), player))
+
+
+def parallel_search(player, game, workers):
+    """Return the best move of `player` in `game` found by searching the
+    root moves in `workers` worker processes, and record the depth reached
+    and the nodes searched in `player.depth_nodes` and `player.nodes`.
+    """
+    moves = game.get_legal_moves()
+    if len(moves) < 2:
+        return moves[0] if moves else (-1, -1)
+
+    deadline = time.monotonic() + player.time_left() / 1000
+    config = dict(score_fn=player.score, timeout=player.TIMER_THRESHOLD,
+                  in_place=player.in_place, tt_size=player.tt.size if player.tt else 0,
+                  move_ordering=player.move_ordering,
+                  pvs=player.pvs, tt_symmetry=player.tt_symmetry)
+    state = encode_state(game, player)
+    task_game = game_id(player, game)
+    groups = [moves[i::workers] for i in range(min(workers, len(moves)))]
+    pool = get_pool(workers)
+    # Searches that missed their own deadline are past it, so they return
+    # promptly; waiting for them keeps this search from queueing behind them
+    wait(_PENDING.pop(workers, []))
+    futures = [pool.submit(search_root_moves, (state, group, config, deadline, task_game))
+               for group in groups]
+
+    # The workers stop on their own once TIMER_THRESHOLD is left; the
+    # margin below only covers returning their results
+    done, pending = wait(futures, timeout=max(0., player.time_left() - player.TIMER_THRESHOLD / 2) / 1000)
+    pending = [future for future in pending if not future.cancel()]
+    if pending:
+        _PENDING[workers] = pending
+    results = [future.result() for future in futures if future in done]
+    depth, move = merge_results(results)
+    player.nodes = sum(result[2] for result in results)
+    player.cutoffs = sum(result[3] for result in results)
+    player.depth_nodes = [(depth, player.nodes)] if depth else []
+    return move if move is not None else best_scored_move(player, game, moves)
+
+
+def depth_speedup(workers, time_limit=150, positions=20, seed=0):
+    """Return the mean depth reached by serial and by parallel search with a
+    `time_limit` milliseconds budget in random midgame positions.
+    """
+    from game_agent import AlphaBetaPlayer
+
+    rng = random.Random(seed)
+    depths = ([], [])
+    while len(depths[0]) < positions:
+        opening = []
+        game = Board("Player1", "Player2")
+        for _ in range(rng.randint(4, 10)):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            opening.append(rng.choice(moves))
+            game.apply_move(opening[-1])
+        if len(game.get_legal_moves()) < 2:
+            continue
+
+        players = [AlphaBetaPlayer(in_place=True, move_ordering=True),
+                   AlphaBetaPlayer(in_place=True, move_ordering=True, workers=workers)]
+        for player, result in zip(players, depths):
+            if len(opening) % 2 == 0:
+                board = Board(player, "Opponent")
+            else:
+                board = Board("Opponent", player)
+            for move in opening:
+                board.apply_move(move)
+            start = time.monotonic()
+            time_left = lambda: time_limit - 1000 * (time.monotonic() - start)
+            player.get_move(board, time_left)
+            if player.depth_nodes:
+                result.append(player.depth_nodes[-1][0])
+    return [sum(d) / max(1, len(d)) for d in depths]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare the depth reached by serial and parallel alpha-beta.")
+    parser.add_argument("--workers", type=int, default=4, help="number of worker processes")
+    parser.add_argument("--time-limit", type=int, default=150, help="milliseconds per move")
+    parser.add_argument("--positions", type=int, default=20, help="number of test positions")
+    args = parser.parse_args()
+
+    serial, parallel = depth_speedup(args.workers, args.time_limit, args.positions)
+    print("Mean depth in {} ms: serial {:.2f}, {} workers {:.2f} ({:+.2f} plies)".format(
+        args.time_limit, serial, args.workers, parallel, parallel - serial))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""This file contains an opt-in profiler for the search agents.
+
+`SearchProfiler.attach()` instruments one player instance: every call to its
+`get_move()` appends a record with the search statistics of the move (nodes
+per second, depth reached, alpha-beta cutoffs, transposition table hits), the
+split of the move time between move generation, heuristic scoring and board
+copying, and the margin left on the clock when the move was returned.
+
+The time split is measured by switching the class of the board passed to
+`get_move()` to a profiled subclass (see `profiled_class()`) whose move
+generation and copying methods are timed. Only the outermost timed call is
+counted, e.g., the legal moves generated inside a heuristic count as scoring.
+Players that are not profiled, and the boards they receive, are unaffected.
+Timing every call has a cost of its own, so profiled agents search fewer
+nodes than they would otherwise.
+"""
+from timeit import default_timer
+
+SECTIONS = ("movegen", "scoring", "copying")
+
+_PROFILED_CLASSES = {}
+
+
+class SectionTimer:
+    """Accumulate the time spent in the outermost of nested timed sections."""
+
+    def __init__(self):
+        self.totals = dict.fromkeys(SECTIONS, 0.)
+        self._section = None
+        self._start = 0.
+
+    def reset(self):
+        self.totals = dict.fromkeys(SECTIONS, 0.)
+        self._section = None
+
+    def enter(self, section):
+        """Start timing `section` and return True, unless another section is
+        already being timed, in which case return False.
+        """
+        if self._section is not None:
+            return False
+        self._section = section
+        self._start = default_timer()
+        return True
+
+    def exit(self):
+        """Stop timing the current section."""
+        self.totals[self._section] += default_timer() - self._start
+        self._section = None
+
+    def time(self, section, fn, *args, **kwargs):
+        """Return ``fn(*args, **kwargs)``, timed as `section`."""
+        if not self.enter(section):
+            return fn(*args, **kwargs)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.exit()
+
+
+def _timed(section, name):
+    """Return a method that times the base class implementation of `name`."""
+    def method(self, *args, **kwargs):
+        base = getattr(super(ProfiledBoard, self), name)
+        return self._profile.time(section, base, *args, **kwargs)
+    method.__name__ = name
+    return method
+
+
+class ProfiledBoard:
+    """Mixin timing the move generation and copying methods of a board.
+
+    It is combined with a board class by `profiled_class()`; the instance
+    must have a `_profile` attribute holding a `SectionTimer`.
+    """
+
+    get_legal_moves = _timed("movegen", "get_legal_moves")
+    forecast_move = _timed("copying", "forecast_move")
+    apply_move = _timed("copying", "apply_move")
+    push_move = _timed("copying", "push_move")
+    pop_move = _timed("copying", "pop_move")
+
+    def copy(self):
+        timer = self._profile
+        new_board = timer.time("copying", super(ProfiledBoard, self).copy)
+        new_board.__class__ = self.__class__
+        new_board._profile = timer
+        return new_board
+
+
+def profiled_class(board_cls):
+    """Return the profiled subclass of `board_cls`."""
+    if board_cls not in _PROFILED_CLASSES:
+        _PROFILED_CLASSES[board_cls] = type(
+            "Profiled" + board_cls.__name__, (ProfiledBoard, board_cls), {})
+    return _PROFILED_CLASSES[board_cls]
+
+
+class _TimedScore:
+    """Heuristic wrapper timing every call as scoring.
+
+    It compares and hashes like the wrapped function, so lookups of the
+    heuristic in `batch_eval.BATCH_SCORES` still find its batched twin.
+    """
+
+    def __init__(self, score_fn, timer):
+        self.score_fn = score_fn
+        self.timer = timer
+
+    def __call__(self, game, player):
+        return self.timer.time("scoring", self.score_fn, game, player)
+
+    def __eq__(self, other):
+        return self.score_fn == other
+
+    def __hash__(self):
+        return hash(self.score_fn)
+
+
+class SearchProfiler:
+    """Per-move telemetry of one player.
+
+    Parameters
+    ----------
+    name : str (optional)
+        Agent name stored in every record.
+
+    Attributes
+    ----------
+    records : list<dict>
+        One record per call to `get_move()`, in the order the moves were
+        played. Times are in milliseconds.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.records = []
+        self.timer = SectionTimer()
+
+    def attach(self, player):
+        """Instrument `player` in place and return it."""
+        timer = self.timer
+        get_move = player.get_move
+        if hasattr(player, "score"):
+            player.score = _TimedScore(player.score, timer)
+
+        def profiled_get_move(game, time_left):
+            game.__class__ = profiled_class(type(game))
+            game._profile = timer
+            timer.reset()
+            tt = getattr(player, "tt", None)
+            hits, misses = (tt.hits, tt.misses) if tt is not None else (0, 0)
+            start = default_timer()
+            move = get_move(game, time_left)
+            elapsed = default_timer() - start
+            self._record(player, game, elapsed, time_left(), hits, misses)
+            return move
+
+        player.get_move = profiled_get_move
+        return player
+
+    def _record(self, player, game, elapsed, margin, hits, misses):
+        """Append the record of the move that just returned."""
+        nodes = getattr(player, "nodes", 0)
+        depth_nodes = getattr(player, "depth_nodes", None)
+        tt = getattr(player, "tt", None)
+        totals = self.timer.totals
+        record = {
+            "agent": self.name,
+            "move_count": game.move_count,
+            "time_ms": 1000 * elapsed,
+            "margin_ms": margin,
+            "depth": depth_nodes[-1][0] if depth_nodes else None,
+            "nodes": nodes,
+            "nodes_per_sec": nodes / elapsed if elapsed > 0 else None,
+            "cutoffs": getattr(player, "cutoffs", 0),
+        }
+        for section in SECTIONS:
+            record[section + "_ms"] = 1000 * totals[section]
+        record["other_ms"] = 1000 * (elapsed - sum(totals.values()))
+        record["tt_hits"] = tt.hits - hits if tt is not None else None
+        record["tt_misses"] = tt.misses - misses if tt is not None else None
+        self.records.append(record)
@@ -0,0 +1,182 @@
+"""This file contains Elo ratings for Isolation tournament results.
+
+`BradleyTerry` fits the Bradley-Terry model -- the probability that agent i
+beats agent j is ``g_i / (g_i + g_j)`` -- to all the games played so far,
+with the minorization-maximization updates of Hunter (2004) warm-started from
+the previous fit, so adding games and refitting is cheap. Strengths are
+reported on the Elo scale (400 * log10(g)), relative to an anchor agent, with
+confidence intervals from the inverse Fisher information of the fit.
+
+`SPRT` is Wald's sequential probability ratio test between two Elo
+differences; a tournament can stop comparing two agents as soon as the test
+is decided instead of playing a fixed number of games.
+"""
+from math import log, log10, sqrt
+
+import numpy as np
+
+ELO_PER_NAT = 400 / log(10)
+
+# Two-sided normal quantiles of the supported confidence levels
+Z_SCORES = {.9: 1.645, .95: 1.96, .99: 2.576}
+
+
+def expected_score(elo):
+    """Return the probability of winning for an Elo advantage `elo`."""
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_difference(score):
+    """Return the Elo advantage corresponding to a winning probability."""
+    if score <= 0:
+        return float("-inf")
+    if score >= 1:
+        return float("inf")
+    return -400 * log10(1 / score - 1)
+
+
+class BradleyTerry:
+    """Incremental Bradley-Terry (Elo) estimator.
+
+    Parameters
+    ----------
+    prior : float (optional)
+        Number of virtual games, half won and half lost, added between every
+        pair of agents that played each other. It keeps the ratings finite
+        when an agent won or lost all its games.
+    """
+
+    def __init__(self, prior=1.):
+        self.prior = prior
+        self.names = []
+        self._index = {}
+        self._wins = np.zeros((0, 0))
+        self._theta = np.zeros(0)
+
+    def _agent(self, name):
+        if name not in self._index:
+            self._index[name] = len(self.names)
+            self.names.append(name)
+            n = len(self.names)
+            wins = np.zeros((n, n))
+            wins[:n - 1, :n - 1] = self._wins
+            self._wins = wins
+            self._theta = np.append(self._theta, 0.)
+        return self._index[name]
+
+    def add(self, winner, loser, count=1):
+        """Record `count` games won by `winner` against `loser`."""
+        if winner == loser:
+            raise ValueError("An agent cannot play against itself: {}".format(winner))
+        i, j = self._agent(winner), self._agent(loser)
+        self._wins[i, j] += count
+
+    def games(self, name):
+        """Return the number of games played by `name`."""
+        i = self._index[name]
+        return int(self._wins[i].sum() + self._wins[:, i].sum())
+
+    def fit(self, iterations=1000, tolerance=1e-9):
+        """Update the strengths to the maximum likelihood (with the prior) of
+        all the recorded games, and return their natural logarithms.
+        """
+        games = self._wins + self._wins.T
+        played = games > 0
+        wins = self._wins + self.prior / 2 * played
+        games = games + self.prior * played
+        total_wins = wins.sum(axis=1)
+        gamma = np.exp(self._theta)
+        for _ in range(iterations):
+            denominators = (games / (gamma[:, None] + gamma[None, :])).sum(axis=1)
+            new_gamma = np.where(denominators > 0, total_wins / np.maximum(denominators, 1e-300),
+                                 gamma)
+            new_gamma /= np.exp(np.log(new_gamma).mean())
+            converged = np.abs(np.log(new_gamma) - np.log(gamma)).max() < tolerance
+            gamma = new_gamma
+            if converged:
+                break
+        self._theta = np.log(gamma)
+        self._games = games
+        return self._theta
+
+    def ratings(self, anchor=None, confidence=.95):
+        """Return the Elo rating and confidence interval of every agent.
+
+        Parameters
+        ----------
+        anchor : str (optional)
+            Agent rated 0, whose rating is exact; by default the first agent
+            recorded.
+
+        confidence : float (optional)
+            Level of the confidence intervals; one of `Z_SCORES`.
+
+        Returns
+        -------
+        dict<str, (float, float, float)>
+            The (rating, lower bound, upper bound) of every agent.
+        """
+        theta = self.fit()
+        n = len(self.names)
+        a = self._index[anchor] if anchor is not None else 0
+        # Fisher information of the log-strengths; the anchor is fixed, which
+        # removes the translation invariance that makes it singular
+        p = 1 / (1 + np.exp(theta[None, :] - theta[:, None]))
+        weights = self._games * p * p.T
+        information = np.diag(weights.sum(axis=1)) - weights
+        keep = [i for i in range(n) if i != a]
+        variance = np.zeros(n)
+        if keep:
+            variance[keep] = np.diag(np.linalg.pinv(information[np.ix_(keep, keep)]))
+        z = Z_SCORES[confidence]
+        result = {}
+        for i, name in enumerate(self.names):
+            elo = ELO_PER_NAT * (theta[i] - theta[a])
+            margin = z * ELO_PER_NAT * sqrt(max(variance[i], 0.))
+            result[name] = (float(elo), float(elo - margin), float(elo + margin))
+        return result
+
+
+class SPRT:
+    """Sequential probability ratio test of the Elo advantage of one agent
+    over another, from their win/loss record (Isolation has no draws).
+
+    The test decides between H0: the advantage is `elo0` and H1: it is
+    `elo1`, with error rates `alpha` (accepting H1 under H0) and `beta`
+    (accepting H0 under H1). With the default symmetric hypotheses, H1 means
+    "stronger" and H0 "weaker"; agents of equal strength take longest to
+    decide, so comparisons should also be capped in games.
+    """
+
+    def __init__(self, elo0=-50., elo1=50., alpha=.05, beta=.05):
+        self.elo0, self.elo1 = elo0, elo1
+        self.alpha, self.beta = alpha, beta
+        p0, p1 = expected_score(elo0), expected_score(elo1)
+        self._win_llr = log(p1 / p0)
+        self._loss_llr = log((1 - p1) / (1 - p0))
+        self.lower = log(beta / (1 - alpha))
+        self.upper = log((1 - beta) / alpha)
+        self.wins = 0
+        self.losses = 0
+
+    def add(self, won):
+        """Record one game, won or lost by the tested agent."""
+        if won:
+            self.wins += 1
+        else:
+            self.losses += 1
+
+    @property
+    def llr(self):
+        """Log-likelihood ratio of H1 against H0."""
+        return self.wins * self._win_llr + self.losses * self._loss_llr
+
+    @property
+    def status(self):
+        """Return "H1" or "H0" once accepted, otherwise None."""
+        llr = self.llr
+        if llr >= self.upper:
+            return "H1"
+        if llr <= self.lower:
+            return "H0"
+        return None
@@ -0,0 +1,90 @@
+"""This file contains a low-overhead time manager for the search agents.
+
+The `time_left` callable passed to `get_move()` by `Board.play()` reads the
+clock through a chain of lambdas, and the agents call it at every node. The
+`TimeManager` wraps it so that the clock is only read every `interval` calls;
+the interval adapts to the measured node rate so that real clock reads happen
+roughly every `target_interval` milliseconds. It also records the duration of
+each iterative deepening iteration to predict whether the next, deeper one
+can finish in the remaining time.
+"""
+
+
+class TimeManager:
+    """Amortized clock checks and iteration time prediction.
+
+    Parameters
+    ----------
+    target_interval : float (optional)
+        Desired number of milliseconds between two reads of the real clock.
+        Should be well below the agent's timeout threshold.
+
+    max_interval : int (optional)
+        Upper bound on the number of calls between two clock reads.
+    """
+
+    def __init__(self, target_interval=1., max_interval=1024):
+        self.target_interval = target_interval
+        self.max_interval = max_interval
+        self.interval = 1
+        self.clock_reads = 0
+        self.iterations = []
+        self._time_left = None
+        self._remaining = 0.
+        self._countdown = 0
+        self._iteration_start = 0.
+
+    def start(self, time_left):
+        """Begin timing a new move with the `time_left` callable provided by
+        the game. The interval calibrated for previous moves is kept.
+        """
+        self._time_left = time_left
+        self._remaining = self._iteration_start = time_left()
+        self._countdown = self.interval
+        self.clock_reads = 1
+        self.iterations = []
+
+    def time_left(self):
+        """Return the milliseconds left in the current move, as measured at
+        the most recent clock read. The clock is read once every `interval`
+        calls, and the interval is recalibrated at each read.
+        """
+        self._countdown -= 1
+        if self._countdown > 0:
+            return self._remaining
+        remaining = self._time_left()
+        self.clock_reads += 1
+        elapsed = self._remaining - remaining
+        if elapsed > 0:
+            scale = min(2., self.target_interval / elapsed)
+            self.interval = max(1, min(self.max_interval, int(self.interval * scale)))
+        else:
+            self.interval = min(self.max_interval, 2 * self.interval)
+        self._remaining = remaining
+        self._countdown = self.interval
+        return remaining
+
+    def iteration_finished(self):
+        """Record the duration of the search iteration that just completed."""
+        remaining = self._time_left()
+        self.clock_reads += 1
+        self.iterations.append(self._iteration_start - remaining)
+        self._iteration_start = self._remaining = remaining
+
+    def predict_next(self):
+        """Return the predicted duration in milliseconds of the next
+        iteration, extrapolated with the growth factor (effective branching
+        factor) of the last two iterations, or None if it cannot be estimated.
+        """
+        if len(self.iterations) < 2 or self.iterations[-2] <= 0:
+            return None
+        growth = max(1., self.iterations[-1] / self.iterations[-2])
+        return self.iterations[-1] * growth
+
+    def can_finish_next(self, threshold):
+        """Return False if the next iteration is predicted to run past the
+        point where `threshold` milliseconds are left, so that starting it
+        would only waste the time of a partial search.
+        """
+        predicted = self.predict_next()
+        return predicted is None or predicted < self._remaining - threshold
@@ -11,20 +11,35 @@ players, and the players play each match twice -- once as the first player and
 once as the second player.  Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
 """
+import argparse
+import copy
+import functools
 import itertools
+import json
+import os
 import random
+import math
 import warnings
 
 from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from timeit import default_timer
 
-from isolation import Board
+from isolation import Board, BitBoard
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
 from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
                         custom_score_2, custom_score_3)
+from game_records import GameLogWriter, GameRecord, encode_moves
+from match_server import MatchServer
+from mcts import MCTSPlayer
+from opening_book import OpeningBook
+from profiler import SearchProfiler
+from ratings import BradleyTerry, SPRT
 
 NUM_MATCHES = 10  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+SPRT_BATCH = 4  # matches played between two checks of the SPRT stop rule
 
 DESCRIPTION = """
 This script evaluates the performance of the custom_score evaluation
@@ -37,38 +52,200 @@ game_agent.py.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_round(cpu_agent, test_agents, win_counts, num_matches):
+def _time_moves(player, times):
+    """Make `player` append the milliseconds taken by each of its moves to
+    `times`.
+    """
+    get_move = player.get_move
+
+    def timed_get_move(game, time_left):
+        start = default_timer()
+        try:
+            return get_move(game, time_left)
+        finally:
+            times.append(1000 * (default_timer() - start))
+
+    player.get_move = timed_get_move
+
+
+def play_game(task):
+    """Play a single game and report whether the test agent won.
+
+    The task is a tuple (cpu_player, test_player, cpu_first, opening, seed,
+    board_cls, names, profile), where `names` is the (cpu_name, test_name)
+    pair of agent names. The players are copied before the game so that every
+    game starts from the same agent state whether it runs in this process or
+    in a worker process, and the global random generator used by the agents
+    is reseeded with the per-game seed. If `profile` is True, both players
+    are profiled under their names.
+
+    Returns
+    -------
+    (bool, str, list<dict>, `game_records.GameRecord`)
+        True if the test agent won, the termination reason returned by
+        `Board.play()`, the per-move `SearchProfiler` records of both players
+        (empty if the game was not profiled), and the record of the game.
+    """
+    cpu_player, test_player, cpu_first, opening, seed, board_cls, names, profile = task
+    cpu_player, test_player = copy.deepcopy((cpu_player, test_player))
+    profilers = []
+    if profile:
+        profilers = [SearchProfiler(name) for name in names]
+        profilers[0].attach(cpu_player)
+        profilers[1].attach(test_player)
+    times = []
+    _time_moves(cpu_player, times)
+    _time_moves(test_player, times)
+    random.seed(seed)
+    if cpu_first:
+        game = board_cls(cpu_player, test_player)
+    else:
+        game = board_cls(test_player, cpu_player)
+    for move in opening:
+        game.apply_move(move)
+    winner, history, termination = game.play(time_limit=TIME_LIMIT)
+    records = []
+    for profiler, opponent in zip(profilers, reversed(names)):
+        for record in profiler.records:
+            record["opponent"] = opponent
+            records.append(record)
+    records.sort(key=lambda record: record["move_count"])
+
+    # the last timed move is missing from the history if it lost the game
+    first_player = cpu_player if cpu_first else test_player
+    game_record = _game_record(game, task, history, times[:len(history)],
+                               0 if winner is first_player else 1, termination)
+    return winner is test_player, termination, records, game_record
+
+
+def _game_record(game, task, history, times, winner, termination):
+    """Return the `GameRecord` of the game of a `play_game()` task, given its
+    moves after the opening, their times and the seat of the winner.
+    """
+    _, _, cpu_first, opening, seed, _, names, _ = task
+    moves = list(opening) + [tuple(move) for move in history]
+    meta = {"players": list(names if cpu_first else names[::-1]), "winner": winner,
+            "termination": termination, "seed": seed, "opening": len(opening)}
+    return GameRecord(game.width, game.height, encode_moves(moves, game.height),
+                      [math.nan] * len(opening) + list(times), meta)
+
+
+def play_on_server(server, tasks):
+    """Play the games of `play_game()` tasks with every agent in its own
+    process on a `match_server.MatchServer`, and return their results in the
+    format of `play_game()`. Games played on a server are not profiled.
+    """
+    games = []
+    for cpu_player, test_player, cpu_first, opening, seed, _, _, _ in tasks:
+        players = (cpu_player, test_player) if cpu_first else (test_player, cpu_player)
+        games.append(players + (opening, seed))
+    game = server.board_cls("Player1", "Player2")
+    results = []
+    for task, (winner, history, termination, times) in zip(tasks, server.run(games)):
+        test_won = winner == int(task[2])
+        results.append((test_won, termination, [],
+                        _game_record(game, task, history, times, winner, termination)))
+    return results
+
+
+def play_round(cpu_agent, test_agents, win_counts, num_matches, board_cls=Board,
+               seed=None, executor=None, telemetry=None, game_log=None, server=None,
+               game_counts=None, sprt=None, ratings=None):
     """Compare the test agents to the cpu agent in "fair" matches.
 
     "Fair" matches use random starting locations and force the agents to
     play as both first and second player to control for advantages resulting
     from choosing better opening moves or having first initiative to move.
-    """
-    timeout_count = 0
-    forfeit_count = 0
-    for _ in range(num_matches):
 
-        games = sum([[Board(cpu_agent.player, agent.player),
-                      Board(agent.player, cpu_agent.player)]
-                    for agent in test_agents], [])
+    `board_cls` selects the game engine (`Board` or `BitBoard`). If `seed` is
+    given, the openings and the random generator of every game are seeded
+    from it, so the round is reproducible as far as the agents do not depend
+    on the clock: iterative deepening agents search as deep as the time
+    limit allows, so their games vary with the load of the machine. Games
+    are distributed over the worker processes of `executor` if one is given,
+    or played on the `match_server.MatchServer` `server` with each agent in
+    its own process.
+
+    If `telemetry` is a writable file, every move of every game is profiled
+    and written to it as one JSON object per line. If `game_log` is a
+    `game_records.GameLogWriter`, the record of every game is written to it.
+
+    If `sprt` is a `ratings.SPRT`, the matches are played in batches of
+    `SPRT_BATCH` and each test agent stops playing once its own copy of the
+    test is decided, so `num_matches` only caps the round. The number of
+    games of each test agent is added to `game_counts` if it is given, and
+    every game is recorded in the `ratings.BradleyTerry` `ratings`.
+    """
+    matches = []
+    for match in range(num_matches):
+        if seed is None:
+            rng = random
+        else:
+            rng = random.Random("{}:{}".format(seed, match))
 
         # initialize all games with a random move and response
+        game = board_cls(cpu_agent.player, test_agents[0].player)
+        opening = []
         for _ in range(2):
-            move = random.choice(games[0].get_legal_moves())
-            for game in games:
-                game.apply_move(move)
+            move = rng.choice(game.get_legal_moves())
+            game.apply_move(move)
+            opening.append(move)
+
+        tasks = []
+        for agent in test_agents:
+            for cpu_first in (True, False):
+                tasks.append((cpu_agent.player, agent.player, cpu_first, opening,
+                              rng.getrandbits(32), board_cls, (cpu_agent.name, agent.name),
+                              telemetry is not None))
+        matches.append(tasks)
+
+    tests = {}
+    if sprt is not None:
+        tests = {agent.player: copy.copy(sprt) for agent in test_agents}
+    batch_size = SPRT_BATCH if tests else max(1, num_matches)
 
-        # play all games and tally the results
-        for game in games:
-            winner, _, termination = game.play(time_limit=TIME_LIMIT)
-            win_counts[winner] += 1
+    timeout_count = 0
+    forfeit_count = 0
+    crash_count = 0
+    game_id = 0
+    for start in range(0, num_matches, batch_size):
+        tasks = [task for match in matches[start:start + batch_size] for task in match
+                 if task[1] not in tests or tests[task[1]].status is None]
+        if not tasks:
+            break
+
+        # play the games of the batch and tally the results
+        if server is not None:
+            results = play_on_server(server, tasks)
+        elif executor is not None:
+            results = executor.map(play_game, tasks)
+        else:
+            results = map(play_game, tasks)
+        for task, result in zip(tasks, results):
+            test_won, termination, records, game_record = result
+            win_counts[task[1] if test_won else task[0]] += 1
+            if game_counts is not None:
+                game_counts[task[1]] += 1
+            if task[1] in tests:
+                tests[task[1]].add(test_won)
+            if ratings is not None:
+                names = task[6] if not test_won else task[6][::-1]
+                ratings.add(names[0], names[1])
+            for record in records:
+                record.update(game=game_id, cpu_first=task[2], termination=termination)
+                telemetry.write(json.dumps(record) + "\n")
+            if game_log is not None:
+                game_log.write(game_record)
+            game_id += 1
 
             if termination == "timeout":
                 timeout_count += 1
             elif termination == "forfeit":
                 forfeit_count += 1
+            elif termination == "crash":
+                crash_count += 1
 
-    return timeout_count, forfeit_count
+    return timeout_count, forfeit_count, crash_count
 
 
 def update(total_wins, wins):
@@ -77,12 +254,46 @@ def update(total_wins, wins):
     return total_wins
 
 
-def play_matches(cpu_agents, test_agents, num_matches):
-    """Play matches between the test agent and each cpu_agent individually. """
+def play_matches(cpu_agents, test_agents, num_matches, board_cls=Board,
+                 seed=None, workers=1, telemetry=None, game_log=None, server=False,
+                 sprt=None):
+    """Play matches between the test agent and each cpu_agent individually.
+
+    With `workers` > 1 the games are played in that many worker processes,
+    capped to the number of cores so that every search gets a core to itself.
+    Per-move telemetry is written to the file `telemetry` if one is given
+    (see `play_round()`), and game records to the `game_log` writer. With
+    `server`, every agent runs in its own process on a `MatchServer` playing
+    `workers` games at a time, so a hung or crashing agent only loses its
+    own games; telemetry is not recorded then.
+
+    With a `ratings.SPRT` `sprt`, each comparison of a test agent with a cpu
+    agent stops as soon as the test is decided (see `play_round()`). Elo
+    ratings with 95% confidence intervals of all the agents are printed at
+    the end; they are keyed by agent name, so the names must be unique.
+    """
+    names = [agent.name for agent in cpu_agents + test_agents]
+    if len(set(names)) < len(names):
+        raise ValueError("Agent names must be unique: {}".format(names))
+    executor = None
+    match_server = None
+    cores = os.cpu_count() or 1
+    if workers > cores:
+        warnings.warn("Using {} workers instead of {} to keep one search "
+                      "per core.".format(cores, workers))
+        workers = cores
+    if server:
+        match_server = MatchServer(workers, TIME_LIMIT, board_cls)
+        telemetry = None
+    elif workers > 1:
+        executor = ProcessPoolExecutor(max_workers=workers)
+
     total_wins = {agent.player: 0 for agent in test_agents}
+    total_games = {agent.player: 0 for agent in test_agents}
     total_timeouts = 0.
     total_forfeits = 0.
-    total_matches = 2 * num_matches * len(cpu_agents)
+    total_crashes = 0
+    ratings = BradleyTerry()
 
     print("\n{:^9}{:^13}".format("Match #", "Opponent") + ''.join(['{:^13}'.format(x[1].name) for x in enumerate(test_agents)]))
     print("{:^9}{:^13} ".format("", "") +  ' '.join(['{:^5}| {:^5}'.format("Won", "Lost") for x in enumerate(test_agents)]))
@@ -90,15 +301,20 @@ def play_matches(cpu_agents, test_agents, num_matches):
     for idx, agent in enumerate(cpu_agents):
         wins = {key: 0 for (key, value) in test_agents}
         wins[agent.player] = 0
+        games = {key: 0 for (key, value) in test_agents}
 
         print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
 
-        counts = play_round(agent, test_agents, wins, num_matches)
+        round_seed = None if seed is None else "{}:{}".format(seed, idx)
+        counts = play_round(agent, test_agents, wins, num_matches, board_cls,
+                            round_seed, executor, telemetry, game_log, match_server,
+                            games, sprt, ratings)
         total_timeouts += counts[0]
         total_forfeits += counts[1]
+        total_crashes += counts[2]
         total_wins = update(total_wins, wins)
-        _total = 2 * num_matches
-        round_totals = sum([[wins[agent.player], _total - wins[agent.player]]
+        total_games = update(total_games, games)
+        round_totals = sum([[wins[agent.player], games[agent.player] - wins[agent.player]]
                             for agent in test_agents], [])
         print(' ' + ' '.join([
             '{:^5}| {:^5}'.format(
@@ -106,14 +322,26 @@ def play_matches(cpu_agents, test_agents, num_matches):
             ) for i in range(0, len(round_totals), 2)
         ]))
 
+    if executor is not None:
+        executor.shutdown()
+    if match_server is not None:
+        match_server.close()
+
     print("-" * 74)
     print('{:^9}{:^13}'.format("", "Win Rate:") +
         ''.join([
             '{:^13}'.format(
-                "{:.1f}%".format(100 * total_wins[x[1].player] / total_matches)
+                "{:.1f}%".format(100 * total_wins[x[1].player] / total_games[x[1].player])
             ) for x in enumerate(test_agents)
     ]))
 
+    anchor = cpu_agents[0].name if cpu_agents[0].name in ratings.names else None
+    table = ratings.ratings(anchor=anchor) if ratings.names else {}
+    print("\n{:<13}{:>8}{:>20}{:>8}".format("Agent", "Elo", "95% interval", "Games"))
+    for name, (elo, low, high) in sorted(table.items(), key=lambda item: -item[1][0]):
+        print("{:<13}{:>8.0f}{:>20}{:>8}".format(
+            name, elo, "[{:.0f}, {:.0f}]".format(low, high), ratings.games(name)))
+
     if total_timeouts:
         print(("\nThere were {} timeouts during the tournament -- make sure " +
                "your agent handles search timeout correctly, and consider " +
@@ -122,18 +350,54 @@ def play_matches(cpu_agents, test_agents, num_matches):
     if total_forfeits:
         print(("\nYour ID search forfeited {} games while there were still " +
                "legal moves available to play.\n").format(total_forfeits))
+    if total_crashes:
+        print(("\n{} games were lost by an agent raising an exception or " +
+               "whose process died.\n").format(total_crashes))
 
 
 def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--bitboard", action="store_true",
+                        help="play the matches on isolation.BitBoard")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes playing games in parallel")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed the openings and agents for a reproducible run")
+    parser.add_argument("--book", default=None,
+                        help="opening book file used by the test agents")
+    parser.add_argument("--telemetry", default=None, metavar="PATH",
+                        help="profile every move and write JSON lines to PATH")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="append every game to the binary game log PATH")
+    parser.add_argument("--server", action="store_true",
+                        help="run every agent in its own process on a match server, "
+                             "playing --workers games at a time")
+    parser.add_argument("--matches", type=int, default=NUM_MATCHES,
+                        help="matches against each opponent (the maximum with --sprt)")
+    parser.add_argument("--sprt", action="store_true",
+                        help="stop each comparison once an SPRT of -50 vs +50 Elo "
+                             "(5%% error rates) is decided")
+    parser.add_argument("--no-shuffle", action="store_true",
+                        help="generate legal moves in a fixed order, so that with --seed "
+                             "fixed-depth searches replay identical game trees")
+    parser.add_argument("--mcts", action="store_true",
+                        help="add the Monte Carlo tree search agent to the test agents")
+    args = parser.parse_args()
+    board_cls = BitBoard if args.bitboard else Board
+    if args.no_shuffle:
+        board_cls = functools.partial(board_cls, rng=None)
+    book = OpeningBook.load(args.book) if args.book else None
 
     # Define two agents to compare -- these agents will play from the same
     # starting position against the same adversaries in the tournament
     test_agents = [
         Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score), "AB_Custom"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
-        Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
+        Agent(AlphaBetaPlayer(score_fn=custom_score, opening_book=book), "AB_Custom"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_2, opening_book=book), "AB_Custom_2"),
+        Agent(AlphaBetaPlayer(score_fn=custom_score_3, opening_book=book), "AB_Custom_3")
     ]
+    if args.mcts:
+        test_agents.append(Agent(MCTSPlayer(), "MCTS"))
 
     # Define a collection of agents to compete against the test agents
     cpu_agents = [
@@ -143,14 +407,25 @@ def main():
         Agent(MinimaxPlayer(score_fn=improved_score), "MM_Improved"),
         Agent(AlphaBetaPlayer(score_fn=open_move_score), "AB_Open"),
         Agent(AlphaBetaPlayer(score_fn=center_score), "AB_Center"),
-        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved")
+        Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Imp_CPU")
     ]
 
     print(DESCRIPTION)
     print("{:^74}".format("*************************"))
     print("{:^74}".format("Playing Matches"))
     print("{:^74}".format("*************************"))
-    play_matches(cpu_agents, test_agents, NUM_MATCHES)
+    telemetry = open(args.telemetry, "w") if args.telemetry else None
+    game_log = GameLogWriter(args.record) if args.record else None
+    try:
+        play_matches(cpu_agents, test_agents, args.matches, board_cls,
+                     seed=args.seed, workers=args.workers, telemetry=telemetry,
+                     game_log=game_log, server=args.server,
+                     sprt=SPRT() if args.sprt else None)
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+        if game_log is not None:
+            game_log.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,86 @@
+"""This file contains a bounded transposition table for the alpha-beta search
+agents in game_agent.py.
+
+Entries are keyed by the Zobrist hash returned by `isolation.Board.hash()` and
+stored in a fixed number of slots (the low bits of the key select the slot).
+When two positions collide on a slot, the entry searched to the greater depth
+is kept.
+"""
+
+EXACT = 0  # the stored value is the minimax value of the position
+LOWER = 1  # the stored value is a lower bound (the search failed high)
+UPPER = 2  # the stored value is an upper bound (the search failed low)
+
+
+class TranspositionTable:
+    """Fixed-size hash table of search results with depth-preferred
+    replacement.
+
+    Parameters
+    ----------
+    size : int (optional)
+        The number of slots in the table; rounded up to a power of two.
+    """
+
+    def __init__(self, size=2**16):
+        self.size = 1 << max(0, size - 1).bit_length()
+        self._mask = self.size - 1
+        self._slots = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def __len__(self):
+        return sum(entry is not None for entry in self._slots)
+
+    def clear(self):
+        """Remove every entry; the counters keep accumulating."""
+        self._slots = [None] * self.size
+
+    def lookup(self, key):
+        """Return the entry stored for `key` as a tuple
+        (key, depth, flag, value, move), or None if there is no entry.
+        """
+        entry = self._slots[key & self._mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, flag, value, move=None):
+        """Record the result of searching the position `key` to `depth` plies.
+
+        An existing entry for a different position in the same slot is only
+        replaced if it was searched less deeply.
+
+        Parameters
+        ----------
+        key : int
+            The hash of the position (see `isolation.Board.hash()`).
+
+        depth : int
+            The number of plies searched below the position.
+
+        flag : int
+            One of EXACT, LOWER or UPPER describing how `value` relates to the
+            minimax value of the position.
+
+        value : float
+            The value returned by the search.
+
+        move : (int, int) (optional)
+            The best move found in the position, if any.
+        """
+        idx = key & self._mask
+        entry = self._slots[idx]
+        if entry is None or entry[0] == key or entry[1] <= depth:
+            self._slots[idx] = (key, depth, flag, value, move)
+            self.stores += 1
+
+    def stats(self):
+        """Return a dict with the hit/miss counters and the table usage."""
+        probes = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "stores": self.stores,
+                "hit_rate": self.hits / probes if probes else 0.,
+                "entries": len(self), "size": self.size}
@@ -0,0 +1,232 @@
+"""Tune the weights of `game_agent.WeightedScore` by self-play with SPSA.
+
+Simultaneous perturbation stochastic approximation estimates the gradient of
+the win rate with respect to all the weights at once from a single match:
+at every iteration, two weight vectors ``theta + c * delta`` and ``theta - c
+* delta`` (with a random sign vector `delta`) play a match against each
+other, and `theta` moves in the direction of the winner.
+
+The games are short, fixed-depth alpha-beta games with the moves generated in
+a fixed order, so they do not depend on the clock or on the load of the
+machine and can be played in many worker processes at once. Each opening (two
+random moves) is played twice with the colours swapped.
+
+The own-moves weight is fixed to 1 and the opponent-moves and center weights
+are tuned, since scaling all the weights by a positive constant does not
+change the play. Progress is written to a JSON checkpoint after every
+iteration, and a run can be resumed from it. At the end, the final weights,
+the intermediate ones and the weights of `custom_score` and `custom_score_2`
+are ranked by their win rate against the `improved_score` weights:
+
+    python tune.py --iterations 50 --games 32 --workers 8 --checkpoint tune.json
+"""
+import argparse
+import json
+import os
+import random
+import warnings
+
+from concurrent.futures import ProcessPoolExecutor
+
+from isolation import Board
+from game_agent import AlphaBetaPlayer, WeightedScore
+
+# Weights (own, opp, center) of the reference agents, normalized to own = 1
+REFERENCE = {
+    "custom_score": (1., .1, 0.),
+    "custom_score_2": (1., 1., .05),
+}
+OPPONENT = (1., 1., 0.)  # improved_score
+
+
+def play_game(task):
+    """Play one fixed-depth game and return True if the first weight vector
+    won.
+
+    The task is a tuple (weights_a, weights_b, opening, depth, a_first).
+    """
+    weights_a, weights_b, opening, depth, a_first = task
+    player_a = AlphaBetaPlayer(score_fn=WeightedScore(*weights_a), in_place=True)
+    player_b = AlphaBetaPlayer(score_fn=WeightedScore(*weights_b), in_place=True)
+    for player in (player_a, player_b):
+        player.time_left = lambda: float("inf")
+    if a_first:
+        game = Board(player_a, player_b, rng=None)
+    else:
+        game = Board(player_b, player_a, rng=None)
+    for move in opening:
+        game.apply_move(move)
+    while game.get_legal_moves():
+        move = game.active_player.alphabeta(game, depth)
+        if move == (-1, -1):
+            # every move loses: alphabeta returns no move, but one must be played
+            move = game.get_legal_moves()[0]
+        game.apply_move(move)
+    return game.inactive_player is player_a
+
+
+def match_tasks(weights_a, weights_b, games, depth, rng):
+    """Return the tasks of a match of `games` games (rounded up to an even
+    number) with random openings played from both sides.
+    """
+    tasks = []
+    for _ in range((games + 1) // 2):
+        game = Board("Player1", "Player2", rng=None)
+        opening = []
+        for _ in range(2):
+            opening.append(rng.choice(game.get_legal_moves()))
+            game.apply_move(opening[-1])
+        for a_first in (True, False):
+            tasks.append((weights_a, weights_b, opening, depth, a_first))
+    return tasks
+
+
+def win_rate(results):
+    results = list(results)
+    return sum(results) / len(results)
+
+
+class SPSATuner:
+    """SPSA optimizer over the opponent-moves and center weights.
+
+    Parameters
+    ----------
+    theta : list<float>
+        Initial (opp, center) weights.
+
+    games : int
+        Games per match between the two perturbed weight vectors.
+
+    depth : int
+        Search depth of the self-play games.
+
+    a, c, A : float (optional)
+        Step size and perturbation size gains; the step at iteration k is
+        ``a / (k + 1 + A) ** 0.602`` and the perturbation ``c / (k + 1) **
+        0.101`` (the usual SPSA schedules).
+
+    seed : int (optional)
+        Seed of the perturbations and openings; iteration k only depends on
+        the seed and k, so resumed runs continue identically.
+    """
+
+    def __init__(self, theta, games, depth, a=.5, c=.2, A=5., seed=0):
+        self.theta = list(theta)
+        self.games = games
+        self.depth = depth
+        self.a, self.c, self.A = a, c, A
+        self.seed = seed
+        self.iteration = 0
+        self.history = []
+
+    @staticmethod
+    def weights(theta):
+        return (1.,) + tuple(theta)
+
+    def step(self, map_fn=map):
+        """Run one iteration, playing its games with `map_fn`."""
+        k = self.iteration
+        rng = random.Random("{}:{}".format(self.seed, k))
+        a_k = self.a / (k + 1 + self.A) ** .602
+        c_k = self.c / (k + 1) ** .101
+        delta = [rng.choice((-1, 1)) for _ in self.theta]
+        plus = [t + c_k * d for t, d in zip(self.theta, delta)]
+        minus = [t - c_k * d for t, d in zip(self.theta, delta)]
+
+        tasks = match_tasks(self.weights(plus), self.weights(minus), self.games, self.depth, rng)
+        score = 2 * win_rate(map_fn(play_game, tasks)) - 1
+        self.theta = [t + a_k * score / (2 * c_k * d) for t, d in zip(self.theta, delta)]
+        self.iteration += 1
+        self.history.append({"iteration": k, "plus": plus, "minus": minus,
+                             "score": score, "theta": list(self.theta)})
+
+    def state(self):
+        return {"theta": self.theta, "iteration": self.iteration, "history": self.history,
+                "settings": {"games": self.games, "depth": self.depth, "a": self.a,
+                             "c": self.c, "A": self.A, "seed": self.seed}}
+
+    @classmethod
+    def from_state(cls, state):
+        tuner = cls(state["theta"], **state["settings"])
+        tuner.iteration = state["iteration"]
+        tuner.history = state["history"]
+        return tuner
+
+
+def rank(candidates, games, depth, map_fn=map, seed=0):
+    """Return the (name, weights, win rate) of every candidate against the
+    `OPPONENT` weights, best first. Every candidate plays the same openings.
+    """
+    ranking = []
+    for name, weights in candidates:
+        tasks = match_tasks(tuple(weights), OPPONENT, games, depth, random.Random(seed))
+        ranking.append((name, list(weights), win_rate(map_fn(play_game, tasks))))
+    ranking.sort(key=lambda entry: -entry[2])
+    return ranking
+
+
+def save(path, state):
+    """Write `state` to `path` atomically, so that an interrupted run never
+    leaves a truncated checkpoint behind.
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune WeightedScore weights with SPSA self-play.")
+    parser.add_argument("--iterations", type=int, default=50, help="total SPSA iterations")
+    parser.add_argument("--games", type=int, default=32, help="games per SPSA iteration")
+    parser.add_argument("--depth", type=int, default=3, help="search depth of the games")
+    parser.add_argument("--rank-games", type=int, default=100,
+                        help="games per candidate in the final ranking")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="number of worker processes playing games")
+    parser.add_argument("--seed", type=int, default=0, help="seed of perturbations and openings")
+    parser.add_argument("--checkpoint", default="tune_checkpoint.json",
+                        help="checkpoint file, resumed from if it exists")
+    args = parser.parse_args()
+
+    if os.path.exists(args.checkpoint):
+        with open(args.checkpoint) as f:
+            tuner = SPSATuner.from_state(json.load(f))
+        print("Resuming from iteration {}".format(tuner.iteration))
+    else:
+        tuner = SPSATuner(REFERENCE["custom_score_2"][1:], args.games, args.depth, seed=args.seed)
+
+    cores = os.cpu_count() or 1
+    if args.workers > cores:
+        warnings.warn("Using {} workers instead of {}.".format(cores, args.workers))
+    workers = min(args.workers, cores)
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    map_fn = map if executor is None else executor.map
+
+    while tuner.iteration < args.iterations:
+        tuner.step(map_fn)
+        save(args.checkpoint, tuner.state())
+        entry = tuner.history[-1]
+        print("{:>4} score {:+.2f} opp {:.3f} center {:.3f}".format(
+            entry["iteration"], entry["score"], *entry["theta"]), flush=True)
+
+    candidates = [(name, weights) for name, weights in sorted(REFERENCE.items())]
+    candidates.append(("final", tuner.weights(tuner.theta)))
+    for entry in tuner.history[-10::5]:
+        candidates.append(("iteration {}".format(entry["iteration"]),
+                           tuner.weights(entry["theta"])))
+    ranking = rank(candidates, args.rank_games, args.depth, map_fn, args.seed)
+    state = tuner.state()
+    state["ranking"] = ranking
+    save(args.checkpoint, state)
+    if executor is not None:
+        executor.shutdown()
+
+    print("\n{:<16}{:>32}{:>10}".format("Weights", "(own, opp, center)", "Win rate"))
+    for name, weights, rate in ranking:
+        print("{:<16}{:>32}{:>9.1f}%".format(
+            name, "({:.3f}, {:.3f}, {:.3f})".format(*weights), 100 * rate))
+
+
+if __name__ == "__main__":
+    main()
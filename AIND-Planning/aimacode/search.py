@@ -185,15 +185,19 @@ def breadth_first_search(problem):
         return node
     frontier = FIFOQueue()
     frontier.append(node)
+    # states on the frontier, so that membership tests do not scan the queue
+    frontier_states = {node.state}
     explored = set()
     while frontier:
         node = frontier.pop()
+        frontier_states.discard(node.state)
         explored.add(node.state)
         for child in node.expand(problem):
-            if child.state not in explored and child not in frontier:
+            if child.state not in explored and child.state not in frontier_states:
                 if problem.goal_test(child.state):
                     return child
                 frontier.append(child)
+                frontier_states.add(child.state)
     return None
 
 
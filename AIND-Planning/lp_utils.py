@@ -1,6 +1,9 @@
 from aimacode.logic import associate
 from aimacode.utils import expr
 
+_TF_TO_BITS = str.maketrans('TF', '10')
+_BITS_TO_TF = str.maketrans('10', 'TF')
+
 
 class FluentState():
     """ state object for planning problems as positive and negative fluents
@@ -41,24 +44,28 @@ def encode_state(fs: FluentState, fluent_map: list) -> str:
     :param fluent_map: ordered list of possible fluents for the problem
     :return: str eg. "TFFTFT" string of mapped positive and negative fluents
     """
+    pos = set(fs.pos)
     state_tf = []
     for fluent in fluent_map:
-        if fluent in fs.pos:
+        if fluent in pos:
             state_tf.append('T')
         else:
             state_tf.append('F')
     return "".join(state_tf)
 
 
-def decode_state(state: str, fluent_map: list) -> FluentState:
-    """ decode string of T/F as fluent per mapping
+def decode_state(state, fluent_map: list) -> FluentState:
+    """ decode string of T/F (or bitmask) as fluent per mapping
 
-    :param state: str eg. "TFFTFT" string of mapped positive and negative fluents
+    :param state: str eg. "TFFTFT" string of mapped positive and negative fluents,
+        or the equivalent int bitmask (see tf_to_bits)
     :param fluent_map: ordered list of possible fluents for the problem
     :return: fs: FluentState object
 
     lengths of state string and fluent_map list must be the same
     """
+    if isinstance(state, int):
+        state = bits_to_tf(state, len(fluent_map))
     fs = FluentState([], [])
     for idx, char in enumerate(state):
         if char == 'T':
@@ -66,3 +73,58 @@ def decode_state(state: str, fluent_map: list) -> FluentState:
         else:
             fs.neg.append(fluent_map[idx])
     return fs
+
+
+class FluentBits(int):
+    """ int bitmask of a state that also records the number of mapped fluents,
+    so that len() gives the fluent count as it does for the T/F string form
+
+    It compares and hashes as the plain int; results of bitwise operations on it
+    are plain ints.
+    """
+
+    def __new__(cls, bits: int, size: int):
+        state = int.__new__(cls, bits)
+        state.size = size
+        return state
+
+    def __len__(self):
+        return self.size
+
+
+def tf_to_bits(state: str) -> int:
+    """ convert a string of T/F to an int bitmask
+
+    :param state: str eg. "TFFTFT" string of mapped positive and negative fluents
+    :return: int with the binary digits of the string, fluent 0 being the most
+        significant bit, e.g. "TFFTFT" -> 0b100101; ints then sort like the strings
+    """
+    if not state:
+        return 0
+    return int(state.translate(_TF_TO_BITS), 2)
+
+
+def bits_to_tf(state: int, size: int) -> str:
+    """ convert an int bitmask to a string of T/F
+
+    :param state: int bitmask as returned by tf_to_bits
+    :param size: number of fluents in the mapping
+    :return: str eg. "TFFTFT" string of mapped positive and negative fluents
+    """
+    if not size:
+        return ""
+    return format(state, '0{}b'.format(size)).translate(_BITS_TO_TF)
+
+
+def fluent_bits(fluents: list, fluent_index: dict) -> int:
+    """ bitmask of a list of fluents
+
+    :param fluents: list of fluents
+    :param fluent_index: dict mapping each possible fluent to its position in the mapping
+    :return: int with the bit of every fluent in the list set (see tf_to_bits)
+    """
+    size = len(fluent_index)
+    bits = 0
+    for fluent in fluents:
+        bits |= 1 << (size - 1 - fluent_index[fluent])
+    return bits
@@ -1,13 +1,12 @@
-from aimacode.logic import PropKB
 from aimacode.planning import Action
 from aimacode.search import (
     Node, Problem,
 )
 from aimacode.utils import expr
 from lp_utils import (
-    FluentState, encode_state, decode_state,
+    FluentState, FluentBits, encode_state, tf_to_bits, bits_to_tf, fluent_bits,
 )
-from my_planning_graph import PlanningGraph
+from my_planning_graph import CompactPlanningGraph
 
 from functools import lru_cache
 
@@ -26,14 +25,26 @@ class AirCargoProblem(Problem):
             positive and negative literal fluents (as expr) describing initial state
         :param goal: list of expr
             literal fluents required for goal test
+
+        States are the int bitmasks of their T/F strings over `state_map` (see
+        lp_utils.tf_to_bits), so that actions, result and goal_test are a few
+        bitwise operations. The initial state is a FluentBits, which also gives
+        the number of fluents with len(). Use state_tf for the T/F string form
+        of a state.
         """
         self.state_map = initial.pos + initial.neg
+        self.fluent_index = {fluent: idx for idx, fluent in enumerate(self.state_map)}
         self.initial_state_TF = encode_state(initial, self.state_map)
-        Problem.__init__(self, self.initial_state_TF, goal=goal)
+        Problem.__init__(self, FluentBits(tf_to_bits(self.initial_state_TF), len(self.state_map)),
+                         goal=goal)
+        self.goal_bits = fluent_bits(goal, self.fluent_index)
         self.cargos = cargos
         self.planes = planes
         self.airports = airports
         self.actions_list = self.get_actions()
+        self.action_bits = [self.compute_action_bits(action) for action in self.actions_list]
+        self._action_bits_map = dict(zip(self.actions_list, self.action_bits))
+        self.successor_index, self.unconditional_actions = self.index_actions()
 
     def get_actions(self):
         """
@@ -126,30 +137,81 @@ class AirCargoProblem(Problem):
 
         return load_actions() + unload_actions() + fly_actions()
 
-    def actions(self, state: str) -> list:
+    def compute_action_bits(self, action: Action) -> tuple:
+        """ Return the bitmasks of the preconditions and effects of a ground action.
+
+        :param action: Action
+        :return: tuple of int
+            (precond_pos, precond_neg, effect_add, effect_rem) bitmasks
+        """
+        return (fluent_bits(action.precond_pos, self.fluent_index),
+                fluent_bits(action.precond_neg, self.fluent_index),
+                fluent_bits(action.effect_add, self.fluent_index),
+                fluent_bits(action.effect_rem, self.fluent_index))
+
+    def index_actions(self):
+        """
+        Build an inverted index from fluents to the actions that need them, so that
+        actions(state) only checks the actions whose key precondition holds in the state.
+
+        Every action is filed under exactly one of its positive preconditions, the one
+        shared by the fewest actions, which keeps the candidate lists short; actions
+        without positive preconditions are checked in every state.
+
+        Returns:
+        ----------
+        (list<list<int>>, list<int>)
+            the indices in `actions_list` of the actions keyed by each fluent index, and
+            the indices of the actions without positive preconditions
+        """
+        uses = [0] * len(self.state_map)
+        for action in self.actions_list:
+            for fluent in action.precond_pos:
+                uses[self.fluent_index[fluent]] += 1
+        index = [[] for _ in self.state_map]
+        unconditional = []
+        for idx, action in enumerate(self.actions_list):
+            if action.precond_pos:
+                key = min((self.fluent_index[fluent] for fluent in action.precond_pos),
+                          key=lambda fluent_idx: uses[fluent_idx])
+                index[key].append(idx)
+            else:
+                unconditional.append(idx)
+        return index, unconditional
+
+    def state_tf(self, state: int) -> str:
+        """ Return the T/F string form of a state, e.g. 'FTTTFF'
+
+        :param state: int bitmask of mapped fluents
+        :return: str
+        """
+        return bits_to_tf(state, len(self.state_map))
+
+    def actions(self, state: int) -> list:
         """ Return the actions that can be executed in the given state.
 
-        :param state: str
-            state represented as T/F string of mapped fluents (state variables)
-            e.g. 'FTTTFF'
+        :param state: int
+            state represented as a bitmask of mapped fluents (state variables)
+            e.g. 0b011100 for 'FTTTFF'
         :return: list of Action objects
         """
+        # collect the actions keyed by a positive fluent of the state, then check their
+        # full preconditions in the order of actions_list
+        candidates = list(self.unconditional_actions)
+        fluents = state
+        while fluents:
+            low = fluents & -fluents
+            candidates.extend(self.successor_index[len(self.state_map) - low.bit_length()])
+            fluents ^= low
+        candidates.sort()
         possible_actions = []
-        kb = PropKB()
-        kb.tell(decode_state(state, self.state_map).pos_sentence())
-        for action in self.actions_list:
-            is_possible = True
-            for clause in action.precond_pos:
-                if clause not in kb.clauses:
-                    is_possible = False
-            for clause in action.precond_neg:
-                if clause in kb.clauses:
-                    is_possible = False
-            if is_possible:
-                possible_actions.append(action)
+        for idx in candidates:
+            pos, neg, _, _ = self.action_bits[idx]
+            if state & pos == pos and not state & neg:
+                possible_actions.append(self.actions_list[idx])
         return possible_actions
 
-    def result(self, state: str, action: Action):
+    def result(self, state: int, action: Action):
         """ Return the state that results from executing the given
         action in the given state. The action must be one of
         self.actions(state).
@@ -158,34 +220,19 @@ class AirCargoProblem(Problem):
         :param action: Action applied
         :return: resulting state after action
         """
-        new_state = FluentState([], [])
-        old_state = decode_state(state, self.state_map)
-        for fluent in old_state.pos:
-            if fluent not in action.effect_rem:
-                new_state.pos.append(fluent)
-        for fluent in action.effect_add:
-            if fluent not in new_state.pos:
-                new_state.pos.append(fluent)
-        for fluent in old_state.neg:
-            if fluent not in action.effect_add:
-                new_state.neg.append(fluent)
-        for fluent in action.effect_rem:
-            if fluent not in new_state.neg:
-                new_state.neg.append(fluent)
-        return encode_state(new_state, self.state_map)
-
-    def goal_test(self, state: str) -> bool:
+        bits = self._action_bits_map.get(action)
+        if bits is None:
+            bits = self.compute_action_bits(action)
+        _, _, add, rem = bits
+        return state & ~rem | add
+
+    def goal_test(self, state: int) -> bool:
         """ Test the state to see if goal is reached
 
-        :param state: str representing state
+        :param state: int representing state
         :return: bool
         """
-        kb = PropKB()
-        kb.tell(decode_state(state, self.state_map).pos_sentence())
-        for clause in self.goal:
-            if clause not in kb.clauses:
-                return False
-        return True
+        return state & self.goal_bits == self.goal_bits
 
     def h_1(self, node: Node):
         # note that this is not a true heuristic
@@ -199,11 +246,36 @@ class AirCargoProblem(Problem):
         out from the current state in order to satisfy each individual goal
         condition.
         """
-        # requires implemented PlanningGraph class
-        pg = PlanningGraph(self, node.state)
+        # the goal levels of PlanningGraph do not depend on its mutexes, so the
+        # relaxed compact graph gives the same value much faster
+        pg = CompactPlanningGraph(self, node.state, mutex=False)
         pg_levelsum = pg.h_levelsum()
         return pg_levelsum
 
+    @lru_cache(maxsize=8192)
+    def h_max(self, node: Node):
+        """This heuristic estimates the number of actions required to satisfy
+        the hardest goal condition alone, from the levels of the relaxed
+        planning graph (admissible).
+        """
+        return CompactPlanningGraph(self, node.state, mutex=False).h_max()
+
+    @lru_cache(maxsize=8192)
+    def h_add(self, node: Node):
+        """This heuristic estimates the number of actions required to satisfy
+        each goal condition in the relaxed problem (ignoring delete effects)
+        and adds them up, counting shared actions once per goal.
+        """
+        return CompactPlanningGraph(self, node.state, mutex=False).h_add()
+
+    @lru_cache(maxsize=8192)
+    def h_ff(self, node: Node):
+        """This heuristic counts the actions of a plan of the relaxed problem
+        (ignoring delete effects) extracted from the relaxed planning graph,
+        as in the FF planner.
+        """
+        return CompactPlanningGraph(self, node.state, mutex=False).h_ff()
+
     @lru_cache(maxsize=8192)
     def h_ignore_preconditions(self, node: Node):
         """This heuristic estimates the minimum number of actions that must be
@@ -211,15 +283,7 @@ class AirCargoProblem(Problem):
         conditions by ignoring the preconditions required for an action to be
         executed.
         """
-        kb = PropKB()
-        kb.tell(decode_state(node.state, self.state_map).pos_sentence())  
-        kb_clauses = kb.clauses
-        count = 0
-
-        for clause in self.goal:
-            if clause not in kb_clauses:
-                count += 1
-        return count
+        return bin(self.goal_bits & ~node.state).count('1')
 
 
 def air_cargo_p1() -> AirCargoProblem:
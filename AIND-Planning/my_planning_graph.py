@@ -1,7 +1,12 @@
+import heapq
+import weakref
+
 from aimacode.planning import Action
 from aimacode.search import Problem
 from aimacode.utils import expr
-from lp_utils import decode_state
+from lp_utils import decode_state, tf_to_bits
+
+INF = float('inf')
 
 
 class PgNode():
@@ -521,3 +526,363 @@ class PlanningGraph():
                     level_sum += level
                     break
         return level_sum
+
+
+def _bit_indices(bits: int):
+    """ generate the indices of the set bits of an int, lowest first """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class PlanningTask():
+    """
+    Integer encoding of the fluents and ground actions of a planning problem, shared
+    by all the CompactPlanningGraph objects built for that problem.
+
+    Fluent i of problem.state_map is literal 2 * i when positive and literal
+    2 * i + 1 when negative, so that the negation of literal l is l ^ 1. Actions are
+    numbered as in problem.actions_list, followed by the no-op action of every
+    literal l with id len(problem.actions_list) + l.
+    """
+
+    def __init__(self, problem: Problem):
+        """
+        :param problem: PlanningProblem (or subclass such as AirCargoProblem or HaveCakeProblem)
+        Instance variables calculated:
+            pre, eff: lists of the precondition and effect literal ids of every action
+            pre_bits, eff_bits: the same as int bitmasks over literal ids
+            consumers, achievers: lists of the problem actions needing / producing every literal
+            unconditional: the problem actions without preconditions
+            goals: literal ids of the goal fluents
+        """
+        index = {fluent: idx for idx, fluent in enumerate(problem.state_map)}
+        self.num_fluents = len(problem.state_map)
+        self.num_literals = 2 * self.num_fluents
+        self.num_actions = len(problem.actions_list)
+        self.pre = []
+        self.eff = []
+        for action in problem.actions_list:
+            self.pre.append(sorted({2 * index[f] for f in action.precond_pos} |
+                                   {2 * index[f] + 1 for f in action.precond_neg}))
+            self.eff.append(sorted({2 * index[f] for f in action.effect_add} |
+                                   {2 * index[f] + 1 for f in action.effect_rem}))
+        for literal in range(self.num_literals):
+            self.pre.append([literal])
+            self.eff.append([literal])
+        self.pre_bits = [sum(1 << l for l in literals) for literals in self.pre]
+        self.eff_bits = [sum(1 << l for l in literals) for literals in self.eff]
+        self.consumers = [[] for _ in range(self.num_literals)]
+        self.achievers = [[] for _ in range(self.num_literals)]
+        self.unconditional = []
+        for a in range(self.num_actions):
+            for literal in self.pre[a]:
+                self.consumers[literal].append(a)
+            for literal in self.eff[a]:
+                self.achievers[literal].append(a)
+            if not self.pre[a]:
+                self.unconditional.append(a)
+        self.goals = [2 * index[goal] for goal in problem.goal]
+
+    def initial_literals(self, state) -> list:
+        """ literal ids holding in a state
+
+        :param state: str of T/F or int bitmask of mapped fluents
+        :return: list of int, one literal per fluent
+        """
+        if isinstance(state, str):
+            state = tf_to_bits(state)
+        top = self.num_fluents - 1
+        return [2 * idx + (not state >> (top - idx) & 1) for idx in range(self.num_fluents)]
+
+
+_TASKS = weakref.WeakKeyDictionary()
+
+
+def planning_task(problem: Problem) -> PlanningTask:
+    """ return the PlanningTask of a problem, built on the first call """
+    task = _TASKS.get(problem)
+    if task is None:
+        task = _TASKS[problem] = PlanningTask(problem)
+    return task
+
+
+class CompactPlanningGraph():
+    """
+    Array-based planning graph: literals and actions are integer ids (see PlanningTask),
+    levels are int bitmasks over them, and mutex relations are one bitmask of mutex
+    siblings per node and level.
+
+    With mutex=True the graph follows chapter 10 of the AIMA text: an action enters an
+    A level when its preconditions are present and pairwise non-mutex in the previous
+    S level, and the graph is expanded until two consecutive S levels hold the same
+    literals and mutexes. This is not the graph PlanningGraph builds: PlanningGraph
+    adds an action as soon as its preconditions are present, mutex or not, so literals
+    can reach a later level here and h_levelsum can be higher (6 instead of 4 from the
+    initial state of air_cargo_p1). With mutex=False it is the relaxed (delete-free)
+    planning graph: levels are expanded with one counter of unreached preconditions per
+    action, no no-op or mutex is computed, and the literal levels are the same as those
+    of PlanningGraph, whose levels do not depend on its mutexes.
+
+    The heuristics h_levelsum, h_max and h_ff read the levels of the graph; h_add
+    ignores the graph structure and always solves the relaxed problem.
+    """
+
+    def __init__(self, problem: Problem, state, serial_planning=True, mutex=True):
+        """
+        :param problem: PlanningProblem (or subclass such as AirCargoProblem or HaveCakeProblem)
+        :param state: str (TFTTFF...) or int bitmask of the fluent states
+        :param serial_planning: bool (whether or not to assume that only one action can occur at a time)
+        :param mutex: bool (whether to compute mutexes or build the relaxed planning graph)
+        Instance variables calculated:
+            literal_level: list of the first S level of every literal id (inf if never reached)
+            action_level: list of the first A level of every action id (inf if never reached)
+            s_levels: list of int bitmasks of the literals of every S level
+            a_levels: list of int bitmasks of the actions of every A level
+            s_mutex, a_mutex: for every level (mutex=True only), the list of the bitmask
+                of the mutex siblings of every literal / action id
+        """
+        self.task = planning_task(problem)
+        self.serial = serial_planning
+        self.mutex = mutex
+        self.initial = self.task.initial_literals(state)
+        self.literal_level = [INF] * self.task.num_literals
+        self.action_level = [INF] * len(self.task.pre)
+        self.s_levels = []
+        self.a_levels = []
+        self.s_mutex = []
+        self.a_mutex = []
+        if mutex:
+            self._expand_mutex()
+        else:
+            self._expand_relaxed()
+
+    def _expand_relaxed(self):
+        """ fill the levels of the relaxed planning graph, counting for every action
+        the preconditions not reached yet
+        """
+        task = self.task
+        literal_level, action_level = self.literal_level, self.action_level
+        counters = [len(pre) for pre in task.pre[:task.num_actions]]
+        literals = 0
+        for literal in self.initial:
+            literal_level[literal] = 0
+            literals |= 1 << literal
+        self.s_levels.append(literals)
+        actions = 0
+        frontier, ready = self.initial, list(task.unconditional)
+        level = 0
+        while True:
+            for literal in frontier:
+                for a in task.consumers[literal]:
+                    counters[a] -= 1
+                    if not counters[a]:
+                        ready.append(a)
+            new_literals = []
+            for a in ready:
+                action_level[a] = level
+                actions |= 1 << a
+                for literal in task.eff[a]:
+                    if literal_level[literal] == INF:
+                        literal_level[literal] = level + 1
+                        literals |= 1 << literal
+                        new_literals.append(literal)
+            self.a_levels.append(actions)
+            self.s_levels.append(literals)
+            if not new_literals:
+                break
+            frontier, ready = new_literals, []
+            level += 1
+
+    def _expand_mutex(self):
+        """ fill the levels and mutex bitmasks of the planning graph until it levels off """
+        task = self.task
+        num_actions, pre, eff = task.num_actions, task.pre, task.eff
+        literal_level, action_level = self.literal_level, self.action_level
+        literals = 0
+        for literal in self.initial:
+            literal_level[literal] = 0
+            literals |= 1 << literal
+        # the literals of a state are consistent, so S0 has no mutex
+        lit_mutex = [0] * task.num_literals
+        self.s_levels.append(literals)
+        self.s_mutex.append(lit_mutex)
+        level = 0
+        while True:
+            # A level: problem actions with present, pairwise non-mutex preconditions,
+            # and the no-ops of all the present literals
+            actions = []
+            for a in range(num_actions):
+                pre_bits = task.pre_bits[a]
+                if (pre_bits & literals == pre_bits and
+                        not any(lit_mutex[p] & pre_bits for p in pre[a])):
+                    actions.append(a)
+            serial_bits = sum(1 << a for a in actions) if self.serial else 0
+            actions.extend(num_actions + literal for literal in _bit_indices(literals))
+            needs = [0] * task.num_literals
+            gives = [0] * task.num_literals
+            for a in actions:
+                bit = 1 << a
+                for p in pre[a]:
+                    needs[p] |= bit
+                for e in eff[a]:
+                    gives[e] |= bit
+            # actions needing a literal that is mutex with each literal (competing needs)
+            competing = [0] * task.num_literals
+            for p in _bit_indices(literals):
+                for q in _bit_indices(lit_mutex[p]):
+                    competing[p] |= needs[q]
+
+            act_mutex = [0] * len(pre)
+            action_bits = 0
+            for a in actions:
+                action_bits |= 1 << a
+                if action_level[a] == INF:
+                    action_level[a] = level
+                # inconsistent effects and interference: the other action negates an
+                # effect or precondition of this one, or needs the negation of an effect
+                mutex = 0
+                for e in eff[a]:
+                    mutex |= gives[e ^ 1] | needs[e ^ 1]
+                for p in pre[a]:
+                    mutex |= gives[p ^ 1] | competing[p]
+                if a < num_actions:
+                    mutex |= serial_bits
+                act_mutex[a] = mutex & ~(1 << a)
+            self.a_levels.append(action_bits)
+            self.a_mutex.append(act_mutex)
+
+            # S level: two literals are mutex if they are negations of each other, or
+            # if no pair of non-mutex actions (or single action) achieves them both
+            next_literals = 0
+            compatible = {}
+            for a in actions:
+                next_literals |= task.eff_bits[a]
+                effects = 0
+                for b in _bit_indices(action_bits & ~act_mutex[a]):
+                    effects |= task.eff_bits[b]
+                compatible[a] = effects
+            next_mutex = [0] * task.num_literals
+            for p in _bit_indices(next_literals):
+                effects = 0
+                for a in _bit_indices(gives[p]):
+                    effects |= compatible[a]
+                next_mutex[p] = next_literals & (~effects | 1 << (p ^ 1))
+                if literal_level[p] == INF:
+                    literal_level[p] = level + 1
+            self.s_levels.append(next_literals)
+            self.s_mutex.append(next_mutex)
+            if next_literals == literals and next_mutex == lit_mutex:
+                break
+            literals, lit_mutex = next_literals, next_mutex
+            level += 1
+
+    def is_mutex_literals(self, level: int, literal1: int, literal2: int) -> bool:
+        """ test whether two literal ids are mutex in S level `level` (mutex=True only) """
+        return bool(self.s_mutex[level][literal1] >> literal2 & 1)
+
+    def is_mutex_actions(self, level: int, action1: int, action2: int) -> bool:
+        """ test whether two action ids are mutex in A level `level` (mutex=True only) """
+        return bool(self.a_mutex[level][action1] >> action2 & 1)
+
+    def h_levelsum(self):
+        """The sum of the level costs of the individual goals (admissible if goals independent)
+
+        :return: int, or inf if a goal is never reached
+        """
+        return sum(self.literal_level[goal] for goal in self.task.goals)
+
+    def h_max(self):
+        """The largest level cost of the individual goals (admissible)
+
+        :return: int, or inf if a goal is never reached
+        """
+        return max((self.literal_level[goal] for goal in self.task.goals), default=0)
+
+    def h_setlevel(self):
+        """The first level where all the goals are present and pairwise non-mutex
+        (admissible; the same as h_max in a relaxed graph)
+
+        :return: int, or inf if the graph levels off before
+        """
+        if not self.mutex:
+            return self.h_max()
+        goals = self.task.goals
+        goal_bits = sum(1 << goal for goal in goals)
+        for level, (literals, mutex) in enumerate(zip(self.s_levels, self.s_mutex)):
+            if (literals & goal_bits == goal_bits and
+                    not any(mutex[goal] & goal_bits for goal in goals)):
+                return level
+        return INF
+
+    def h_add(self):
+        """The sum of the costs of the individual goals in the relaxed problem, where the
+        cost of a literal is the cheapest cost of an achiever plus the sum of the costs
+        of its preconditions (not admissible)
+
+        :return: int, or inf if a goal is unreachable
+        """
+        task = self.task
+        cost = [INF] * task.num_literals
+        done = [False] * task.num_literals
+        counters = [len(pre) for pre in task.pre[:task.num_actions]]
+        totals = [0] * task.num_actions
+        heap = []
+        for literal in self.initial:
+            cost[literal] = 0
+            heap.append((0, literal))
+        for a in task.unconditional:
+            for literal in task.eff[a]:
+                if cost[literal] > 1:
+                    cost[literal] = 1
+                    heap.append((1, literal))
+        heapq.heapify(heap)
+        while heap:
+            literal_cost, literal = heapq.heappop(heap)
+            if done[literal]:
+                continue
+            done[literal] = True
+            for a in task.consumers[literal]:
+                totals[a] += literal_cost
+                counters[a] -= 1
+                if not counters[a]:
+                    action_cost = totals[a] + 1
+                    for e in task.eff[a]:
+                        if action_cost < cost[e]:
+                            cost[e] = action_cost
+                            heapq.heappush(heap, (action_cost, e))
+        return sum(cost[goal] for goal in task.goals)
+
+    def h_ff(self):
+        """The number of actions of a relaxed plan extracted backwards from the goals, as
+        in the FF planner: every subgoal first reached at level k is achieved by an action
+        of A level k - 1, the one with the easiest preconditions (not admissible)
+
+        :return: int, or inf if a goal is never reached
+        """
+        task = self.task
+        literal_level, action_level = self.literal_level, self.action_level
+        goals = self.task.goals
+        top = max((literal_level[goal] for goal in goals), default=0)
+        if top == INF:
+            return INF
+        subgoals = [set() for _ in range(top + 1)]
+        achieved = [set() for _ in range(top + 1)]
+        for goal in goals:
+            subgoals[literal_level[goal]].add(goal)
+        plan = 0
+        for level in range(top, 0, -1):
+            for goal in subgoals[level]:
+                if goal in achieved[level]:
+                    continue
+                action = min((a for a in task.achievers[goal] if action_level[a] == level - 1),
+                             key=lambda a: sum(literal_level[p] for p in task.pre[a]))
+                plan += 1
+                for p in task.pre[action]:
+                    if literal_level[p] and p not in achieved[level - 1]:
+                        subgoals[literal_level[p]].add(p)
+                for e in task.eff[action]:
+                    achieved[level].add(e)
+                    achieved[level - 1].add(e)
+        return plan
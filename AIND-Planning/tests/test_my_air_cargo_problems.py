@@ -6,7 +6,7 @@ from aimacode.planning import Action
 from aimacode.utils import expr
 from aimacode.search import Node
 import unittest
-from lp_utils import decode_state
+from lp_utils import decode_state, encode_state, tf_to_bits, bits_to_tf
 from my_air_cargo_problems import (
     air_cargo_p1, air_cargo_p2, air_cargo_p3,
 )
@@ -76,6 +76,51 @@ class TestAirCargoMethods(unittest.TestCase):
         self.assertTrue(expr('In(C1, P1)') in fs.pos)
         self.assertTrue(expr('At(C1, SFO)') in fs.neg)
 
+    def test_AC_state_encoding(self):
+        tf = self.p1.state_tf(self.p1.initial)
+        self.assertEqual(tf, self.p1.initial_state_TF)
+        self.assertEqual(tf_to_bits(tf), self.p1.initial)
+        self.assertEqual(bits_to_tf(self.p1.initial, len(self.p1.state_map)), tf)
+        fs = decode_state(self.p1.initial, self.p1.state_map)
+        self.assertEqual(encode_state(fs, self.p1.state_map), tf)
+        # fluent 0 is the most significant bit, so states sort like their strings
+        self.assertEqual(tf_to_bits('TFFTFT'), 0b100101)
+        states = ['TFFT', 'FTTF', 'TTFF', 'FFFT']
+        self.assertEqual(sorted(map(tf_to_bits, states)), [tf_to_bits(s) for s in sorted(states)])
+
+    def test_AC_return_to_initial(self):
+        load = [a for a in self.p1.actions(self.p1.initial) if str(a) == 'Load(C1, P1, SFO)'][0]
+        state = self.p1.result(self.p1.initial, load)
+        unload = [a for a in self.p1.actions(state) if str(a) == 'Unload(C1, P1, SFO)'][0]
+        child = self.p1.result(state, unload)
+        self.assertEqual(child, self.p1.initial)
+        self.assertEqual(hash(child), hash(self.p1.initial))
+        self.assertFalse(child < self.p1.initial or self.p1.initial < child)
+
+    def test_AC_goal_test(self):
+        state = self.p1.initial
+        self.assertFalse(self.p1.goal_test(state))
+        for name in ('Load(C1, P1, SFO)', 'Fly(P1, SFO, JFK)', 'Unload(C1, P1, JFK)',
+                     'Load(C2, P2, JFK)', 'Fly(P2, JFK, SFO)', 'Unload(C2, P2, SFO)'):
+            action = [a for a in self.p1.actions(state) if str(a) == name][0]
+            state = self.p1.result(state, action)
+        self.assertTrue(self.p1.goal_test(state))
+
+    def test_AC_indexed_actions(self):
+        p2 = air_cargo_p2()
+        states, seen = [p2.initial], {p2.initial}
+        for state in states[:200]:
+            fs = decode_state(state, p2.state_map)
+            expected = [action for action in p2.actions_list
+                        if all(f in fs.pos for f in action.precond_pos) and
+                        not any(f in fs.pos for f in action.precond_neg)]
+            self.assertEqual(p2.actions(state), expected)
+            for action in expected:
+                child = p2.result(state, action)
+                if child not in seen:
+                    seen.add(child)
+                    states.append(child)
+
     def test_h_ignore_preconditions(self):
         n = Node(self.p1.initial)
         self.assertEqual(self.p1.h_ignore_preconditions(n),2)
@@ -7,8 +7,9 @@ import unittest
 from aimacode.utils import expr
 from aimacode.planning import Action
 from example_have_cake import have_cake
+from my_air_cargo_problems import air_cargo_p1
 from my_planning_graph import (
-    PlanningGraph, PgNode_a, PgNode_s, mutexify
+    PlanningGraph, PgNode_a, PgNode_s, mutexify, CompactPlanningGraph
 )
 
 
@@ -124,5 +125,51 @@ class TestPlanningGraphHeuristics(unittest.TestCase):
         self.assertEqual(self.pg.h_levelsum(), 1)
 
 
+class TestCompactPlanningGraph(unittest.TestCase):
+    def setUp(self):
+        self.p = have_cake()
+        self.pg = CompactPlanningGraph(self.p, self.p.initial)
+        # literal ids of the have cake fluents
+        self.have, self.not_have, self.eaten, self.not_eaten = range(4)
+
+    def test_levels(self):
+        self.assertEqual([bin(level).count('1') for level in self.pg.a_levels[:2]], [3, 6])
+        self.assertEqual([bin(level).count('1') for level in self.pg.s_levels[:3]], [2, 4, 4])
+
+    def test_mutex(self):
+        mutex = [(self.have, self.not_have), (self.eaten, self.not_eaten),
+                 (self.have, self.eaten), (self.not_have, self.not_eaten)]
+        for l1 in range(4):
+            for l2 in range(4):
+                self.assertEqual(self.pg.is_mutex_literals(1, l1, l2),
+                                 (l1, l2) in mutex or (l2, l1) in mutex, (l1, l2))
+        self.assertFalse(self.pg.is_mutex_literals(2, self.have, self.eaten))
+        self.assertEqual(self.pg.h_setlevel(), 2)
+
+    def test_relaxed_levelsum(self):
+        p = air_cargo_p1()
+        state = p.initial
+        for _ in range(5):
+            relaxed = CompactPlanningGraph(p, state, mutex=False)
+            self.assertEqual(relaxed.h_levelsum(), PlanningGraph(p, state).h_levelsum())
+            state = p.result(state, p.actions(state)[-1])
+
+    def test_mutex_levels(self):
+        # preconditions must be pairwise non-mutex, which PlanningGraph does not require
+        p = air_cargo_p1()
+        self.assertEqual(PlanningGraph(p, p.initial).h_levelsum(), 4)
+        self.assertEqual(CompactPlanningGraph(p, p.initial).h_levelsum(), 6)
+        self.assertEqual(CompactPlanningGraph(p, p.initial, mutex=False).h_levelsum(), 4)
+
+    def test_heuristics(self):
+        p = air_cargo_p1()
+        relaxed = CompactPlanningGraph(p, p.initial, mutex=False)
+        self.assertEqual(relaxed.h_levelsum(), 4)
+        self.assertEqual(relaxed.h_max(), 2)
+        self.assertEqual(relaxed.h_add(), 6)
+        self.assertEqual(relaxed.h_ff(), 6)
+        self.assertEqual(CompactPlanningGraph(self.p, self.p.initial, mutex=False).h_ff(), 1)
+
+
 if __name__ == '__main__':
     unittest.main()